@@ -0,0 +1,6 @@
+# Copyright 2023 H. Turgut Uyar <uyar@tekir.org>
+#
+# kirlent-docutils is released under the BSD license.
+# Read the included LICENSE.txt file for details.
+
+"""Performance measurements for Kırlent writers."""
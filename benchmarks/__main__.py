@@ -0,0 +1,143 @@
+# Copyright 2023 H. Turgut Uyar <uyar@tekir.org>
+#
+# kirlent-docutils is released under the BSD license.
+# Read the included LICENSE.txt file for details.
+
+"""Command-line interface for the benchmarks.
+
+Run from the root of the repository::
+
+  python -m benchmarks run --output=results.json
+  python -m benchmarks run --sizes=10,100,1000,10000 --writers=revealjs
+  python -m benchmarks compare old.json new.json
+  python -m benchmarks deck 100 decks/
+  python -m benchmarks api --snippets=1000
+"""
+
+import argparse
+import json
+import sys
+
+from kirlent_docutils.utils import WRITERS
+
+from . import api, compare, deck, phases
+
+
+default_sizes = [10, 100, 1000]
+
+
+def _comma_separated(convert):
+    return lambda value: [convert(v) for v in value.split(",")]
+
+
+def _report(result):
+    timings = " ".join(f"{phase} {result[phase] * 1000:.1f} ms"
+                       for phase in phases.PHASES + ["total"])
+    print(f"{result['writer']:<10} {result['slides']:>6} slides: {timings}",
+          file=sys.stderr)
+
+
+def _report_api(result):
+    timings = " ".join(f"{method} {result[method] * 1000:.2f} ms"
+                       for method in api.METHODS)
+    print(f"{result['writer']:<10} per snippet: {timings}", file=sys.stderr)
+
+
+def run(args):
+    unknown = set(args.writers) - set(WRITERS)
+    if len(unknown) > 0:
+        sys.exit(f"Unknown writers: {', '.join(sorted(unknown))}")
+    data = phases.run(args.sizes, writers=args.writers, repeat=args.repeat,
+                      progress=_report)
+    text = json.dumps(data, indent=2)
+    if args.output is None:
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    return 0
+
+
+def run_api(args):
+    unknown = set(args.writers) - set(WRITERS)
+    if len(unknown) > 0:
+        sys.exit(f"Unknown writers: {', '.join(sorted(unknown))}")
+    data = api.run(args.snippets, writers=args.writers, repeat=args.repeat,
+                   progress=_report_api)
+    print(json.dumps(data, indent=2))
+    return 0
+
+
+def compare_results(args):
+    with open(args.old, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+    rows, regressions = compare.compare(old, new, threshold=args.threshold)
+    print(compare.format_rows(rows))
+    if len(regressions) > 0:
+        print(f"\n{len(regressions)} regressions over {args.threshold:.0%}:")
+        print(compare.format_rows(regressions))
+        return 1
+    return 0
+
+
+def write_deck(args):
+    print(deck.write_deck(args.directory, args.slides))
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser(
+        "run", help="measure the writers on synthetic decks")
+    run_parser.add_argument(
+        "--sizes", type=_comma_separated(int), default=default_sizes,
+        help="comma separated numbers of slides (default: %(default)s)")
+    run_parser.add_argument(
+        "--writers", type=_comma_separated(str), default=list(WRITERS),
+        help="comma separated writer names (default: all)")
+    run_parser.add_argument(
+        "--repeat", type=int, default=3,
+        help="number of runs to take the best of (default: %(default)s)")
+    run_parser.add_argument(
+        "--output", help="JSON file for the results (default: stdout)")
+    run_parser.set_defaults(func=run)
+
+    compare_parser = commands.add_parser(
+        "compare", help="compare two result files")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument(
+        "--threshold", type=float, default=0.1,
+        help="slowdown ratio to report as a regression "
+             "(default: %(default)s)")
+    compare_parser.set_defaults(func=compare_results)
+
+    api_parser = commands.add_parser(
+        "api", help="compare the rendering API with publish_parts")
+    api_parser.add_argument(
+        "--snippets", type=int, default=200,
+        help="number of snippets to render (default: %(default)s)")
+    api_parser.add_argument(
+        "--writers", type=_comma_separated(str), default=list(WRITERS),
+        help="comma separated writer names (default: all)")
+    api_parser.add_argument(
+        "--repeat", type=int, default=3,
+        help="number of runs to take the best of (default: %(default)s)")
+    api_parser.set_defaults(func=run_api)
+
+    deck_parser = commands.add_parser(
+        "deck", help="write a synthetic deck and its image to a directory")
+    deck_parser.add_argument("slides", type=int)
+    deck_parser.add_argument("directory")
+    deck_parser.set_defaults(func=write_deck)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
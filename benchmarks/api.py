@@ -0,0 +1,74 @@
+# Copyright 2023 H. Turgut Uyar <uyar@tekir.org>
+#
+# kirlent-docutils is released under the BSD license.
+# Read the included LICENSE.txt file for details.
+
+"""Timing the rendering of small snippets through the Python API.
+
+The snippets are rendered with ``publish_parts`` from docutils and with
+a renderer, so that the difference shows the per-call overhead saved
+by resolving the settings once.
+"""
+
+import time
+
+from docutils.core import publish_parts
+
+from kirlent_docutils.rendering import Renderer
+from kirlent_docutils.utils import WRITERS, get_writer_class
+
+
+METHODS = ["publish_parts", "renderer"]
+
+SNIPPET = """\
+Snippet %(n)d
+=============
+
+Some *emphasized* text, a `link <https://example.com/%(n)d>`__
+and ``inline code``.
+
+- first item
+- second item
+"""
+
+
+def time_snippets(writer_name, count, repeat=3):
+    """Get the best durations per snippet in seconds, for every method."""
+    writer_class = get_writer_class(writer_name)
+    renderer = Renderer(writer_name, report_level=5)
+    overrides = {"report_level": 5}
+    sources = [SNIPPET % {"n": n} for n in range(count)]
+    calls = {
+        "publish_parts": lambda source: publish_parts(
+            source, writer=writer_class(), settings_overrides=overrides),
+        "renderer": renderer.render,
+    }
+    best = {}
+    for _ in range(repeat):
+        for method in METHODS:
+            call = calls[method]
+            start = time.perf_counter()
+            for source in sources:
+                call(source)
+            duration = (time.perf_counter() - start) / count
+            best[method] = min(best.get(method, duration), duration)
+    return best
+
+
+def run(count, writers=None, repeat=3, progress=None):
+    """Measure the methods for all writers.
+
+    Returns the results in a form that can be saved as JSON.
+    """
+    writers = list(WRITERS) if writers is None else writers
+    results = []
+    for writer_name in writers:
+        result = {
+            "writer": writer_name,
+            "snippets": count,
+            **time_snippets(writer_name, count, repeat=repeat),
+        }
+        if progress is not None:
+            progress(result)
+        results.append(result)
+    return {"repeat": repeat, "results": results}
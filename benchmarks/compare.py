@@ -0,0 +1,47 @@
+# Copyright 2023 H. Turgut Uyar <uyar@tekir.org>
+#
+# kirlent-docutils is released under the BSD license.
+# Read the included LICENSE.txt file for details.
+
+"""Comparison of benchmark results."""
+
+from .phases import PHASES
+
+
+# changes smaller than this are considered noise
+min_difference = 0.001  # seconds
+
+
+def _index(data):
+    return {(r["writer"], r["slides"]): r for r in data["results"]}
+
+
+def compare(old, new, threshold=0.1):
+    """Compare two sets of results.
+
+    Returns the rows of the comparison for the measurements that are
+    in both sets, and the rows where a phase got slower by more than
+    the threshold ratio.
+    """
+    old_results, new_results = _index(old), _index(new)
+    rows, regressions = [], []
+    for key in sorted(old_results.keys() & new_results.keys()):
+        for phase in PHASES + ["total"]:
+            before, after = old_results[key][phase], new_results[key][phase]
+            change = (after - before) / before if before > 0 else 0.0
+            row = (key[0], key[1], phase, before, after, change)
+            rows.append(row)
+            if (change > threshold) and (after - before > min_difference):
+                regressions.append(row)
+    return rows, regressions
+
+
+def format_rows(rows):
+    """Format the rows of a comparison as a table."""
+    lines = [f"{'writer':<10} {'slides':>6} {'phase':<10} "
+             f"{'old (ms)':>10} {'new (ms)':>10} {'change':>8}"]
+    for writer, slides, phase, before, after, change in rows:
+        lines.append(f"{writer:<10} {slides:>6} {phase:<10} "
+                     f"{before * 1000:>10.1f} {after * 1000:>10.1f} "
+                     f"{change:>+8.1%}")
+    return "\n".join(lines)
@@ -0,0 +1,136 @@
+# Copyright 2023 H. Turgut Uyar <uyar@tekir.org>
+#
+# kirlent-docutils is released under the BSD license.
+# Read the included LICENSE.txt file for details.
+
+"""Generator for synthetic slide decks.
+
+Every slide has a title and a list with annotations. In addition,
+the slides take turns in having a multicolumn layout with a pause,
+math, a code block, a table, an image and impress.js positions.
+"""
+
+from pathlib import Path
+
+
+IMAGE_NAME = "chart.svg"
+
+IMAGE = """\
+<svg xmlns="http://www.w3.org/2000/svg" width="320" height="200">
+  <rect x="10" y="10" width="300" height="180" fill="none" stroke="black"/>
+  <polyline points="10,190 90,120 170,150 250,40 310,60"
+            fill="none" stroke="blue"/>
+</svg>
+"""
+
+HEADER = """\
+.. title:: Benchmark Deck
+
+:author: Kırlent Benchmarks
+:date: 2023-01-01
+
+"""
+
+SLIDE = """\
+----
+
+%(fields)s\
+Slide %(n)d
+%(underline)s
+
+- *>_underlined_<* point %(n)d with ``inline code``
+- *>(circled)<* point and a `link <https://example.com/%(n)d>`__
+- plain point with **strong** text
+
+%(body)s
+"""
+
+LAYOUT = """\
+.. container:: layout-left
+
+   - left column item
+   - *>!highlighted!<* item
+
+:pause:
+
+.. container:: layout-right
+
+   - right column item
+   - another item
+"""
+
+MATH = """\
+Inline :math:`x_{%(n)d}^2 + y^2 = r^2` and a block:
+
+.. math::
+
+   \\sum_{k=0}^{%(n)d} k = \\frac{%(n)d (%(n)d + 1)}{2}
+"""
+
+CODE = """\
+.. code:: python
+
+   def step_%(n)d(values):
+       # sum the even values
+       return sum(v for v in values if v %% 2 == 0) + %(n)d
+"""
+
+TABLE = """\
++-----------+-----------+-----------+
+| Column    | Value     | Note      |
++===========+===========+===========+
+| row %(n)-5d | %(n)-9d | *emph*    |
++-----------+-----------+-----------+
+| row two   | ``code``  | plain     |
++-----------+-----------+-----------+
+"""
+
+IMAGE_DIRECTIVE = """\
+.. image:: %(image)s
+   :width: 320
+   :alt: chart %(n)d
+"""
+
+POSITION = """\
+Positioned for impress.js.
+"""
+
+BODIES = [LAYOUT, MATH, CODE, TABLE, IMAGE_DIRECTIVE, POSITION]
+
+
+def slide(n):
+    """Get the source of the n'th slide."""
+    kind = BODIES[n % len(BODIES)]
+    fields = ""
+    if kind is LAYOUT:
+        fields = ":layout: left right\n\n"
+    elif kind is POSITION:
+        fields = ":data-x: %(x)d\n:data-y: %(y)d\n:data-rotate: 90\n\n" % {
+            "x": n * 100,
+            "y": n * 50,
+        }
+    title = f"Slide {n}"
+    return SLIDE % {
+        "fields": fields,
+        "n": n,
+        "underline": "=" * len(title),
+        "body": kind % {"n": n, "image": IMAGE_NAME},
+    }
+
+
+def generate(n_slides):
+    """Get the source of a deck with the given number of slides."""
+    return HEADER + "\n".join(slide(n) for n in range(1, n_slides + 1))
+
+
+def write_deck(directory, n_slides):
+    """Write a deck and its image into a directory.
+
+    Returns the path of the source file.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / IMAGE_NAME).write_text(IMAGE, encoding="utf-8")
+    source = directory / f"deck-{n_slides}.rst"
+    source.write_text(generate(n_slides), encoding="utf-8")
+    return source
@@ -0,0 +1,131 @@
+# Copyright 2023 H. Turgut Uyar <uyar@tekir.org>
+#
+# kirlent-docutils is released under the BSD license.
+# Read the included LICENSE.txt file for details.
+
+"""Timing the phases of a conversion.
+
+The phases are:
+
+- parse: reading the source into a document tree
+- transform: applying the transforms of the reader, parser and writer
+- translate: visiting the document tree with the translator
+- assemble: filling the template and collecting the parts
+"""
+
+import platform
+import tempfile
+import time
+from pathlib import Path
+
+import docutils
+import pygments
+from docutils import io, languages
+from docutils.core import Publisher
+
+import kirlent_docutils
+from kirlent_docutils.utils import WRITERS, get_writer_class
+
+from .deck import write_deck
+
+
+PHASES = ["parse", "transform", "translate", "assemble"]
+
+
+def time_phases(source_path, writer_name, settings_overrides=None):
+    """Convert a document and measure the duration of each phase.
+
+    Returns the durations in seconds and the number of elements
+    in the document tree.
+    """
+    writer = get_writer_class(writer_name)()
+    pub = Publisher(writer=writer, source_class=io.FileInput,
+                    destination_class=io.NullOutput)
+    pub.set_components("standalone", "restructuredtext", None)
+    overrides = {"report_level": 5, **(settings_overrides or {})}
+    pub.process_programmatic_settings(None, overrides, None)
+    pub.set_source(source_path=str(source_path))
+    pub.set_destination()
+
+    timings = {}
+    start = time.perf_counter()
+    document = pub.reader.read(pub.source, pub.parser, pub.settings)
+    timings["parse"] = time.perf_counter() - start
+    n_elements = sum(1 for _ in document.findall())
+
+    start = time.perf_counter()
+    pub.document = document
+    pub.apply_transforms()
+    timings["transform"] = time.perf_counter() - start
+
+    # same as the writer's translate method but timed in two steps
+    start = time.perf_counter()
+    writer.document = document
+    writer.language = languages.get_language(
+        document.settings.language_code, document.reporter)
+    writer.destination = pub.destination
+    writer.visitor = visitor = writer.translator_class(document)
+    document.walkabout(visitor)
+    for attr in writer.visitor_attributes:
+        setattr(writer, attr, getattr(visitor, attr))
+    timings["translate"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    writer.output = writer.apply_template()
+    writer.assemble_parts()
+    timings["assemble"] = time.perf_counter() - start
+
+    return timings, n_elements
+
+
+def measure(source_path, writer_name, repeat=3):
+    """Get the best durations of the phases over a number of runs."""
+    best = {}
+    for _ in range(repeat):
+        timings, n_elements = time_phases(source_path, writer_name)
+        for phase, duration in timings.items():
+            best[phase] = min(best.get(phase, duration), duration)
+    best["total"] = sum(best[phase] for phase in PHASES)
+    return best, n_elements
+
+
+def environment():
+    """Get the versions of the tools and the platform."""
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "docutils": docutils.__version__,
+        "pygments": pygments.__version__,
+        "kirlent_docutils": kirlent_docutils.__version__,
+    }
+
+
+def run(sizes, writers=None, repeat=3, progress=None):
+    """Measure all writers on decks of the given sizes.
+
+    Returns the results in a form that can be saved as JSON.
+    """
+    writers = list(WRITERS) if writers is None else writers
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_slides in sizes:
+            source = write_deck(Path(tmp), n_slides)
+            for writer_name in writers:
+                timings, n_elements = measure(source, writer_name,
+                                              repeat=repeat)
+                result = {
+                    "writer": writer_name,
+                    "slides": n_slides,
+                    "elements": n_elements,
+                    "source_bytes": source.stat().st_size,
+                    **timings,
+                }
+                if progress is not None:
+                    progress(result)
+                results.append(result)
+    return {
+        "environment": environment(),
+        "repeat": repeat,
+        "results": results,
+    }
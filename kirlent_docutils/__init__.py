@@ -6,3 +6,12 @@
 """Custom writers for docutils."""
 
 __version__ = "0.4"
+
+
+def __getattr__(name):
+    # the rendering api is imported on first use,
+    # so that loading a writer doesn't import it
+    if name in ("render", "Renderer"):
+        from . import rendering
+        return getattr(rendering, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
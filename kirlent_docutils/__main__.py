@@ -0,0 +1,54 @@
+# Copyright 2023 H. Turgut Uyar <uyar@tekir.org>
+#
+# kirlent-docutils is released under the BSD license.
+# Read the included LICENSE.txt file for details.
+
+"""Command-line dispatcher for Kırlent writers.
+
+Only the modules of the selected writer are imported.
+"""
+
+import sys
+import time
+from importlib import import_module
+
+
+COMMANDS = {
+    "html5": ("publish_cmdline_html5", "kirlent_docutils.html5"),
+    "slides": ("publish_cmdline_slides", "kirlent_docutils.slides"),
+    "impressjs": ("publish_cmdline_impressjs", "kirlent_docutils.impressjs"),
+    "revealjs": ("publish_cmdline_revealjs", "kirlent_docutils.revealjs"),
+    "multi": ("publish_cmdline_multi", "kirlent_docutils.multi"),
+}
+
+usage = "python -m kirlent_docutils [--import-time] <writer> [options] " \
+    "[<source> [<destination>]]\nWriters: %(writers)s" % {
+        "writers": ", ".join(COMMANDS),
+    }
+
+
+def main(argv=None):
+    """Run the command of the writer given as the first argument."""
+    if argv is None:
+        argv = sys.argv[1:]
+    report = (len(argv) > 0) and (argv[0] == "--import-time")
+    if report:
+        argv = argv[1:]
+    if (len(argv) == 0) or (argv[0] not in COMMANDS):
+        sys.exit(f"usage: {usage}")
+    name, args = argv[0], argv[1:]
+    entry_point, module = COMMANDS[name]
+
+    start = time.perf_counter()
+    cli = import_module("kirlent_docutils.cli")
+    import_module(module)
+    elapsed = time.perf_counter() - start
+    if report:
+        print(f"{name}: imported in {elapsed * 1000:.1f} ms", file=sys.stderr)
+
+    sys.argv[0] = f"python -m kirlent_docutils {name}"
+    getattr(cli, entry_point)(args)
+
+
+if __name__ == "__main__":
+    main()
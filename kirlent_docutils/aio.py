@@ -0,0 +1,110 @@
+# Copyright 2023 H. Turgut Uyar <uyar@tekir.org>
+#
+# kirlent-docutils is released under the BSD license.
+# Read the included LICENSE.txt file for details.
+
+"""Rendering documents from asyncio code.
+
+Renders run in an executor so that they don't block the event loop.
+The number of renders in progress is limited; the others wait for
+their turn. A render that is cancelled or that times out stops waiting
+immediately, but since a running conversion can't be interrupted,
+its slot is only freed when the conversion in the executor finishes.
+"""
+
+import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from .rendering import render_with_warnings
+
+
+class AsyncRenderer:
+    """Renderer for asyncio code.
+
+    The executor can be a thread or process pool executor; a thread
+    pool is created if none is given. At most ``max_in_flight`` renders
+    are in progress at any time (default: number of CPUs).
+    """
+
+    def __init__(self, executor=None, max_in_flight=None):
+        self.max_in_flight = max_in_flight if max_in_flight else \
+            (os.cpu_count() or 1)
+        self.executor = executor
+        self._semaphores = {}  # loop -> semaphore
+
+    def _semaphore(self, loop):
+        # semaphores can't be shared between event loops
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            for old_loop in [lp for lp in self._semaphores if lp.is_closed()]:
+                del self._semaphores[old_loop]
+            semaphore = asyncio.Semaphore(self.max_in_flight)
+            self._semaphores[loop] = semaphore
+        return semaphore
+
+    def _executor(self):
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.max_in_flight)
+        return self.executor
+
+    async def render(self, source, writer="html5", *, source_path=None,
+                     timeout=None, **settings):
+        """Render a document and get its parts.
+
+        The timeout in seconds covers the waiting and the rendering.
+        Warnings are written to the standard error.
+        """
+        coro = self._render(source, writer, source_path, settings)
+        if timeout is None:
+            return await coro
+        return await asyncio.wait_for(coro, timeout)
+
+    async def _render(self, source, writer, source_path, settings):
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphore(loop)
+        await semaphore.acquire()
+
+        def release(_):
+            try:
+                loop.call_soon_threadsafe(semaphore.release)
+            except RuntimeError:
+                pass  # the loop is closed
+
+        try:
+            future = self._executor().submit(render_with_warnings, source,
+                                             writer, settings, source_path)
+        except BaseException:
+            semaphore.release()
+            raise
+        future.add_done_callback(release)
+        parts, warning_text = await asyncio.wrap_future(future)
+        if warning_text:
+            sys.stderr.write(warning_text)
+        return parts
+
+    def shutdown(self, wait=True):
+        """Shut down the executor."""
+        if self.executor is not None:
+            self.executor.shutdown(wait=wait)
+
+
+_default_renderer = None
+
+
+async def render_async(source, writer="html5", *, renderer=None,
+                       source_path=None, timeout=None, **settings):
+    """Render a document without blocking the event loop.
+
+    The keyword arguments other than the renderer, the source path
+    and the timeout are settings overrides. Renders use a shared
+    default renderer unless one is given.
+    """
+    global _default_renderer
+    if renderer is None:
+        if _default_renderer is None:
+            _default_renderer = AsyncRenderer()
+        renderer = _default_renderer
+    return await renderer.render(source, writer, source_path=source_path,
+                                 timeout=timeout, **settings)
@@ -0,0 +1,230 @@
+# Copyright 2023 H. Turgut Uyar <uyar@tekir.org>
+#
+# kirlent-docutils is released under the BSD license.
+# Read the included LICENSE.txt file for details.
+
+"""Batch conversion of source trees."""
+
+import copy
+import os
+import sys
+from multiprocessing import Pool
+from pathlib import Path
+
+from docutils import SettingsSpec, frontend, utils
+from docutils.core import Publisher
+from docutils.utils import get_stylesheet_list
+
+from . import cache, highlight, mathcache
+from .incremental import publish_incremental
+from .watch import TreeWatcher, Watcher, watch
+
+
+SOURCE_PATTERN = "*.rst"
+OUTPUT_SUFFIX = ".html"
+
+default_max_tasks_per_child = 100
+
+
+class BatchSettings(SettingsSpec):
+    """Command-line options for converting whole source trees."""
+
+    settings_spec = (
+        "Batch Options",
+        "These apply when the source is a directory. All files matching "
+        "%(pattern)s under it are converted into the destination "
+        "directory, keeping the relative paths." % {
+            "pattern": SOURCE_PATTERN,
+        },
+        (
+            (
+                'Number of worker processes. (default: number of CPUs)',
+                ["--jobs"],
+                {
+                    "metavar": "<n>",
+                    "default": None,
+                    "validator": frontend.validate_nonnegative_int,
+                }
+            ),
+            (
+                'Number of documents a worker process converts before '
+                'it gets replaced, 0 to keep workers until the end. '
+                '(default: %(n)d)' % {"n": default_max_tasks_per_child},
+                ["--max-tasks-per-child"],
+                {
+                    "metavar": "<n>",
+                    "default": default_max_tasks_per_child,
+                    "validator": frontend.validate_nonnegative_int,
+                }
+            ),
+        )
+    )
+
+
+def destination_path(source, source_dir, destination_dir):
+    """Get the output path for a source in a tree."""
+    relative = Path(source).relative_to(source_dir)
+    return (Path(destination_dir) / relative).with_suffix(OUTPUT_SUFFIX)
+
+
+def collect_sources(source_dir, destination_dir):
+    """Get the source and destination paths for all documents in a tree."""
+    source_dir = Path(source_dir)
+    sources = [p for p in source_dir.rglob(SOURCE_PATTERN) if p.is_file()]
+    # start with the largest documents to avoid a long tail at the end
+    sources.sort(key=lambda p: p.stat().st_size, reverse=True)
+    return [(p, destination_path(p, source_dir, destination_dir))
+            for p in sources]
+
+
+# state of a worker process, set by the pool initializer
+_writer_class, _settings = None, None
+_build_cache, _doctree_cache, _highlight_cache = None, None, None
+
+
+def _init_worker(writer_class, settings):
+    global _writer_class, _settings
+    global _build_cache, _doctree_cache, _highlight_cache
+    _writer_class, _settings = writer_class, settings
+    _build_cache, _doctree_cache = cache.get_caches(settings)
+    _highlight_cache = highlight.get_cache(settings)
+
+
+def _convert(job):
+    source, destination = job
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    settings = copy.deepcopy(_settings)
+    settings.record_dependencies = utils.DependencyList()
+    pub = Publisher(writer=_writer_class(), settings=settings)
+    pub.set_components("standalone", "restructuredtext", None)
+    pub.set_source(source_path=str(source))
+    pub.set_destination(destination_path=str(destination))
+    if _doctree_cache is not None:
+        cache.use_doctree_cache(pub, _doctree_cache)
+    hits = _build_cache.hits if _build_cache is not None else 0
+    try:
+        with highlight.highlighting(settings, _highlight_cache):
+            converted = getattr(settings, "incremental", False) and \
+                publish_incremental(pub, enable_exit_status=True)
+            if not converted:
+                cache.publish(pub, _build_cache, enable_exit_status=True)
+        code = 0
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else 1
+    hit = (_build_cache is not None) and (_build_cache.hits > hits)
+    dependencies = [source] + settings.record_dependencies.list + \
+        get_stylesheet_list(settings)
+    return source, code, hit, dependencies
+
+
+def _convert_all(writer_class, settings, jobs):
+    n_workers = settings.jobs if settings.jobs else os.cpu_count()
+    n_workers = min(n_workers, len(jobs))
+    max_tasks = settings.max_tasks_per_child or None
+
+    if n_workers <= 1:
+        _init_worker(writer_class, settings)
+        return [_report(result) for result in map(_convert, jobs)]
+
+    with Pool(processes=n_workers, initializer=_init_worker,
+              initargs=(writer_class, settings),
+              maxtasksperchild=max_tasks) as pool:
+        return [_report(result)
+                for result in pool.imap_unordered(_convert, jobs)]
+
+
+def _without_recording(settings):
+    # the workers can't share the open file of the dependency list,
+    # so they record into their own lists which are merged into it
+    recorded = settings.record_dependencies
+    settings = copy.copy(settings)
+    settings.record_dependencies = utils.DependencyList()
+    return settings, recorded
+
+
+def _record(recorded, dependencies):
+    # the source itself is not a dependency
+    recorded.add(*dependencies[1:])
+
+
+def _report(result):
+    source, code, _, _ = result
+    if code:
+        print(f"{source}: exit status {code}", file=sys.stderr)
+    return result
+
+
+def publish_tree(writer_class, settings, source_dir, destination_dir):
+    """Convert all documents in a source tree.
+
+    The conversions are distributed over a pool of worker processes.
+    The exit status is the highest status among all conversions.
+    """
+    settings, recorded = _without_recording(settings)
+    jobs = collect_sources(source_dir, destination_dir)
+    results = _convert_all(writer_class, settings, jobs)
+    for _, _, _, dependencies in results:
+        _record(recorded, dependencies)
+    if recorded.file is not None:
+        recorded.close()
+    status = max((code for _, code, _, _ in results), default=0)
+    hits = sum(hit for _, _, hit, _ in results)
+
+    build_cache, doctree_cache = cache.get_caches(settings)
+    for used_cache in (doctree_cache, highlight.get_cache(settings),
+                       mathcache.get_cache(settings)):
+        if used_cache is not None:
+            used_cache.trim()
+    if build_cache is not None:
+        build_cache.trim()
+        if settings.report_level <= 1:
+            stats = build_cache.stats()
+            print(f"cache: {hits} hits, {len(jobs) - hits} misses, "
+                  f"{build_cache.evictions} evictions, "
+                  f"{stats['entries']} entries, {stats['size']} bytes",
+                  file=sys.stderr)
+    return status
+
+
+def watch_file(writer_class, settings, source, destination):
+    """Convert a document whenever it or its dependencies change."""
+    settings, recorded = _without_recording(settings)
+    _init_worker(writer_class, settings)
+
+    def build(source):
+        dependencies = _report(_convert((source, Path(destination))))[3]
+        _record(recorded, dependencies)
+        return dependencies
+
+    watcher = Watcher()
+    watcher.update(source, build(source))
+    watch(watcher, build, settings.watch_interval)
+    return 0
+
+
+def watch_tree(writer_class, settings, source_dir, destination_dir):
+    """Convert the documents in a tree whenever they change.
+
+    After converting all documents, only the documents affected
+    by a change are converted again, in this process.
+    """
+    settings, recorded = _without_recording(settings)
+    watcher = TreeWatcher(source_dir, SOURCE_PATTERN)
+    watcher.scan()
+    jobs = collect_sources(source_dir, destination_dir)
+    for source, _, _, dependencies in _convert_all(writer_class, settings,
+                                                   jobs):
+        _record(recorded, dependencies)
+        watcher.update(source, dependencies)
+
+    _init_worker(writer_class, settings)
+
+    def build(source):
+        destination = destination_path(source, source_dir, destination_dir)
+        dependencies = _report(_convert((source, destination)))[3]
+        _record(recorded, dependencies)
+        return dependencies
+
+    watch(watcher, build, settings.watch_interval,
+          find_sources=watcher.poll_sources)
+    return 0
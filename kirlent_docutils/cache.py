@@ -0,0 +1,374 @@
+# Copyright 2023 H. Turgut Uyar <uyar@tekir.org>
+#
+# kirlent-docutils is released under the BSD license.
+# Read the included LICENSE.txt file for details.
+
+"""Persistent caches for build artifacts."""
+
+import copy
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import warnings
+from functools import lru_cache
+from pathlib import Path
+
+import docutils
+import pygments
+from docutils import SettingsSpec, frontend
+from docutils.core import publish_doctree
+from docutils.parsers import rst
+from docutils.readers import doctree, standalone
+from docutils.utils import DependencyList
+
+from . import __version__
+from .utils import write_gzip_sidecars
+
+
+class CacheSettings(SettingsSpec):
+    """Command-line options for the build cache."""
+
+    settings_spec = (
+        "Build Cache Options",
+        None,
+        (
+            (
+                'Directory for caching generated output. Documents are '
+                'only converted if their sources, settings or dependencies '
+                'have changed. (default: no caching)',
+                ["--cache-dir"],
+                {
+                    "metavar": "<dir>",
+                    "default": None,
+                }
+            ),
+            (
+                'Maximum size of each cache in bytes. The least recently '
+                'used entries are removed after a build. (default: no limit)',
+                ["--cache-size"],
+                {
+                    "metavar": "<bytes>",
+                    "default": None,
+                    "validator": frontend.validate_nonnegative_int,
+                }
+            ),
+            (
+                'Directory for caching parsed document trees. The cached '
+                'trees can be used by all writers. (default: no caching)',
+                ["--doctree-cache-dir"],
+                {
+                    "metavar": "<dir>",
+                    "default": None,
+                }
+            ),
+        )
+    )
+
+
+def make_key(*parts):
+    """Compute a cache key from strings and bytes."""
+    digest = hashlib.sha256()
+    for part in parts:
+        data = part if isinstance(part, bytes) else str(part).encode("utf-8")
+        digest.update(len(data).to_bytes(8, "little"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+def file_digest(path):
+    """Compute the digest of a file's contents."""
+    with open(path, "rb") as f:
+        return make_key(f.read())
+
+
+class DiskCache:
+    """Key-value store in a directory, shared between processes.
+
+    Values are pickled into one file per entry. Entries are written
+    to a temporary file and then renamed so that readers never see
+    partial entries. The modification time of an entry is updated on
+    every read and is used for removing the least recently used
+    entries when the cache grows beyond its maximum size.
+    """
+
+    def __init__(self, directory, max_size=None):
+        self.directory = Path(directory)
+        self.max_size = max_size
+        self.hits, self.misses, self.stores, self.evictions = 0, 0, 0, 0
+
+    def _path(self, key):
+        return self.directory / key[:2] / key
+
+    def get(self, key, default=None):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+            os.utime(path)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        self.stores += 1
+
+    def entries(self):
+        """Get the paths, sizes and access times of all entries."""
+        result = []
+        if not self.directory.is_dir():
+            return result
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".tmp"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue  # removed by another process
+                result.append((entry.path, stat.st_size, stat.st_mtime))
+        return result
+
+    def trim(self):
+        """Remove the least recently used entries to respect the size."""
+        if self.max_size is None:
+            return
+        entries = sorted(self.entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_size:
+                break
+            try:
+                os.unlink(path)
+                self.evictions += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def stats(self):
+        """Get usage statistics of the cache."""
+        entries = self.entries()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "entries": len(entries),
+            "size": sum(size for _, size, _ in entries),
+        }
+
+
+class DependencyCache(DiskCache):
+    """Cache for values that depend on the contents of other files.
+
+    An entry records the digests of the files its value depended on,
+    like included files and embedded stylesheets, and it is only used
+    if none of these files have changed.
+    """
+
+    def get_entry(self, key):
+        entry = super().get(key)
+        if entry is None:
+            return None
+        for path, digest in entry["dependencies"].items():
+            try:
+                if file_digest(path) != digest:
+                    break
+            except OSError:
+                break
+        else:
+            return entry
+        # a dependency has changed, count as a miss
+        self.hits -= 1
+        self.misses += 1
+        return None
+
+    def get(self, key, default=None):
+        entry = self.get_entry(key)
+        return entry["value"] if entry is not None else default
+
+    def set(self, key, value, dependencies=()):
+        digests = {}
+        for path in dependencies:
+            try:
+                digests[path] = file_digest(path)
+            except OSError:
+                return  # can't validate the entry later, don't store it
+        super().set(key, {"value": value, "dependencies": digests})
+
+
+class BuildCache(DependencyCache):
+    """Cache for the outputs of writers.
+
+    Entries are keyed by the source contents, the writer class,
+    the resolved settings and the versions of the tools.
+    """
+
+    # settings that don't affect the output
+    ignored_settings = {
+        "record_dependencies",
+        "warning_stream",
+        "cache_dir",
+        "cache_size",
+        "doctree_cache_dir",
+        "highlight_cache_dir",
+        "highlight_jobs",
+        "math_cache_dir",
+        "translate_jobs",
+        "incremental",
+        "jobs",
+        "max_tasks_per_child",
+        "watch",
+        "watch_interval",
+        "_config_files",
+        "_disable_config",
+    }
+
+    def make_key(self, writer_class, settings):
+        with open(settings._source, "rb") as f:
+            source = f.read()
+        resolved = {k: v for k, v in vars(settings).items()
+                    if k not in self.__class__.ignored_settings}
+        return make_key(
+            source,
+            f"{writer_class.__module__}.{writer_class.__qualname__}",
+            json.dumps(resolved, sort_keys=True, default=repr),
+            __version__,
+            docutils.__version__,
+            pygments.__version__,
+        )
+
+
+@lru_cache(maxsize=None)
+def _parser_setting_names():
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", category=DeprecationWarning)
+        option_parser = frontend.OptionParser(
+            components=(standalone.Reader, rst.Parser))
+    names = set(vars(option_parser.get_default_values()))
+    return names - BuildCache.ignored_settings
+
+
+class DoctreeCache(DependencyCache):
+    """Cache for parsed and transformed document trees.
+
+    Entries are keyed by the source text, the settings of the reader
+    and the parser, and the versions of the tools. A cached tree has
+    all the transforms applied except for the ones of the writer,
+    so it can be used with any writer.
+    """
+
+    def make_key(self, text, settings):
+        names = _parser_setting_names()
+        if not getattr(settings, "source_link", False):
+            # only needed for the link to the source in the footer
+            names = names - {"_destination", "output"}
+        resolved = {k: getattr(settings, k, None) for k in sorted(names)}
+        return make_key(
+            text,
+            settings._source,
+            json.dumps(resolved, sort_keys=True, default=repr),
+            __version__,
+            docutils.__version__,
+            pygments.__version__,
+        )
+
+
+class CachedReader(doctree.Reader):
+    """Reader that gets its documents from a doctree cache.
+
+    Documents that are not in the cache are parsed and transformed
+    as the standalone reader would do, and then stored in the cache.
+    """
+
+    def __init__(self, cache):
+        super().__init__(parser_name="null")
+        self.cache = cache
+
+    def read(self, source, parser, settings):
+        self.source = source
+        self.settings = settings
+        text = source.read()
+        key = self.cache.make_key(text, settings)
+        entry = self.cache.get_entry(key)
+        if entry is not None:
+            document = entry["value"]
+            dependencies = list(entry["dependencies"])
+        else:
+            parse_settings = copy.copy(settings)
+            parse_settings.record_dependencies = DependencyList()
+            document = publish_doctree(text, source_path=settings._source,
+                                       settings=parse_settings)
+            dependencies = parse_settings.record_dependencies.list
+            # these are replaced when the tree is reused
+            document.reporter = None
+            document.transformer = None
+            document.settings = None
+            self.cache.set(key, document, dependencies)
+        settings.record_dependencies.add(*dependencies)
+        self.input = document
+        self.parse()
+        return self.document
+
+
+def get_caches(settings):
+    """Get the build and doctree caches configured in the settings."""
+    cache_dir = getattr(settings, "cache_dir", None)
+    doctree_cache_dir = getattr(settings, "doctree_cache_dir", None)
+    max_size = getattr(settings, "cache_size", None)
+    build_cache = BuildCache(cache_dir, max_size=max_size) \
+        if cache_dir is not None else None
+    doctree_cache = DoctreeCache(doctree_cache_dir, max_size=max_size) \
+        if doctree_cache_dir is not None else None
+    return build_cache, doctree_cache
+
+
+def use_doctree_cache(pub, cache):
+    """Make a publisher start from cached document trees."""
+    pub.reader = CachedReader(cache)
+    pub.parser = pub.reader.parser
+
+
+def publish(pub, cache, **kwargs):
+    """Publish a document unless its output is found in the cache.
+
+    The publisher must have its settings and components set up.
+    Documents read from the standard input are not cached.
+    """
+    settings = pub.settings
+    if (cache is None) or (settings._source in (None, "-")):
+        return pub.publish(**kwargs)
+    if getattr(settings, "profile_visitors", None) is not None:
+        return pub.publish(**kwargs)  # the translator has to run
+    if getattr(settings, "lazy_slides", False):
+        return pub.publish(**kwargs)  # the slide files are written too
+
+    key = cache.make_key(pub.writer.__class__, settings)
+    entry = cache.get_entry(key)
+    if entry is not None:
+        settings.record_dependencies.add(*entry["dependencies"])
+        pub.set_io()
+        pub.destination.write(entry["value"])
+        if getattr(settings, "gzip_level", 0):
+            write_gzip_sidecars(settings, pub.destination.destination_path)
+        return entry["value"]
+
+    output = pub.publish(**kwargs)
+    if pub.writer.output is not None:  # not streamed
+        cache.set(key, pub.writer.output, settings.record_dependencies.list)
+    return output
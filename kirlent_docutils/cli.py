@@ -5,26 +5,106 @@
 
 """Command-line entry points for Kırlent writers."""
 
-from docutils.core import publish_cmdline
+import sys
+from pathlib import Path
 
-from . import html5, impressjs, revealjs, slides
+from docutils import SettingsSpec
+from docutils.core import Publisher, default_description, default_usage
+
+from . import cache, highlight, mathcache
+from .batch import BatchSettings
+from .watch import WatchSettings
+
+
+# the writers and the other tools are imported by the entry points
+# that use them, so that a command only loads what it needs
+
+
+class CommandLineSettings(SettingsSpec):
+    """Command-line options that are not specific to writers."""
+
+    settings_spec = BatchSettings.settings_spec + \
+        cache.CacheSettings.settings_spec + \
+        highlight.HighlightSettings.settings_spec + \
+        WatchSettings.settings_spec
+
+
+def publish_cmdline(writer, argv=None, usage=default_usage,
+                    description=default_description):
+    """Convert a document, or all documents in a directory."""
+    pub = Publisher(writer=writer)
+    pub.set_components("standalone", "restructuredtext", None)
+    pub.process_command_line(argv, usage=usage, description=description,
+                             settings_spec=CommandLineSettings)
+    source = pub.settings._source
+    destination = getattr(pub.settings, "output", None) or \
+        pub.settings._destination
+    if (source is not None) and Path(source).is_dir():
+        if destination is None:
+            sys.exit("A destination directory is required for batch mode.")
+        from .batch import publish_tree, watch_tree
+        publish = watch_tree if pub.settings.watch else publish_tree
+        sys.exit(publish(writer.__class__, pub.settings, source, destination))
+    if pub.settings.watch:
+        if (source is None) or (destination is None):
+            sys.exit("Source and destination files are required "
+                     "for watch mode.")
+        from .batch import watch_file
+        sys.exit(watch_file(writer.__class__, pub.settings,
+                            source, destination))
+    build_cache, doctree_cache = cache.get_caches(pub.settings)
+    highlight_cache = highlight.get_cache(pub.settings)
+    with highlight.highlighting(pub.settings, highlight_cache):
+        converted = False
+        if getattr(pub.settings, "incremental", False):
+            from .incremental import publish_incremental
+            converted = publish_incremental(pub, enable_exit_status=True)
+        if converted:
+            output = None
+        else:
+            if doctree_cache is not None:
+                cache.use_doctree_cache(pub, doctree_cache)
+            output = cache.publish(pub, build_cache,
+                                   enable_exit_status=True)
+    math_cache = mathcache.get_cache(pub.settings)
+    for used_cache in (build_cache, doctree_cache, highlight_cache,
+                       math_cache):
+        if used_cache is not None:
+            used_cache.trim()
+    return output
 
 
 def publish_cmdline_html5(*args, **kwargs):
     """Convert RST to HTML5."""
-    publish_cmdline(*args, **kwargs, writer=html5.Writer())
+    from .html5 import Writer
+    publish_cmdline(Writer(), *args, **kwargs)
 
 
 def publish_cmdline_slides(*args, **kwargs):
     """Convert RST to HTML5-based slides."""
-    publish_cmdline(*args, **kwargs, writer=slides.Writer())
+    from .slides import Writer
+    publish_cmdline(Writer(), *args, **kwargs)
 
 
 def publish_cmdline_impressjs(*args, **kwargs):
     """Convert RST to impress.js presentation."""
-    publish_cmdline(*args, **kwargs, writer=impressjs.Writer())
+    from .impressjs import Writer
+    publish_cmdline(Writer(), *args, **kwargs)
 
 
 def publish_cmdline_revealjs(*args, **kwargs):
     """Convert RST to reveal.js presentation."""
-    publish_cmdline(*args, **kwargs, writer=revealjs.Writer())
+    from .revealjs import Writer
+    publish_cmdline(Writer(), *args, **kwargs)
+
+
+def publish_cmdline_multi(*args, **kwargs):
+    """Convert RST with multiple writers."""
+    from .multi import publish_cmdline
+    sys.exit(publish_cmdline(*args, **kwargs))
+
+
+def serve_daemon(*args, **kwargs):
+    """Serve render requests over a local socket."""
+    from .daemon import main
+    main(*args, **kwargs)
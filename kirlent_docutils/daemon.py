@@ -0,0 +1,272 @@
+# Copyright 2023 H. Turgut Uyar <uyar@tekir.org>
+#
+# kirlent-docutils is released under the BSD license.
+# Read the included LICENSE.txt file for details.
+
+"""Long-running render server.
+
+The server keeps docutils, pygments and the writers imported in a pool
+of worker processes and renders documents sent over a local socket.
+
+Requests and responses are JSON objects, one per line. A request
+contains the source text (``source``) or the path of a source file
+(``source_path``), the name of the writer (``writer``), and optionally
+the settings overrides (``settings``), the names of the parts
+to return (``parts``) and an identifier (``id``) which is copied
+to the response. A response contains the rendered parts (``parts``)
+and the warnings (``warnings``), or an error message (``error``).
+Any number of requests can be sent over a connection, and requests
+on different connections are rendered concurrently.
+
+Since any local user can connect to the server, source files have
+to be under the root directory of the server, only the settings
+that don't read or write other files can be overridden, and the
+directives that insert files or raw content are disabled.
+"""
+
+import argparse
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .rendering import render_with_warnings
+from .utils import WRITERS
+
+
+default_port = 8765
+
+description = "Renders documents sent as JSON over a local socket."
+
+# settings that requests can override
+ALLOWED_SETTINGS = frozenset([
+    "attribution", "auto_id_prefix", "center_vertical",
+    "character_level_inline_markup", "cloak_email_addresses", "datestamp",
+    "docinfo_xform", "doctitle_xform", "embed_stylesheet",
+    "footnote_backlinks", "footnote_references", "generator", "halt_level",
+    "id_prefix", "initial_header_level", "keep_selectors",
+    "language_code", "math_output", "max_scale", "min_scale", "minify",
+    "pep_base_url", "pep_file_url_template", "pep_references",
+    "report_level", "rfc_base_url", "rfc_references", "section_self_link",
+    "sectnum_xform", "sectsubtitle_xform", "slide_size", "smart_quotes",
+    "smartquotes_locales", "source_link", "source_url", "strip_classes",
+    "strip_comments", "strip_elements_with_classes", "syntax_highlight",
+    "tab_width", "title", "toc_backlinks", "transition",
+    "transition_duration", "trim_footnote_reference_space",
+])
+
+# settings that are set for all requests, so that documents can't read
+# other files through directives
+FORCED_SETTINGS = {
+    "file_insertion_enabled": False,
+    "raw_enabled": False,
+}
+
+
+def _is_under(path, root):
+    path = os.path.realpath(path)
+    root = os.path.realpath(root)
+    return os.path.commonpath([path, root]) == root
+
+
+def _is_word(value):
+    return isinstance(value, str) and (len(value.split()) == 1)
+
+
+def _is_string_list(value):
+    return isinstance(value, list) and all(isinstance(v, str) for v in value)
+
+
+def handle_request(request, root=None):
+    """Get the response for a request.
+
+    If a root directory is given, source files have to be under it.
+    """
+    if not isinstance(request, dict):
+        return {"error": "request must be a JSON object"}
+    response = {"id": request["id"]} if "id" in request else {}
+    writer_name = request.get("writer")
+    if writer_name not in WRITERS:
+        response["error"] = f"unknown writer: {writer_name}"
+        return response
+    overrides = request.get("settings")
+    if overrides is not None:
+        if not isinstance(overrides, dict):
+            response["error"] = "settings must be a JSON object"
+            return response
+        rejected = sorted(set(overrides) - ALLOWED_SETTINGS)
+        # the options of the math output can be the path of a stylesheet
+        if ("math_output" in overrides) and \
+                (not _is_word(overrides["math_output"])):
+            rejected.append("math_output")
+        if len(rejected) > 0:
+            response["error"] = f"settings not allowed: {', '.join(rejected)}"
+            return response
+    names = request.get("parts")
+    if (names is not None) and (not _is_string_list(names)):
+        response["error"] = "parts must be a list of strings"
+        return response
+    source_path = request.get("source_path")
+    source = request.get("source")
+    try:
+        if (source_path is not None) and (root is not None) and \
+                (not _is_under(source_path, root)):
+            raise ValueError("source_path is not under the root directory")
+        if source is None:
+            if source_path is None:
+                raise ValueError("source or source_path is required")
+            with open(source_path, encoding="utf-8") as f:
+                source = f.read()
+        parts, warning_text = render_with_warnings(
+            source, writer_name,
+            settings_overrides={**(overrides or {}), **FORCED_SETTINGS},
+            source_path=source_path)
+    except (Exception, SystemExit) as e:
+        response["error"] = f"{e.__class__.__name__}: {e}"
+        return response
+    if names is not None:
+        parts = {name: parts[name] for name in names if name in parts}
+    response["parts"] = parts
+    response["warnings"] = warning_text
+    return response
+
+
+def _init_worker():
+    # load all writers and warm up the parser, the lexers and the settings
+    for name in WRITERS:
+        render_with_warnings(
+            "Title\n=====\n\n.. code:: python\n\n   pass\n", name)
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """Handler for the requests on a connection."""
+
+    def handle(self):
+        for line in self.rfile:
+            if line.strip() == b"":
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                response = {"error": f"invalid JSON: {e}"}
+            else:
+                response = self.server.submit(request)
+            self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+class PoolMixIn:
+    """Server that renders the requests in a pool of worker processes."""
+
+    def start_pool(self, jobs, root):
+        self.jobs, self.root = jobs, root
+        self.pool_lock = threading.Lock()
+        self.pool = self._new_pool()
+
+    def _new_pool(self):
+        pool = ProcessPoolExecutor(max_workers=self.jobs,
+                                   initializer=_init_worker)
+        # start all workers now instead of at the first requests
+        for future in [pool.submit(os.getpid) for _ in range(self.jobs)]:
+            future.result()
+        return pool
+
+    def submit(self, request):
+        """Get the response for a request from a worker."""
+        pool = self.pool
+        try:
+            return pool.submit(handle_request, request, self.root).result()
+        except BrokenProcessPool:
+            with self.pool_lock:
+                if self.pool is pool:  # not restarted by another request
+                    pool.shutdown(wait=False)
+                    self.pool = self._new_pool()
+            response = {"id": request["id"]} \
+                if isinstance(request, dict) and ("id" in request) else {}
+            response["error"] = "worker process failed"
+            return response
+
+
+class TCPServer(PoolMixIn, socketserver.ThreadingMixIn,
+                socketserver.TCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+if hasattr(socketserver, "UnixStreamServer"):
+    class UnixServer(PoolMixIn, socketserver.ThreadingMixIn,
+                     socketserver.UnixStreamServer):
+        daemon_threads = True
+
+
+def make_server(address, jobs=None, root=None):
+    """Create a server listening on an address.
+
+    The address is a path for a Unix domain socket, or a (host, port)
+    pair for a TCP socket. Source files have to be under the root
+    directory, which is the current directory by default.
+    """
+    if isinstance(address, str):
+        if os.path.exists(address):
+            os.unlink(address)  # left over from a previous run
+        server = UnixServer(address, RequestHandler)
+    else:
+        server = TCPServer(address, RequestHandler)
+    jobs = jobs if jobs else os.cpu_count()
+    server.start_pool(jobs, root if root is not None else os.getcwd())
+    return server
+
+
+def serve(address, jobs=None, root=None):
+    """Serve render requests until interrupted."""
+    server = make_server(address, jobs=jobs, root=root)
+    print(f"listening on {address}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.pool.shutdown()
+        if isinstance(address, str) and os.path.exists(address):
+            os.unlink(address)
+
+
+def request(address, **kwargs):
+    """Send a render request to a server and get the response."""
+    if isinstance(address, str):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    with sock:
+        sock.connect(address)
+        with sock.makefile("rwb") as f:
+            f.write(json.dumps(kwargs).encode("utf-8") + b"\n")
+            f.flush()
+            return json.loads(f.readline())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        "--socket", metavar="<path>",
+        help="path of the Unix domain socket to listen on")
+    parser.add_argument(
+        "--port", type=int, default=default_port,
+        help="localhost port to listen on if no socket is given "
+             "(default: %(default)s)")
+    parser.add_argument(
+        "--jobs", type=int, default=None,
+        help="number of worker processes (default: number of CPUs)")
+    parser.add_argument(
+        "--root", metavar="<dir>", default=None,
+        help="directory that source files have to be under "
+             "(default: current directory)")
+    args = parser.parse_args(argv)
+    address = args.socket if args.socket is not None else \
+        ("127.0.0.1", args.port)
+    serve(address, jobs=args.jobs, root=args.root)
@@ -0,0 +1,230 @@
+# Copyright 2023 H. Turgut Uyar <uyar@tekir.org>
+#
+# kirlent-docutils is released under the BSD license.
+# Read the included LICENSE.txt file for details.
+
+"""Caching and parallel highlighting of code.
+
+Docutils highlights code blocks and code roles while parsing,
+by splitting the code into tokens with Pygments. While highlighting
+is enabled here, the tokens are looked up in a store before running
+Pygments, and stored after running it. The store keeps the tokens
+in memory and, if a cache directory is given, also on disk, so that
+they can be used by later builds and other processes.
+
+The code blocks of a document can also be highlighted in parallel
+before it's parsed. The blocks are found with a simple scan of
+the source, so a block in an unusual form is only highlighted later,
+by the parser.
+"""
+
+import re
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+from multiprocessing import current_process
+
+import pygments
+from docutils import SettingsSpec, frontend
+from docutils.parsers.rst import roles
+from docutils.parsers.rst.directives import body
+from docutils.utils.code_analyzer import Lexer, LexerError
+
+from .cache import DiskCache, make_key
+
+
+class HighlightSettings(SettingsSpec):
+    """Command-line options for highlighting code."""
+
+    settings_spec = (
+        "Highlighting Options",
+        None,
+        (
+            (
+                'Directory for caching highlighted code. '
+                '(default: no caching)',
+                ["--highlight-cache-dir"],
+                {
+                    "metavar": "<dir>",
+                    "default": None,
+                }
+            ),
+            (
+                'Number of processes for highlighting the code blocks of '
+                'a document in parallel before parsing it. Not used in '
+                'batch mode. (default: 1, no parallel highlighting)',
+                ["--highlight-jobs"],
+                {
+                    "metavar": "<n>",
+                    "default": 1,
+                    "validator": frontend.validate_nonnegative_int,
+                }
+            ),
+        )
+    )
+
+
+def token_key(code, language, tokennames):
+    """Compute the key of the tokens of a code."""
+    return make_key(code, language, tokennames, pygments.__version__)
+
+
+def lex(code, language, tokennames):
+    """Get the tokens of a code as docutils would generate them."""
+    return list(Lexer(code, language, tokennames))
+
+
+class TokenStore:
+    """Store for the tokens of highlighted code."""
+
+    def __init__(self, cache=None):
+        self.cache = cache
+        self.memory = {}
+
+    def get(self, key):
+        tokens = self.memory.get(key)
+        if (tokens is None) and (self.cache is not None):
+            tokens = self.cache.get(key)
+            if tokens is not None:
+                self.memory[key] = tokens
+        return tokens
+
+    def set(self, key, tokens):
+        self.memory[key] = tokens
+        if self.cache is not None:
+            self.cache.set(key, tokens)
+
+
+# the store of the highlighting in effect
+_store = None
+
+
+class CachedLexer(Lexer):
+    """Lexer that gets its tokens from the current store."""
+
+    def __iter__(self):
+        if (self.lexer is None) or (_store is None):
+            yield from super().__iter__()
+            return
+        key = token_key(self.code, self.language, self.tokennames)
+        tokens = _store.get(key)
+        if tokens is None:
+            tokens = list(super().__iter__())
+            _store.set(key, tokens)
+        for classes, value in tokens:
+            # nodes might change their class lists
+            yield list(classes), value
+
+
+CODE_DIRECTIVE = re.compile(
+    r"(?P<indent> *)\.\. +(code|code-block|sourcecode)::"
+    r" *(?P<language>[^ ]*) *$"
+)
+
+
+def _indent(line):
+    return len(line) - len(line.lstrip(" "))
+
+
+def find_code_blocks(text):
+    """Get the codes and languages of the code blocks in a source."""
+    lines = text.expandtabs(8).split("\n")
+    blocks = []
+    for lineno, line in enumerate(lines):
+        match = CODE_DIRECTIVE.match(line)
+        if (match is None) or (match.group("language") == ""):
+            continue
+        marker_indent = len(match.group("indent"))
+        block = []
+        for next_line in islice(lines, lineno + 1, None):
+            if next_line.strip() and (_indent(next_line) <= marker_indent):
+                break
+            block.append(next_line)
+        # skip the options and the blank line before the content
+        i = 0
+        while (i < len(block)) and block[i].strip().startswith(":"):
+            i += 1
+        content = block[i:]
+        while content and not content[0].strip():
+            content.pop(0)
+        while content and not content[-1].strip():
+            content.pop()
+        if not content:
+            continue
+        dedent = min(_indent(c) for c in content if c.strip())
+        code = "\n".join(c[dedent:].rstrip() for c in content)
+        blocks.append((code, match.group("language")))
+    return blocks
+
+
+def _lex_job(job):
+    code, language, tokennames = job
+    try:
+        return lex(code, language, tokennames)
+    except LexerError:
+        return None
+
+
+def prehighlight(store, text, tokennames, jobs):
+    """Highlight the code blocks of a source in parallel."""
+    pending = {}
+    for code, language in find_code_blocks(text):
+        key = token_key(code, language, tokennames)
+        if (key not in pending) and (store.get(key) is None):
+            pending[key] = (code, language, tokennames)
+    if len(pending) == 0:
+        return 0
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        results = executor.map(_lex_job, pending.values(),
+                               chunksize=max(1, len(pending) // (jobs * 4)))
+        for key, tokens in zip(pending, results):
+            if tokens is not None:
+                store.set(key, tokens)
+    return len(pending)
+
+
+def _read_source(settings):
+    source = getattr(settings, "_source", None)
+    if source in (None, "-"):
+        return None
+    try:
+        with open(source, encoding=settings.input_encoding or "utf-8-sig") \
+                as f:
+            return f.read()
+    except (OSError, UnicodeError, LookupError):
+        return None
+
+
+def get_cache(settings):
+    """Get the highlighting cache configured in the settings."""
+    cache_dir = getattr(settings, "highlight_cache_dir", None)
+    if cache_dir is None:
+        return None
+    return DiskCache(cache_dir, max_size=getattr(settings, "cache_size", None))
+
+
+@contextmanager
+def highlighting(settings, cache=None):
+    """Highlight code using a store for the tokens.
+
+    The code blocks of the source are highlighted in parallel first
+    if the settings ask for it, unless this is a worker process.
+    """
+    global _store
+    jobs = getattr(settings, "highlight_jobs", 1) or 1
+    if (cache is None) and (jobs <= 1):
+        yield None
+        return
+
+    store = TokenStore(cache)
+    if (jobs > 1) and (not current_process().daemon):
+        text = _read_source(settings)
+        if text is not None:
+            prehighlight(store, text, settings.syntax_highlight, jobs)
+
+    saved = body.Lexer, roles.Lexer, _store
+    body.Lexer, roles.Lexer, _store = CachedLexer, CachedLexer, store
+    try:
+        yield store
+    finally:
+        body.Lexer, roles.Lexer, _store = saved
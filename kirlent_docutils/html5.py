@@ -13,15 +13,23 @@ The differences are:
 - Removes some docutils-specific classes.
 """
 
+import os
 import re
+import time
+from collections import Counter
 from functools import partial
+from itertools import chain
 from pathlib import Path
+from urllib.request import url2pathname
 
-from docutils import frontend
+import docutils
+from docutils import frontend, io, languages, nodes, writers
 from docutils.writers.html5_polyglot import HTMLTranslator as HTML5Translator
 from docutils.writers.html5_polyglot import Writer as HTML5Writer
 
-from .utils import stylesheet_dirs_option, stylesheet_path_option
+from .images import encode_image, probe_size
+from .utils import stylesheet_dirs_option, stylesheet_path_option, \
+    validate_compression_level, write_gzip_sidecars
 
 
 class Writer(HTML5Writer):
@@ -54,9 +62,322 @@ class Writer(HTML5Writer):
         stylesheet_dirs=stylesheet_dirs_option(default_stylesheet_dirs),
     )
 
+    settings_spec = settings_spec + (
+        "Kirlent Output Options",
+        "",
+        (
+            (
+                'Also write gzip compressed copies of the output file and '
+                'of the linked stylesheets under its directory, at '
+                'the given compression level. (default: 0, no compression)',
+                ["--gzip-level"],
+                {
+                    "metavar": "<0-9>",
+                    "default": 0,
+                    "validator": validate_compression_level,
+                }
+            ),
+            (
+                'Write the output file in chunks as the template is filled, '
+                'without joining the whole document in memory. '
+                'Outputs written this way are not stored in the build cache.',
+                ["--stream-output"],
+                {
+                    "action": "store_true",
+                    "validator": frontend.validate_boolean,
+                }
+            ),
+            (
+                'Minify the output by removing whitespace that is not '
+                'rendered, and by minifying the embedded stylesheets and '
+                'scripts. The contents of "pre" elements are not changed. '
+                'Minified outputs are not written in chunks.',
+                ["--minify"],
+                {
+                    "action": "store_true",
+                    "validator": frontend.validate_boolean,
+                }
+            ),
+            (
+                'Remove the rules of embedded stylesheets that don\'t match '
+                'any element of the document. Names mentioned in the scripts '
+                'of the document are considered used, so that the rules for '
+                'elements created by the scripts are kept.',
+                ["--prune-stylesheets"],
+                {
+                    "action": "store_true",
+                    "validator": frontend.validate_boolean,
+                }
+            ),
+            (
+                'Comma separated list of class names, ids and tag names '
+                'whose rules are kept when pruning stylesheets.',
+                ["--keep-selectors"],
+                {
+                    "metavar": "<name[,name,...]>",
+                    "default": [],
+                    "validator": frontend.validate_comma_separated_list,
+                }
+            ),
+            (
+                'Write the call counts and times of the translator methods '
+                'and of the node types into a JSON file. Outputs are not '
+                'taken from the build cache when profiling.',
+                ["--profile-visitors"],
+                {
+                    "metavar": "<file>",
+                    "default": None,
+                }
+            ),
+            (
+                'Directory for caching math converted from LaTeX with the '
+                'HTML and MathML math output modes. These modes convert all '
+                'math at build time, so no MathJax script is needed. '
+                '(default: no caching)',
+                ["--math-cache-dir"],
+                {
+                    "metavar": "<dir>",
+                    "default": None,
+                }
+            ),
+            (
+                'Embed local images smaller than the given number of bytes '
+                'as data URIs. An image that is used more than once is '
+                'embedded once in an SVG symbol and referenced from its uses. '
+                '(default: 0, no embedding)',
+                ["--embed-images-below"],
+                {
+                    "metavar": "<bytes>",
+                    "default": 0,
+                    "validator": frontend.validate_nonnegative_int,
+                }
+            ),
+            (
+                'Number of processes for translating the top-level sections '
+                'of a document in parallel. Not used in batch mode or when '
+                'profiling. (default: 1, no parallel translation)',
+                ["--translate-jobs"],
+                {
+                    "metavar": "<n>",
+                    "default": 1,
+                    "validator": frontend.validate_nonnegative_int,
+                }
+            ),
+            (
+                'Parse and translate the top-level sections of a source '
+                'file one at a time, so that memory use grows with the size '
+                'of the largest section instead of the whole document. '
+                'Not used when minifying, pruning stylesheets, loading '
+                'slides on demand, caching the output, profiling visitors '
+                'or translating in parallel. Documents with a table of '
+                'contents or section numbering are converted as a whole.',
+                ["--incremental"],
+                {
+                    "action": "store_true",
+                    "validator": frontend.validate_boolean,
+                }
+            ),
+        )
+    )
+
+    # size of the pieces written to the destination when streaming
+    stream_chunk_size = 64 * 1024
+
+    template_field = re.compile(r"%\((\w+)\)s|%%")
+
+    embedded_style = re.compile(r"(<style>\n*)(.*)(\n*</style>\n*)",
+                                re.DOTALL)
+
     def __init__(self):
         super().__init__()
         self.translator_class = HTMLTranslator
+        self.streaming = False
+        self.body_file = None  # body written by incremental conversion
+
+    def write(self, document, destination):
+        settings = document.settings
+        self.streaming = getattr(settings, "stream_output", False) and \
+            (not getattr(settings, "minify", False)) and \
+            isinstance(destination, io.FileOutput)
+        if not self.streaming:
+            output = super().write(document, destination)
+        else:
+            # same as the base class but without the joined output
+            self.document = document
+            self.language = languages.get_language(
+                document.settings.language_code, document.reporter)
+            self.destination = destination
+            self.translate()
+            self.write_stream(destination)
+            output = None
+        if document.settings.gzip_level:
+            write_gzip_sidecars(document.settings,
+                                destination.destination_path)
+        return output
+
+    def translate(self):
+        settings = self.document.settings
+        if settings.math_cache_dir is None:
+            return self.translate_document()
+
+        from .mathcache import caching_math, get_cache
+        with caching_math(get_cache(settings)):
+            return self.translate_document()
+
+    def translate_document(self):
+        """Translate the document, with profiling if requested."""
+        profile_path = self.document.settings.profile_visitors
+        if profile_path is None:
+            jobs = getattr(self.document.settings, "translate_jobs", 1) or 1
+            if jobs <= 1:
+                return super().translate()
+            return self.translate_parallel(jobs)
+
+        from .profiling import VisitorProfile, profiled
+        profile = VisitorProfile()
+        translator_class = self.translator_class
+        self.translator_class = profiled(translator_class, profile)
+        start = time.perf_counter()
+        try:
+            super().translate()
+        finally:
+            self.translator_class = translator_class
+        profile.total = time.perf_counter() - start
+        profile.save(profile_path)
+
+    def translate_parallel(self, jobs):
+        """Translate the document, with its sections in parallel."""
+        from .parallel import walkabout
+        self.visitor = visitor = self.translator_class(self.document)
+        walkabout(self.document, visitor, self.visitor_attributes, jobs)
+        for attr in self.visitor_attributes:
+            setattr(self, attr, getattr(visitor, attr))
+        self.output = self.apply_template()
+
+    def apply_template(self):
+        if self.document.settings.prune_stylesheets:
+            self.prune_stylesheets()
+        if self.streaming:
+            return None  # written later by write_stream
+        output = super().apply_template()
+        if self.document.settings.minify:
+            from .minify import minify_html
+            minified = minify_html(output)
+            saved = len(output.encode("utf-8")) - \
+                len(minified.encode("utf-8"))
+            # lazy slides are written into separate files
+            slides = getattr(self.visitor, "slide_contents", [])
+            for index, content in enumerate(slides):
+                slides[index] = minify_html(content)
+                saved += len(content.encode("utf-8")) - \
+                    len(slides[index].encode("utf-8"))
+            self.document.reporter.info(
+                f"Minified output, {saved} bytes saved.")
+            output = minified
+        return output
+
+    def prune_stylesheets(self):
+        """Remove the unused rules from the embedded stylesheets."""
+        from .pruning import prune_css, used_set
+
+        # lazy slides are written into separate files
+        slides = getattr(self.visitor, "slide_contents", [])
+        markup = "".join(chain(self.body_prefix, self.body_pre_docinfo,
+                               self.docinfo, self.body, self.body_suffix,
+                               slides))
+        used = used_set(markup, "".join(self.head),
+                        keep=self.document.settings.keep_selectors)
+        saved = 0
+        stylesheet = []
+        for item in self.stylesheet:
+            match = Writer.embedded_style.fullmatch(item)
+            if match is not None:
+                css = match.group(2)
+                pruned = prune_css(css, used)
+                saved += len(css.encode("utf-8")) - \
+                    len(pruned.encode("utf-8"))
+                item = match.group(1) + pruned + match.group(3)
+            stylesheet.append(item)
+        self.stylesheet = stylesheet
+        self.document.reporter.info(
+            f"Pruned stylesheets, {saved} bytes removed.")
+
+    def assemble_parts(self):
+        if not self.streaming:
+            super().assemble_parts()
+        else:
+            writers.Writer.assemble_parts(self)
+        self.parts["features"] = ",".join(sorted(self.visitor.features))
+
+    def iter_template(self):
+        """Generate the pieces of the output in order.
+
+        This gives the same text as applying the template
+        but without joining the parts.
+        """
+        settings = self.document.settings
+        with open(settings.template, encoding="utf-8") as fp:
+            template = fp.read()
+        subs = {
+            "encoding": settings.output_encoding,
+            "version": docutils.__version__,
+        }
+        pos = 0
+        for match in Writer.template_field.finditer(template):
+            yield template[pos:match.start()]
+            pos = match.end()
+            name = match.group(1)
+            if name is None:
+                yield "%"
+            elif name in subs:
+                yield subs[name]
+            elif (name == "body") and (self.body_file is not None):
+                yield from _file_pieces(self.body_file)
+            else:
+                yield from _rstripped(getattr(self, name))
+        yield template[pos:]
+
+    def write_stream(self, destination):
+        """Write the output to a file destination in chunks."""
+        autoclose = destination.autoclose
+        destination.autoclose = False
+        try:
+            buffer, size = [], 0
+            for piece in self.iter_template():
+                buffer.append(piece)
+                size += len(piece)
+                if size >= Writer.stream_chunk_size:
+                    destination.write("".join(buffer))
+                    buffer, size = [], 0
+            destination.write("".join(buffer))
+        finally:
+            destination.autoclose = autoclose
+            if autoclose:
+                destination.close()
+
+
+def _file_pieces(f):
+    # the contents of a file in pieces, without the trailing newlines
+    f.seek(0)
+    newlines = ""
+    for block in iter(partial(f.read, Writer.stream_chunk_size), ""):
+        text = block.rstrip("\n")
+        if text != "":
+            yield newlines + text
+            newlines = ""
+        newlines += block[len(text):]
+
+
+def _rstripped(pieces):
+    # the pieces of a part, as they would be after joining and
+    # stripping the trailing newlines
+    end = len(pieces)
+    while (end > 0) and (pieces[end - 1].rstrip("\n") == ""):
+        end -= 1
+    for i in range(end - 1):
+        yield pieces[i]
+    if end > 0:
+        yield pieces[end - 1].rstrip("\n")
 
 
 class HTMLTranslator(HTML5Translator):
@@ -92,24 +413,73 @@ class HTMLTranslator(HTML5Translator):
         "transition": {"docutils"},
     }
 
+    # whether the top-level sections can be translated independently
+    parallel_sections = True
+
     COLON_SPAN = '<span class="colon">:</span>'
 
+    # unwanted classes as sets for fast lookups, by tag name
+    _unwanted_classes = {tag: frozenset(names)
+                         for tag, names in UNWANTED_CLASSES.items()}
+
+    image_sprite = ('<svg aria-hidden="true" style="position: absolute; '
+                    'width: 0; height: 0; overflow: hidden">\n%(symbols)s'
+                    '</svg>\n')
+    image_symbol = ('<symbol id="%(id)s" viewBox="0 0 %(width)s %(height)s">'
+                    '<image href="%(uri)s" width="%(width)s" '
+                    'height="%(height)s"/></symbol>\n')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # add attributes to keep track of the features used in the document
+        self.features = set()
+
+        # add attributes to keep track of the embedded images
+        self.embed_limit = self.settings.embed_images_below
+        self._image_uses = Counter()
+        if self.embed_limit > 0:
+            # substitution definitions are not rendered
+            self._image_uses.update(
+                image["uri"] for image in self.document.findall(nodes.image)
+                if not isinstance(image.parent, nodes.substitution_definition)
+            )
+        self._image_symbols = {}
+
+    def section_state(self):
+        """Get the state that the next top-level section depends on."""
+        return {}
+
+    def restore_section_state(self, state):
+        """Restore the state that the next top-level section depends on."""
+        pass
+
     def starttag(self, node, *args, **kwargs):
+        attributes = node.attributes
+        if ("CLASS" not in kwargs) and ("class" not in kwargs) and \
+                ("classes" not in kwargs) and \
+                ("_custom" not in attributes) and \
+                ("_styles" not in attributes):
+            # nothing to change
+            return super().starttag(node, *args, **kwargs)
+
         # remove custom docutils classes
-        classes = kwargs.pop("CLASS", "").split()
-        classes.extend(kwargs.pop("class", "").split())
-        classes.extend(kwargs.pop("classes", []))
+        classes = []
+        for key in ("CLASS", "class"):
+            if key in kwargs:
+                classes.extend(kwargs.pop(key).split())
+        if "classes" in kwargs:
+            classes.extend(kwargs.pop("classes"))
         if len(classes) > 0:
-            unwanted = HTMLTranslator.UNWANTED_CLASSES.get(node.tagname, set())
-            to_remove = [c for c in classes if c in unwanted]
-            for classname in to_remove:
-                classes.remove(classname)
+            unwanted = HTMLTranslator._unwanted_classes.get(node.tagname)
+            if unwanted is not None:
+                classes = [c for c in classes if c not in unwanted]
             if len(classes) > 0:
                 kwargs["CLASS"] = " ".join(classes)
 
         # add custom styles and properties, if any
-        custom = node.attributes.pop("_custom", {})
-        styles = node.attributes.pop("_styles", {})
+        custom = attributes.pop("_custom", {})
+        styles = attributes.pop("_styles", {})
         if len(styles) > 0:
             custom["style"] = " ".join(f"{k}: {v};" for k, v in styles.items())
         kwargs.update(custom)
@@ -157,9 +527,104 @@ class HTMLTranslator(HTML5Translator):
         self.body[-1] = self.body[-1].replace(HTMLTranslator.COLON_SPAN, ':')
 
     def visit_math(self, node, *args, **kwargs):
+        self.features.add("math")
         if self.math_output == 'mathjax' and not self.math_header:
             try:
                 self.mathjax_url = self.math_output_options[0]
             except IndexError:
                 self.math_output_options = [self.mathjax_url]
         super().visit_math(node, *args, **kwargs)
+
+    def visit_image(self, node):
+        # record local images as dependencies
+        uri = node["uri"]
+        if "://" not in uri:
+            path = url2pathname(uri)
+            if os.path.isfile(path):
+                self.settings.record_dependencies.add(path)
+                if self.embed_image(node, path):
+                    return
+                if self.image_loading == "lazy":
+                    self.set_image_size(node, path)
+        if self.image_loading == "lazy":
+            custom = node.attributes.setdefault("_custom", {})
+            custom["decoding"] = "async"
+        super().visit_image(node)
+
+    def set_image_size(self, node, path):
+        """Set the size of an image from its file, unless it's given."""
+        if ("width" in node) or ("height" in node) or ("scale" in node):
+            return
+        try:
+            size = probe_size(path)
+        except OSError:
+            return
+        if size is not None:
+            custom = node.attributes.setdefault("_custom", {})
+            custom["width"], custom["height"] = size
+
+    def embed_image(self, node, path):
+        """Embed an image as a data URI if it's below the size limit.
+
+        An image that is used more than once is embedded in a symbol,
+        and its markup is generated here as a reference to the symbol.
+        Returns whether the markup has been generated.
+        """
+        if (self.embed_limit == 0) or (self.image_loading == "embed"):
+            return False
+        if os.path.getsize(path) >= self.embed_limit:
+            return False
+        encoded = encode_image(path)
+        if encoded is None:
+            return False
+        digest, data_uri = encoded
+        uri = node["uri"]
+        node["alt"] = node.get("alt", uri)
+        if (self._image_uses[uri] > 1) and ("scale" not in node):
+            size = probe_size(path)
+            if size is not None:
+                self.body.append(self.image_reference(node, digest, data_uri,
+                                                      size))
+                return True
+        node["uri"] = data_uri
+        return False
+
+    def image_reference(self, node, digest, data_uri, size):
+        """Generate the markup for an image that refers to a symbol."""
+        symbol_id = f"image-{digest}"
+        width, height = size
+        if symbol_id not in self._image_symbols:
+            self._image_symbols[symbol_id] = HTMLTranslator.image_symbol % {
+                "id": symbol_id,
+                "uri": data_uri,
+                "width": width,
+                "height": height,
+            }
+        atts = {"role": "img", "aria-label": node["alt"],
+                "viewBox": f"0 0 {width} {height}"}
+        styles = {}
+        for name in ("width", "height"):
+            if name in node:
+                value = node[name]
+                if re.match(r"^[0-9.]+$", value):
+                    value += "px"  # unitless values are in pixels
+                styles[name] = value
+        if len(styles) == 0:
+            atts["width"], atts["height"] = width, height
+        node.attributes["_styles"] = styles
+        if "align" in node:
+            atts["class"] = f"align-{node['align']}"
+        # no newline in inline context or in links, like other images
+        suffix = "" if isinstance(node.parent, nodes.TextElement) else "\n"
+        tag = self.starttag(node, "svg", "", **atts)
+        # attribute names are lowercased by starttag
+        tag = tag.replace(" viewbox=", " viewBox=", 1)
+        return f'{tag}<use href="#{symbol_id}"/></svg>{suffix}'
+
+    def depart_document(self, node):
+        if len(self._image_symbols) > 0:
+            symbols = "".join(self._image_symbols.values())
+            self.body_prefix.insert(1, HTMLTranslator.image_sprite % {
+                "symbols": symbols,
+            })
+        super().depart_document(node)
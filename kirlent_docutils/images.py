@@ -0,0 +1,148 @@
+# Copyright 2023 H. Turgut Uyar <uyar@tekir.org>
+#
+# kirlent-docutils is released under the BSD license.
+# Read the included LICENSE.txt file for details.
+
+"""Probing of image files."""
+
+import base64
+import hashlib
+import mimetypes
+import os
+import re
+import struct
+from xml.etree import ElementTree
+
+
+# probe results by path, valid while the modification time and size match
+_svg_probes = {}
+_size_probes = {}
+_encodings = {}
+
+
+def _cached_probe(cache, path, probe):
+    path = str(path)
+    st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = cache.get(path)
+    if (cached is not None) and (cached[0] == stamp):
+        return cached[1]
+    result = probe(path)
+    cache[path] = (stamp, result)
+    return result
+
+
+def _read_svg_root(path, chunk_size=4096):
+    parser = ElementTree.XMLPullParser(events=("start",))
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            parser.feed(chunk)
+            for _, element in parser.read_events():
+                return dict(element.attrib)
+    return {}
+
+
+def probe_svg(path):
+    """Get the attributes of the root element of an SVG file.
+
+    Only the beginning of the file is read, up to the end of the root
+    element's start tag. Results are cached for the lifetime of
+    the process and refreshed when the file changes.
+    """
+    return _cached_probe(_svg_probes, path, _read_svg_root)
+
+
+# SVG lengths in pixels, with or without the unit
+SVG_LENGTH = re.compile(r"\s*([0-9]*\.?[0-9]+)\s*(px)?\s*$")
+
+# JPEG start of frame markers
+JPEG_SOF = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def _svg_size(path):
+    attrs = _read_svg_root(path)
+    width = SVG_LENGTH.match(attrs.get("width", ""))
+    height = SVG_LENGTH.match(attrs.get("height", ""))
+    if (width is not None) and (height is not None):
+        return float(width.group(1)), float(height.group(1))
+    if ("width" in attrs) or ("height" in attrs):
+        return None  # relative or in other units
+    view_box = attrs.get("viewBox", "").replace(",", " ").split()
+    if len(view_box) != 4:
+        return None
+    return float(view_box[2]), float(view_box[3])
+
+
+def _jpeg_size(f):
+    f.seek(2)
+    while True:
+        marker = f.read(2)
+        if (len(marker) < 2) or (marker[0] != 0xFF):
+            return None
+        if marker[1] == 0xFF:  # fill byte
+            f.seek(-1, os.SEEK_CUR)
+            continue
+        if (marker[1] == 0x01) or (0xD0 <= marker[1] <= 0xD7):
+            continue  # markers without a segment
+        length = f.read(2)
+        if len(length) < 2:
+            return None
+        if marker[1] in JPEG_SOF:
+            data = f.read(5)
+            if len(data) < 5:
+                return None
+            height, width = struct.unpack(">HH", data[1:])
+            return width, height
+        f.seek(struct.unpack(">H", length)[0] - 2, os.SEEK_CUR)
+
+
+def _read_size(path):
+    with open(path, "rb") as f:
+        head = f.read(32)
+        if head.startswith(b"\x89PNG\r\n\x1a\n") and (head[12:16] == b"IHDR"):
+            return struct.unpack(">II", head[16:24])
+        if head[:6] in (b"GIF87a", b"GIF89a"):
+            return struct.unpack("<HH", head[6:10])
+        if head.startswith(b"\xff\xd8"):
+            return _jpeg_size(f)
+    if path.lower().endswith(".svg"):
+        try:
+            size = _svg_size(path)
+        except (ElementTree.ParseError, ValueError):
+            return None
+        if size is not None:
+            return round(size[0]), round(size[1])
+    return None
+
+
+def probe_size(path):
+    """Get the width and height of a PNG, JPEG, GIF or SVG image.
+
+    Only the header of the file is read. The result is None if the size
+    can't be found. Results are cached like those of ``probe_svg``.
+    """
+    return _cached_probe(_size_probes, path, _read_size)
+
+
+def _encode(path):
+    mimetype = mimetypes.guess_type(path)[0]
+    if mimetype is None:
+        return None
+    with open(path, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    data64 = base64.b64encode(data).decode()
+    return digest, f"data:{mimetype};base64,{data64}"
+
+
+def encode_image(path):
+    """Get the content digest and the data URI of an image.
+
+    The result is None if the type of the image is unknown. Results
+    are cached like those of ``probe_svg``, so each image is encoded
+    only once in a process.
+    """
+    return _cached_probe(_encodings, path, _encode)
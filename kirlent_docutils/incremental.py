@@ -0,0 +1,605 @@
+# Copyright 2023 H. Turgut Uyar <uyar@tekir.org>
+#
+# kirlent-docutils is released under the BSD license.
+# Read the included LICENSE.txt file for details.
+
+"""Incremental conversion of large documents.
+
+The source file is split at the titles of its top-level sections,
+and the parts are parsed, transformed and translated one at a time.
+The part before the first section, with the title and the docinfo,
+stays in memory as the document, but the tree of a section is released
+after it's translated, and its markup is written to a temporary file
+until the output is written. This way, memory use grows with the size
+of the largest section instead of the size of the whole document.
+
+The document-level state is carried from one part to the next: ids,
+names, counters and substitution definitions. Since a section can
+refer to the targets, footnotes and substitutions of a later
+section, the parts are first processed without translation to
+collect these. If the parts don't parse as expected, if anonymous
+hyperlinks or auto-numbered footnotes are matched across parts,
+or if the document uses transforms that need the whole document,
+like a table of contents or section numbering, the document is
+converted as a whole. So is a document with errors that stop
+the conversion, so that they are reported as usual.
+"""
+
+import copy
+import re
+import sys
+import tempfile
+from collections import Counter
+from itertools import islice
+
+from docutils import languages, nodes, utils
+from docutils.parsers import rst
+from docutils.parsers.rst import roles, states
+from docutils.statemachine import StringList, string2lines
+from docutils.transforms import misc, parts, references
+
+from .utils import write_gzip_sidecars
+
+
+# transforms that need all the sections of the document
+WHOLE_DOCUMENT_TRANSFORMS = (parts.Contents, parts.SectNum,
+                             references.TargetNotes)
+
+ADORNMENT = re.compile(r"""([!-/:-@[-`{-~])\1*$""")
+
+# lines that start body elements other than paragraphs
+BODY_START = re.compile(
+    r"([-+*•‣⁃]|\d+[.)]|#[.)]|\(\w+\)|\.\.|>>>|\|)( |$)"
+    r"|:[^:\s]|\+[-=]"
+)
+
+
+class _Unchanged(list):
+    # list that ignores the changes to it
+    def append(self, item):
+        pass
+
+    def remove(self, item):
+        pass
+
+
+# the node for the ids of the parts that have been released,
+# duplicate names found later don't change it
+RELEASED = nodes.Element()
+RELEASED["names"] = _Unchanged()
+RELEASED["dupnames"] = _Unchanged()
+
+
+def _adornment(line):
+    match = ADORNMENT.match(line.rstrip())
+    return match.group(1) if match is not None else None
+
+
+def _is_text(line, indented=False):
+    if (line.strip() == "") or (_adornment(line) is not None):
+        return False
+    if indented:
+        return True
+    return (not line[0].isspace()) and (BODY_START.match(line) is None)
+
+
+def find_titles(lines):
+    """Find the section titles in the lines of a source.
+
+    Returns the line numbers where the titles start, and their styles
+    as pairs of the adornment character and whether it has an overline.
+    Only the titles that are not indented are found.
+    """
+    titles = []
+    window = [None, None, None]  # the three lines before the current one
+    for lineno, line in enumerate(lines):
+        char = _adornment(line)
+        before, overline, text = window
+        if char is not None:
+            if (text is not None) and (overline is not None) and \
+                    (_adornment(overline) == char) and \
+                    ((before is None) or (before.strip() == "")) and \
+                    _is_text(text, indented=True):
+                titles.append((lineno - 2, (char, True)))
+            elif (text is not None) and \
+                    ((overline is None) or (overline.strip() == "")) and \
+                    _is_text(text) and \
+                    (len(line.rstrip()) >= min(4, len(text.rstrip()))):
+                titles.append((lineno - 1, (char, False)))
+        window = [overline, text, line]
+    return titles
+
+
+def top_level_style(titles, settings):
+    """Get the style of the titles of the top-level sections.
+
+    The first title is the document title if its style is not used
+    again, and the second is the subtitle in the same way.
+    """
+    styles = Counter(style for _, style in titles)
+    order = list(dict.fromkeys(style for _, style in titles))
+    level = 0
+    if settings.doctitle_xform:
+        for index in range(min(2, len(titles))):
+            style = titles[index][1]
+            if (order[level] != style) or (styles[style] > 1):
+                break
+            level += 1
+    return order[level] if level < len(order) else None
+
+
+def _read_lines(settings):
+    encoding = settings.input_encoding or "utf-8-sig"
+    errors = settings.input_encoding_error_handler
+    return open(settings._source, encoding=encoding, errors=errors)
+
+
+def iter_parts(settings, starts):
+    """Get the texts of the parts of a source and their line offsets.
+
+    The first part is the one before the first start, and it's empty
+    if the source starts with a section.
+    """
+    with _read_lines(settings) as f:
+        offset = 0
+        for start in starts + [None]:
+            lines = list(islice(f, start - offset)) if start is not None \
+                else f.readlines()
+            yield offset, "".join(lines)
+            offset = start
+
+
+class PartStateMachine(states.RSTStateMachine):
+    """State machine that continues with the title styles of a source."""
+
+    _memo = None
+
+    def __init__(self, *args, title_styles=None, **kwargs):
+        self.title_styles = title_styles
+        super().__init__(*args, **kwargs)
+
+    @property
+    def memo(self):
+        return self._memo
+
+    @memo.setter
+    def memo(self, memo):
+        # the memo is created when the parse starts
+        if (memo is not None) and (self.title_styles is not None):
+            memo.title_styles = self.title_styles
+        self._memo = memo
+
+
+class PartParser(rst.Parser):
+    """Parser for a part of a source.
+
+    The line numbers in the messages are the ones in the whole source.
+    The title styles of the sections in the parts are shared, so that
+    their levels are checked as in the whole source.
+    """
+
+    def parse(self, inputstring, document, offset=0, title_styles=None):
+        # same as the base class, but with the line offset
+        self.setup_parse(inputstring, document)
+        self.statemachine = PartStateMachine(
+            state_classes=self.state_classes,
+            initial_state=self.initial_state,
+            debug=document.reporter.debug_flag,
+            title_styles=title_styles)
+        lines = string2lines(inputstring,
+                             tab_width=document.settings.tab_width,
+                             convert_whitespace=True)
+        inputlines = StringList(
+            lines, items=[(document["source"], offset + i)
+                          for i in range(len(lines))])
+        limit = document.settings.line_length_limit
+        for i, line in enumerate(inputlines):
+            if len(line) > limit:
+                error = document.reporter.error(
+                    f"Line {offset + i + 1} exceeds the line-length-limit.")
+                document.append(error)
+                break
+        else:
+            self.statemachine.run(inputlines, document, input_offset=offset,
+                                  inliner=self.inliner)
+        if "" in roles._roles:
+            del roles._roles[""]
+        self.finish_parse()
+
+
+class DocumentState:
+    """Document-level state, carried from one part to the next."""
+
+    def __init__(self):
+        self.ids = {}
+        self.nameids = {}
+        self.nametypes = {}
+        self.id_counter = Counter()
+        self.autofootnote_start = 1
+        self.symbol_footnote_start = 0
+        self.substitution_defs = {}
+        self.substitution_names = {}
+        self.title_styles = []  # of the sections, from the top level
+
+        # collected from all parts
+        self.uris = {}  # names of external targets
+        self.backrefs = {}  # ids of the references to footnotes, citations
+        self.labels = {}  # numbers of the labeled auto-numbered footnotes
+        self.image_uses = Counter()
+
+    def attach(self, document):
+        """Make a new document use this state."""
+        for name in ("ids", "nameids", "nametypes", "id_counter",
+                     "autofootnote_start", "symbol_footnote_start",
+                     "substitution_defs", "substitution_names"):
+            setattr(document, name, getattr(self, name))
+
+    def detach(self, document):
+        """Take the state of a document and release its nodes."""
+        self.autofootnote_start = document.autofootnote_start
+        self.symbol_footnote_start = document.symbol_footnote_start
+        for node in document.findall(nodes.Element):
+            for node_id in node["ids"]:
+                self.ids[node_id] = RELEASED
+        for target in document.findall(nodes.target):
+            if "refuri" in target:
+                for name in target["names"]:
+                    self.uris[name] = target["refuri"]
+        for refs in (document.footnote_refs, document.citation_refs):
+            for name, found in refs.items():
+                self.backrefs.setdefault(name, []).extend(
+                    ref["ids"][0] for ref in found if len(ref["ids"]) > 0)
+        for footnote in document.findall(nodes.footnote):
+            if (footnote.get("auto") == 1) and \
+                    isinstance(footnote[0], nodes.label):
+                for name in footnote["names"]:
+                    self.labels[name] = footnote[0].astext()
+        for name, definition in self.substitution_defs.items():
+            if definition.parent is not None:
+                # don't keep the tree of the document
+                self.substitution_defs[name] = definition.deepcopy()
+        self.image_uses.update(
+            image["uri"] for image in document.findall(nodes.image)
+            if not isinstance(image.parent, nodes.substitution_definition)
+        )
+
+
+class LaterTargets:
+    """Targets and substitutions that are defined in later parts.
+
+    These are added to a document before it's transformed, so that its
+    references to them can be resolved, and they are removed after.
+    """
+
+    def __init__(self, document, final):
+        self.document = document
+        self.names, self.ids, self.substitutions = [], [], []
+        self.targets = []
+        self.duplicates = {}
+        # footnotes in other parts are not numbered by the transforms
+        local = {name for footnote in document.autofootnotes
+                 for name in footnote["names"]}
+        for name, refs in document.footnote_refs.items():
+            if (name in local) or (name not in final.labels):
+                continue
+            for ref in refs:
+                if ref.get("auto") == 1:
+                    ref += nodes.Text(final.labels[name])
+                    ref["refid"] = final.nameids[name]
+                    del ref["refname"]
+                    ref.resolved = True
+                    document.note_refid(ref)
+        for name in document.refnames:
+            if name not in final.nameids:
+                continue
+            if name in document.nameids:
+                if (final.nameids[name] is None) and \
+                        (document.nameids[name] is not None):
+                    # the name is duplicated in a later part
+                    self.duplicates[name] = document.nameids[name]
+                    document.nameids[name] = None
+                continue
+            node_id = final.nameids[name]
+            self.names.append(name)
+            document.nameids[name] = node_id
+            document.nametypes[name] = final.nametypes.get(name, True)
+            uri = final.uris.get(name)
+            if uri is not None:
+                target = nodes.target("", "", ids=[node_id], names=[name],
+                                      refuri=uri)
+                document.append(target)
+                self.targets.append(target)
+            if node_id not in document.ids:
+                self.ids.append(node_id)
+                document.ids[node_id] = RELEASED if uri is None else target
+        for node in document.findall(nodes.substitution_reference):
+            name = node["refname"]
+            if name not in final.substitution_defs:
+                name = final.substitution_names.get(name.lower())
+            if (name is None) or (name in document.substitution_defs):
+                continue
+            self.substitutions.append(name)
+            document.substitution_defs[name] = final.substitution_defs[name]
+            document.substitution_names[name.lower()] = name
+
+    def remove(self):
+        for name in self.names:
+            del self.document.nameids[name]
+            self.document.nametypes.pop(name, None)
+        for node_id in self.ids:
+            del self.document.ids[node_id]
+        for target in self.targets:
+            target.parent.remove(target)
+        for name in self.substitutions:
+            del self.document.substitution_defs[name]
+            del self.document.substitution_names[name.lower()]
+        self.document.nameids.update(self.duplicates)
+
+    def add_backrefs(self, final):
+        """Add the references from the other parts to the backrefs."""
+        for node in self.document.findall(
+                lambda n: isinstance(n, (nodes.footnote, nodes.citation))):
+            for name in node["names"]:
+                if len(final.backrefs.get(name, ())) > len(node["backrefs"]):
+                    node["backrefs"] = list(final.backrefs[name])
+
+
+class PartTransitions(misc.Transitions):
+    """Transitions in a part that is followed by other parts.
+
+    A transition at the end of the part is not at the end of
+    the document, so it's not an error.
+    """
+
+    def apply(self):
+        following = nodes.comment()
+        self.document.append(following)
+        super().apply()
+        self.document.remove(following)
+
+
+def _part_settings(settings, quiet):
+    part_settings = copy.copy(settings)
+    # the title, docinfo and decorations are only in the first part
+    part_settings.doctitle_xform = False
+    part_settings.docinfo_xform = False
+    part_settings.sectsubtitle_xform = False
+    part_settings.generator = None
+    part_settings.datestamp = None
+    part_settings.source_link = None
+    part_settings.source_url = None
+    if quiet:
+        part_settings.warning_stream = False
+        part_settings.halt_level = 5
+    return part_settings
+
+
+def _take_messages(document, messages):
+    # remove the section of the system messages and add them to the others
+    if (len(document.children) == 0) or \
+            ("system-messages" not in document[-1]["classes"]):
+        return messages
+    section = document.pop()
+    if messages is None:
+        return section
+    messages.extend(section.children[1:])
+    return messages
+
+
+class IncrementalPublisher:
+    """Publisher that converts a document part by part."""
+
+    def __init__(self, pub):
+        self.pub = pub
+        self.settings = pub.settings
+        self.parser = PartParser()
+        self.components = (pub.reader, self.parser, pub.writer)
+
+    def read(self, text, offset, state, settings, head, last, later=None):
+        """Parse and transform a part of the source.
+
+        Returns None if the part can't be converted on its own.
+        """
+        document = utils.new_document(self.settings._source, settings)
+        state.attach(document)
+        if head:
+            if text != "":
+                self.parser.parse(text, document, offset=offset)
+        else:
+            self.parser.parse(text, document, offset=offset,
+                              title_styles=state.title_styles)
+        if any(self.needs_whole_document(p, head)
+               for p in document.findall(nodes.pending)):
+            return None
+        if (not head) and (not self.is_section(document)):
+            return None
+        if self.spans_parts(document):
+            return None
+        targets = LaterTargets(document, later) if later is not None \
+            else None
+        transformer = document.transformer
+        transformer.populate_from_components(
+            self.components + (self.pub.destination,))
+        if not last:
+            transformer.transforms = [
+                (p, PartTransitions if t is misc.Transitions else t, n, k)
+                for p, t, n, k in transformer.transforms
+            ]
+        transformer.apply_transforms()
+        if targets is not None:
+            targets.remove()
+            targets.add_backrefs(later)
+        if head and any(isinstance(c, nodes.section)
+                        for c in document.children):
+            return None
+        return document
+
+    @staticmethod
+    def needs_whole_document(pending, head):
+        if pending.transform is parts.Contents:
+            # local contents in the head are for all sections
+            return head or ("local" not in pending.details)
+        return pending.transform in WHOLE_DOCUMENT_TRANSFORMS
+
+    @staticmethod
+    def spans_parts(document):
+        # anonymous references and auto-numbered footnotes are matched
+        # in order, so a part must have as many targets as references
+        anonymous = [n for n in document.findall(nodes.Element)
+                     if n.get("anonymous")]
+        numbered = [f for f in document.autofootnotes
+                    if len(f["names"]) == 0]
+        pairs = [
+            ([n for n in anonymous if isinstance(n, nodes.reference)],
+             [n for n in anonymous if isinstance(n, nodes.target)]),
+            ([r for r in document.autofootnote_refs if "refname" not in r],
+             numbered),
+            (document.symbol_footnote_refs, document.symbol_footnotes),
+        ]
+        return any(len(refs) != len(targets) for refs, targets in pairs)
+
+    @staticmethod
+    def is_section(document):
+        children = [c for c in document.children
+                    if not isinstance(c, nodes.system_message)]
+        return (len(children) == 1) and isinstance(children[0],
+                                                   nodes.section)
+
+    def collect(self, starts):
+        """Collect the state of the document without translating.
+
+        Returns None if the document has to be converted as a whole.
+        """
+        state = DocumentState()
+        quiet = _part_settings(self.settings, quiet=True)
+        head_settings = copy.copy(self.settings)
+        head_settings.warning_stream = False
+        head_settings.halt_level = 5
+        for index, (offset, text) in enumerate(iter_parts(self.settings,
+                                                          starts)):
+            settings = head_settings if index == 0 else quiet
+            document = self.read(text, offset, state, settings,
+                                 head=(index == 0),
+                                 last=(index == len(starts)))
+            if (document is None) or \
+                    (document.reporter.max_level >= self.settings.halt_level):
+                # the whole document reports the messages that halt
+                return None
+            state.detach(document)
+        return state
+
+    def publish(self, starts, final):
+        """Convert the document part by part and write the output.
+
+        Returns the highest level of the system messages, or None
+        if a part can't be converted on its own, in which case nothing
+        is written.
+        """
+        writer = self.pub.writer
+        state = DocumentState()
+        part_settings = _part_settings(self.settings, quiet=False)
+        max_level = 0
+        with tempfile.TemporaryFile("w+", encoding="utf-8",
+                                    newline="") as body_file:
+            parts_iter = iter_parts(self.settings, starts)
+            offset, text = next(parts_iter)
+            document = self.read(text, offset, state, self.settings,
+                                 head=True, last=False, later=final)
+            if document is None:
+                return None
+            max_level = document.reporter.max_level
+            visitor = writer.translator_class(document)
+            if visitor.embed_limit > 0:
+                visitor._image_uses = final.image_uses
+            messages = _take_messages(document, None)
+            visitor.dispatch_visit(document)
+            for child in document.children[:]:
+                child.walkabout(visitor)
+            state.detach(document)
+            for index, (offset, text) in enumerate(parts_iter, start=1):
+                part = self.read(text, offset, state, part_settings,
+                                 head=False, last=(index == len(starts)),
+                                 later=final)
+                if part is None:
+                    return None
+                messages = _take_messages(part, messages)
+                visitor.document = part
+                for child in part.children[:]:
+                    child.walkabout(visitor)
+                state.detach(part)
+                max_level = max(max_level, part.reporter.max_level)
+                body_file.write("".join(visitor.body))
+                del visitor.body[:]
+            visitor.document = document
+            if messages is not None:
+                # the messages are at the end, as in the whole document
+                document.append(messages)
+                messages.walkabout(visitor)
+            visitor.dispatch_departure(document)
+            body_file.write("".join(visitor.body))
+            del visitor.body[:]
+
+            writer.document = document
+            writer.language = languages.get_language(
+                self.settings.language_code, document.reporter)
+            writer.destination = self.pub.destination
+            writer.visitor = visitor
+            for attr in writer.visitor_attributes:
+                setattr(writer, attr, getattr(visitor, attr))
+            writer.streaming = True
+            writer.output = None
+            writer.body_file = body_file
+            try:
+                writer.write_stream(self.pub.destination)
+            finally:
+                writer.body_file = None
+        if self.settings.gzip_level:
+            write_gzip_sidecars(self.settings,
+                                self.pub.destination.destination_path)
+        return max_level
+
+
+def can_publish(settings):
+    """Check whether a document can be converted incrementally."""
+    return (settings._source not in (None, "-")) and \
+        (not getattr(settings, "minify", False)) and \
+        (not getattr(settings, "prune_stylesheets", False)) and \
+        (not getattr(settings, "lazy_slides", False)) and \
+        (getattr(settings, "cache_dir", None) is None) and \
+        (getattr(settings, "profile_visitors", None) is None) and \
+        ((getattr(settings, "translate_jobs", 1) or 1) <= 1)
+
+
+def publish_incremental(pub, enable_exit_status=False):
+    """Convert a document incrementally, if possible.
+
+    The publisher must have its settings and components set up.
+    Returns whether the document has been converted.
+    """
+    settings = pub.settings
+    if not can_publish(settings):
+        return False
+    with _read_lines(settings) as f:
+        titles = find_titles(f)
+    style = top_level_style(titles, settings)
+    starts = sorted({lineno for lineno, s in titles if s == style})
+    if len(starts) < 2:
+        return False
+
+    incremental = IncrementalPublisher(pub)
+    if pub.destination is None:
+        pub.set_destination()
+    final = incremental.collect(starts)
+    if final is None:
+        return False
+    if getattr(settings, "math_cache_dir", None) is None:
+        max_level = incremental.publish(starts, final)
+    else:
+        from .mathcache import caching_math, get_cache
+        with caching_math(get_cache(settings)):
+            max_level = incremental.publish(starts, final)
+    if max_level is None:
+        return False
+    if enable_exit_status and (max_level >= settings.exit_status_level):
+        sys.exit(max_level + 10)
+    return True
@@ -0,0 +1,103 @@
+# Copyright 2023 H. Turgut Uyar <uyar@tekir.org>
+#
+# kirlent-docutils is released under the BSD license.
+# Read the included LICENSE.txt file for details.
+
+"""Caching of converted math.
+
+With the "HTML" and "MathML" math output modes, docutils converts
+every formula from LaTeX while translating the document. While caching
+is enabled here, the converters are replaced with versions that look
+up the results in a persistent cache first. Only the results of
+successful conversions are stored; the warnings that an external
+converter reports are not repeated when its result is taken from
+the cache.
+"""
+
+import json
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import docutils
+from docutils.utils.math import latex2mathml, math2html, tex2mathml_extern
+
+from .cache import DiskCache, make_key
+
+
+# modules and names of the converters
+CONVERTERS = [
+    (math2html, "math2html"),
+    (latex2mathml, "tex2mathml"),
+    (tex2mathml_extern, "latexml"),
+    (tex2mathml_extern, "ttm"),
+    (tex2mathml_extern, "blahtexml"),
+    (tex2mathml_extern, "pandoc"),
+]
+
+
+# the cache of the current context
+_current = ContextVar("math_cache", default=None)
+
+# the original converters while they are replaced, and the number of users
+_patch_lock = threading.Lock()
+_saved = []
+_users = 0
+
+
+def _cached(name, converter):
+    def convert(math_code, *args, **kwargs):
+        cache = _current.get()
+        if cache is None:
+            return converter(math_code, *args, **kwargs)
+        # reporters are passed to external converters
+        params = [a for a in args if isinstance(a, (str, int, bool))]
+        options = {k: v for k, v in kwargs.items() if k != "reporter"}
+        # the HTML converter also has a global display mode
+        display = math2html.DocumentParameters.displaymode \
+            if name == "math2html" else None
+        key = make_key(name, math_code, json.dumps(params),
+                       json.dumps(options, sort_keys=True), display,
+                       docutils.__version__)
+        result = cache.get(key)
+        if result is None:
+            result = converter(math_code, *args, **kwargs)
+            cache.set(key, result)
+        return result
+    return convert
+
+
+def get_cache(settings):
+    """Get the math cache configured in the settings."""
+    cache_dir = getattr(settings, "math_cache_dir", None)
+    if cache_dir is None:
+        return None
+    return DiskCache(cache_dir, max_size=getattr(settings, "cache_size", None))
+
+
+@contextmanager
+def caching_math(cache):
+    """Take converted math from a cache.
+
+    The converters are replaced once while any context is active,
+    and each thread uses the cache of its own context.
+    """
+    global _users
+    with _patch_lock:
+        if _users == 0:
+            _saved[:] = [(module, name, getattr(module, name))
+                         for module, name in CONVERTERS]
+            for module, name, converter in _saved:
+                setattr(module, name, _cached(name, converter))
+        _users += 1
+    token = _current.set(cache)
+    try:
+        yield cache
+    finally:
+        _current.reset(token)
+        with _patch_lock:
+            _users -= 1
+            if _users == 0:
+                for module, name, converter in _saved:
+                    setattr(module, name, converter)
+                _saved.clear()
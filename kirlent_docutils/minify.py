@@ -0,0 +1,162 @@
+# Copyright 2023 H. Turgut Uyar <uyar@tekir.org>
+#
+# kirlent-docutils is released under the BSD license.
+# Read the included LICENSE.txt file for details.
+
+"""Minification of generated output.
+
+The minifiers only make changes that don't affect the rendering:
+
+- In markup, whitespace between tags is removed next to the tags of
+  block elements, and collapsed into one character elsewhere. Text is
+  not changed, and the contents of "pre" and "textarea" elements are
+  kept as they are.
+- In stylesheets, comments are removed, except the ones starting with
+  ``/*!``, and whitespace is collapsed or removed next to punctuation.
+- In scripts, indentation, blank lines and comment lines are removed.
+  Line breaks are kept since they can end statements. Scripts with
+  template literals are kept as they are.
+"""
+
+import re
+
+
+# elements whose contents are not changed as markup
+RAW_ELEMENT = re.compile(
+    r"(<(pre|textarea|script|style)\b[^>]*>)(.*?)(</\2\s*>)",
+    re.DOTALL | re.IGNORECASE,
+)
+
+TAG = re.compile(r"(<[^>]*>)")
+
+TAG_NAME = re.compile(r"</?([a-zA-Z][\w:-]*)")
+
+# tags next to which whitespace is not rendered
+BLOCK_TAGS = frozenset([
+    "!doctype", "address", "article", "aside", "blockquote", "body", "br",
+    "caption", "col", "colgroup", "dd", "details", "div", "dl", "dt",
+    "fieldset", "figcaption", "figure", "footer", "form", "h1", "h2", "h3",
+    "h4", "h5", "h6", "head", "header", "hr", "html", "li", "link", "main",
+    "meta", "nav", "ol", "p", "pre", "script", "section", "style",
+    "summary", "table", "tbody", "td", "tfoot", "th", "thead", "title", "tr",
+    "ul",
+])
+
+SCRIPT_TYPES = {"", "text/javascript", "module"}
+
+SCRIPT_TYPE = re.compile(r"""\btype=["']?([^"'\s>]*)""", re.IGNORECASE)
+
+CSS_TOKEN = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|/\*.*?\*/|\s+',
+                       re.DOTALL)
+
+# whitespace is not needed after the first and before the second group
+CSS_BEFORE = frozenset("{};,>:")
+CSS_AFTER = frozenset("{};,>")
+
+
+def minify_css(text):
+    """Minify a stylesheet."""
+    pieces = []  # whitespace as None
+    kept = set()  # indexes of the strings and comments
+    pos = 0
+    for match in CSS_TOKEN.finditer(text):
+        pieces.append(text[pos:match.start()])
+        pos = match.end()
+        token = match.group()
+        if token.startswith("/*"):
+            if token.startswith("/*!"):
+                kept.add(len(pieces))
+                pieces.append(token)
+        elif token[0] in "\"'":
+            kept.add(len(pieces))
+            pieces.append(token)
+        else:
+            pieces.append(None)
+    pieces.append(text[pos:])
+
+    result = []
+    last = ""  # last character written
+    for i, piece in enumerate(pieces):
+        if piece is None:
+            following = next((pieces[j] for j in range(i + 1, len(pieces))
+                              if pieces[j]), "")
+            if (last in CSS_BEFORE) or (last == "") or \
+                    (following[:1] in CSS_AFTER) or (following == "") or \
+                    (result[-1] == " "):
+                continue
+            piece = " "
+        elif piece == "":
+            continue
+        elif i not in kept:
+            if (piece[0] == "}") and (last == ";"):
+                result[-1] = result[-1][:-1]
+            piece = piece.replace(";}", "}")
+        result.append(piece)
+        last = piece[-1]
+    return "".join(result)
+
+
+def minify_js(text):
+    """Minify a script."""
+    if "`" in text:
+        return text
+    lines = []
+    for line in text.splitlines():
+        line = line.strip()
+        if (line != "") and (not line.startswith("//")):
+            lines.append(line)
+    return "\n".join(lines)
+
+
+def _raw_content(start_tag, name, content):
+    name = name.lower()
+    if name == "style":
+        return minify_css(content)
+    if name == "script":
+        match = SCRIPT_TYPE.search(start_tag)
+        script_type = match.group(1).lower() if match is not None else ""
+        if script_type in SCRIPT_TYPES:
+            return minify_js(content)
+    return content
+
+
+def _tag_name(token):
+    if token.startswith("<!"):
+        return token[1:].split(None, 1)[0].lower().rstrip(">")
+    match = TAG_NAME.match(token)
+    return match.group(1).lower() if match is not None else None
+
+
+def minify_html(text):
+    """Minify a document or a part of it."""
+    # tokens are (text, tag name), tag name is None for text
+    tokens = []
+    pos = 0
+    for match in RAW_ELEMENT.finditer(text):
+        tokens.extend(_markup_tokens(text[pos:match.start()]))
+        start_tag, name, content, end_tag = match.groups()
+        raw = start_tag + _raw_content(start_tag, name, content) + end_tag
+        tokens.append((raw, name.lower()))
+        pos = match.end()
+    tokens.extend(_markup_tokens(text[pos:]))
+
+    result = []
+    for i, (token, name) in enumerate(tokens):
+        if (name is None) and (token.strip() == ""):
+            before = tokens[i - 1][1] if i > 0 else "html"
+            after = tokens[i + 1][1] if i + 1 < len(tokens) else "html"
+            if (before in BLOCK_TAGS) or (after in BLOCK_TAGS):
+                continue
+            token = "\n" if "\n" in token else " "
+        result.append(token)
+    return "".join(result)
+
+
+def _markup_tokens(text):
+    for token in TAG.split(text):
+        if token == "":
+            continue
+        if token.startswith("<"):
+            yield token, _tag_name(token)
+        else:
+            yield token, None
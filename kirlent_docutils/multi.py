@@ -0,0 +1,139 @@
+# Copyright 2023 H. Turgut Uyar <uyar@tekir.org>
+#
+# kirlent-docutils is released under the BSD license.
+# Read the included LICENSE.txt file for details.
+
+"""Conversion of a document with multiple writers.
+
+The document is parsed and transformed only once. Every writer gets
+its own copy of the document tree and its own settings.
+"""
+
+import pickle
+import sys
+import warnings
+
+from docutils import frontend, io
+from docutils.core import Publisher, publish_doctree
+from docutils.parsers import rst
+from docutils.readers import doctree, standalone
+
+from .html5 import Writer as HTMLWriter
+from .utils import WRITERS, get_writer_class
+
+
+usage = "%prog [options] <source> <writer>:<destination> [writer options] " \
+    "[<writer>:<destination> [writer options] ...]"
+
+description = "Reads a reStructuredText document from <source> " \
+    "and writes it with every given writer to its <destination>. " \
+    "The options before the first writer apply to all writers. " \
+    "These can be reader and parser options, and the options of " \
+    "the HTML5 writer that all writers are based on. " \
+    "Writers: %(writers)s." % {"writers": ", ".join(WRITERS)}
+
+
+def _option_parser(*components, **kwargs):
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", category=DeprecationWarning)
+        return frontend.OptionParser(components=components, **kwargs)
+
+
+def publish_multiple(source_path, outputs, settings_overrides=None):
+    """Convert a document with multiple writers.
+
+    The outputs are given as a sequence of (writer, destination path,
+    settings overrides) triples. The writer can be a writer instance or
+    a writer name. The settings overrides are applied on top of
+    the common settings overrides. Returns the outputs of the writers.
+    """
+    common = dict(settings_overrides or {})
+    common.setdefault("traceback", True)
+    parse_settings = _option_parser(
+        standalone.Reader, rst.Parser, defaults=common,
+    ).get_default_values()
+    document = parse(source_path, parse_settings)
+
+    results = []
+    for writer, destination_path, overrides in outputs:
+        if isinstance(writer, str):
+            writer = get_writer_class(writer)()
+        settings = _option_parser(
+            standalone.Reader, rst.Parser, writer,
+            defaults={**common, **(overrides or {})},
+        ).get_default_values()
+        settings._source = source_path
+        results.append(render(document, writer, settings, destination_path))
+    return results
+
+
+def parse(source_path, settings):
+    """Parse and transform a document for use with multiple writers.
+
+    Returns the document tree in pickled form. Each writer should
+    unpickle its own copy.
+    """
+    document = publish_doctree(None, source_path=source_path,
+                               source_class=io.FileInput, settings=settings)
+    # these are replaced when the tree is used by a writer
+    document.reporter = None
+    document.transformer = None
+    document.settings = None
+    return pickle.dumps(document, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def render(document, writer, settings, destination_path,
+           enable_exit_status=False):
+    """Convert a pickled document tree with a writer."""
+    reader = doctree.Reader(parser_name="null")
+    pub = Publisher(reader, reader.parser, writer,
+                    source=io.DocTreeInput(pickle.loads(document)),
+                    destination_class=io.FileOutput, settings=settings)
+    pub.set_destination(destination_path=destination_path)
+    return pub.publish(enable_exit_status=enable_exit_status)
+
+
+def _split_args(argv):
+    # separate the common arguments from the arguments of each writer
+    common, outputs = [], []
+    for arg in argv:
+        name, sep, destination = arg.partition(":")
+        if (not arg.startswith("-")) and sep and (name in WRITERS):
+            outputs.append((name, destination, []))
+        elif len(outputs) == 0:
+            common.append(arg)
+        else:
+            outputs[-1][2].append(arg)
+    return common, outputs
+
+
+def publish_cmdline(argv=None):
+    """Convert a document with the writers given on the command line."""
+    if argv is None:
+        argv = sys.argv[1:]
+    common, outputs = _split_args(argv)
+    # all writers are based on the html5 writer
+    parse_settings = _option_parser(
+        standalone.Reader, rst.Parser, HTMLWriter(),
+        usage=usage, description=description, read_config_files=True,
+    ).parse_args(common)
+    if parse_settings._source is None:
+        sys.exit("A source file is required.")
+    if len(outputs) == 0:
+        sys.exit("At least one <writer>:<destination> is required.")
+
+    document = parse(parse_settings._source, parse_settings)
+
+    status = 0
+    for name, destination_path, args in outputs:
+        writer = get_writer_class(name)()
+        settings = _option_parser(
+            standalone.Reader, rst.Parser, writer,
+            usage=usage, description=description, read_config_files=True,
+        ).parse_args(common + args)
+        try:
+            render(document, writer, settings, destination_path,
+                   enable_exit_status=True)
+        except SystemExit as e:
+            status = max(status, e.code if isinstance(e.code, int) else 1)
+    return status
@@ -0,0 +1,183 @@
+# Copyright 2023 H. Turgut Uyar <uyar@tekir.org>
+#
+# kirlent-docutils is released under the BSD license.
+# Read the included LICENSE.txt file for details.
+
+"""Parallel translation of top-level sections.
+
+The nodes before the first top-level section, like the title and
+the docinfo, are translated in the main process. The rest of the
+document is split into batches of top-level sections, which are
+translated in worker processes. The markup they generate is appended
+to the output in document order.
+
+Some translators carry state from one section to the next, like the
+field data that the slide translators use for the next slide. The state
+a batch starts with is resolved before translation: the first batch
+starts with the state after the leading nodes, and the others with
+the state set by the field lists at the end of the previous section.
+A batch that started with a state other than the one the previous batch
+ended with, or whose markup can't be appended, is translated again
+in the main process, so the output is the same as that of a serial
+translation.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import current_process, get_all_start_methods, get_context
+
+from docutils import nodes, utils
+
+
+# number of batches for every process
+BATCHES_PER_JOB = 4
+
+# nodes that can set the state for the next section
+METADATA = (nodes.field_list, nodes.transition)
+
+# attributes that are set by the first node that needs them
+FIRST_SET = ("math_header",)
+
+# the document and the batches to translate, inherited by the workers
+_job = None
+
+
+def split_batches(children, count):
+    """Split nodes into batches that end after a section."""
+    sections = sum(1 for c in children if isinstance(c, nodes.section))
+    batches, start, seen = [], 0, 0
+    for i, child in enumerate(children):
+        if not isinstance(child, nodes.section):
+            continue
+        seen += 1
+        if seen * count >= (len(batches) + 1) * sections:
+            batches.append((start, i + 1))
+            start = i + 1
+    if start < len(children):
+        if len(batches) > 0:
+            batches[-1] = (batches[-1][0], len(children))
+        else:
+            batches.append((start, len(children)))
+    return batches
+
+
+def _trailing_metadata(section):
+    # field lists and transitions at the end of a section and its last child
+    trailing = []
+    for child in reversed(section.children):
+        if isinstance(child, nodes.section) and (len(trailing) == 0):
+            return _trailing_metadata(child)
+        if not isinstance(child, METADATA):
+            break
+        trailing.insert(0, child)
+    return trailing
+
+
+def start_states(visitor, children, batches):
+    """Resolve the states the batches start with.
+
+    The state of a batch is set by the metadata nodes at the end of
+    the section before it. These are translated with a separate
+    translator, starting with the empty state.
+    """
+    states = [visitor.section_state()]
+    scratch = visitor.__class__(visitor.document)
+    for start, _ in batches[1:]:
+        scratch.restore_section_state({})
+        for node in _trailing_metadata(children[start - 1]):
+            node.walkabout(scratch)
+        states.append(scratch.section_state())
+    return states
+
+
+def _translate_batch(index, state):
+    document, translator_class, offset, attributes, batches = _job
+    translator = translator_class(document)
+    initial = {name: list(getattr(translator, name)) for name in attributes}
+    translator.restore_section_state(state)
+    # dependencies are recorded by the main process
+    document.settings.record_dependencies = utils.DependencyList()
+
+    start, end = batches[index]
+    for child in document.children[offset + start:offset + end]:
+        child.walkabout(translator)
+
+    parts = {}
+    for name, before in initial.items():
+        after = getattr(translator, name)
+        if after[:len(before)] != before:
+            return None  # changed markup that is not its own
+        parts[name] = after[len(before):]
+    return {
+        "start": state,
+        "end": translator.section_state(),
+        "parts": parts,
+        "features": translator.features,
+        "symbols": translator._image_symbols,
+        "dependencies": document.settings.record_dependencies.list,
+    }
+
+
+def _merge(visitor, result):
+    for name, items in result["parts"].items():
+        target = getattr(visitor, name)
+        if (name not in FIRST_SET) or (len(target) == 0):
+            target.extend(items)
+    visitor.features.update(result["features"])
+    for symbol_id, symbol in result["symbols"].items():
+        visitor._image_symbols.setdefault(symbol_id, symbol)
+    visitor.restore_section_state(result["end"])
+    dependencies = visitor.document.settings.record_dependencies
+    if len(result["dependencies"]) > 0:
+        dependencies.add(*result["dependencies"])
+
+
+def can_fork():
+    """Check whether worker processes can be forked from this one."""
+    return ("fork" in get_all_start_methods()) and \
+        (not current_process().daemon)
+
+
+def walkabout(document, visitor, attributes, jobs):
+    """Translate a document, with its top-level sections in parallel.
+
+    The attributes are the names of the output lists of the translator.
+    """
+    global _job
+    children = document.children
+    offset = next((i for i, c in enumerate(children)
+                   if isinstance(c, nodes.section)), len(children))
+    batches = split_batches(children[offset:], jobs * BATCHES_PER_JOB)
+    if (len(batches) < 2) or (not visitor.parallel_sections) or \
+            (not can_fork()):
+        document.walkabout(visitor)
+        return
+
+    visitor.dispatch_visit(document)
+    for child in children[:offset]:
+        child.walkabout(visitor)
+
+    states = start_states(visitor, children[offset:], batches)
+    attributes = tuple(attributes) + FIRST_SET
+    _job = (document, visitor.__class__, offset, attributes, batches)
+    try:
+        with ProcessPoolExecutor(max_workers=jobs,
+                                 mp_context=get_context("fork")) as executor:
+            futures = [
+                executor.submit(_translate_batch, index, state)
+                for index, state in enumerate(states)
+            ]
+            for (start, end), future in zip(batches, futures):
+                try:
+                    result = future.result()
+                except Exception:
+                    result = None  # reported again by the serial translation
+                if (result is not None) and \
+                        (result["start"] == visitor.section_state()):
+                    _merge(visitor, result)
+                    continue
+                for child in children[offset + start:offset + end]:
+                    child.walkabout(visitor)
+    finally:
+        _job = None
+
+    visitor.dispatch_departure(document)
@@ -0,0 +1,107 @@
+# Copyright 2023 H. Turgut Uyar <uyar@tekir.org>
+#
+# kirlent-docutils is released under the BSD license.
+# Read the included LICENSE.txt file for details.
+
+"""Profiling of translator methods.
+
+A profiled translator is a subclass of the translator with all its
+visit and depart methods wrapped for timing, so the original
+translator is not affected when profiling is off.
+"""
+
+import json
+import time
+from functools import wraps
+
+
+class VisitorProfile:
+    """Call counts and wall times of translator methods and node types.
+
+    The time of a method includes the time of the methods it calls
+    directly, like ``visit_container`` called from ``depart_title``.
+    The time of a node type is the total time of the visit and depart
+    calls dispatched for the nodes of that type.
+    """
+
+    def __init__(self):
+        self.methods = {}  # name -> [calls, seconds]
+        self.nodes = {}  # type -> [visits, departures, seconds]
+        self.total = 0.0
+
+    def add_method(self, name, elapsed):
+        entry = self.methods.setdefault(name, [0, 0.0])
+        entry[0] += 1
+        entry[1] += elapsed
+
+    def add_node(self, node_type, elapsed, departure=False):
+        entry = self.nodes.setdefault(node_type, [0, 0, 0.0])
+        entry[1 if departure else 0] += 1
+        entry[2] += elapsed
+
+    def as_dict(self):
+        """Get the profile with the slowest entries first."""
+        methods = sorted(self.methods.items(), key=lambda e: -e[1][1])
+        nodes = sorted(self.nodes.items(), key=lambda e: -e[1][2])
+        return {
+            "seconds": self.total,
+            "methods": {
+                name: {"calls": calls, "seconds": seconds}
+                for name, (calls, seconds) in methods
+            },
+            "nodes": {
+                node_type: {
+                    "visits": visits,
+                    "departures": departures,
+                    "seconds": seconds,
+                }
+                for node_type, (visits, departures, seconds) in nodes
+            },
+        }
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.as_dict(), f, indent=2)
+            f.write("\n")
+
+
+def _timed(method, name, profile):
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            profile.add_method(name, time.perf_counter() - start)
+    return wrapper
+
+
+def profiled(translator_class, profile):
+    """Get a subclass of a translator that records into a profile."""
+    namespace = {}
+    for name in dir(translator_class):
+        if name.startswith(("visit_", "depart_")):
+            method = getattr(translator_class, name)
+            if callable(method):
+                namespace[name] = _timed(method, name, profile)
+
+    def dispatch_visit(self, node):
+        start = time.perf_counter()
+        try:
+            return translator_class.dispatch_visit(self, node)
+        finally:
+            profile.add_node(node.__class__.__name__,
+                             time.perf_counter() - start)
+
+    def dispatch_departure(self, node):
+        start = time.perf_counter()
+        try:
+            return translator_class.dispatch_departure(self, node)
+        finally:
+            profile.add_node(node.__class__.__name__,
+                             time.perf_counter() - start, departure=True)
+
+    namespace["dispatch_visit"] = dispatch_visit
+    namespace["dispatch_departure"] = dispatch_departure
+    return type(f"Profiled{translator_class.__name__}", (translator_class,),
+                namespace)
@@ -0,0 +1,233 @@
+# Copyright 2023 H. Turgut Uyar <uyar@tekir.org>
+#
+# kirlent-docutils is released under the BSD license.
+# Read the included LICENSE.txt file for details.
+
+"""Pruning of unused stylesheet rules.
+
+A selector is used if all the tag names, classes, ids and attribute
+values it requires are used in the document. The parts of a selector
+in parentheses are not taken into account, so a selector like
+``p:not(.a)`` is used if there is a "p" element. Since scripts create
+elements and set classes at run time, every name that is mentioned
+in the scripts of the document is also considered used. At-rules
+other than grouping rules like ``@media`` are kept as they are,
+and so are the top level comments that start with ``/*!``.
+"""
+
+import os
+import re
+from functools import lru_cache
+from urllib.request import url2pathname
+
+
+# names of elements that are always in a document
+DOCUMENT_TAGS = ("html", "head", "body")
+
+MARKUP_TAG = re.compile(r"<([a-zA-Z][\w-]*)")
+MARKUP_ATTR = re.compile(r"""\b([\w-]+)=["']([^"']*)["']""")
+
+SCRIPT = re.compile(r"<script\b([^>]*)>(.*?)</script\s*>", re.DOTALL)
+SCRIPT_SRC = re.compile(r"""\bsrc=["']([^"']*)["']""")
+
+SCRIPT_NAME = re.compile(r"[A-Za-z_][\w-]*")
+
+CSS_TOKEN = re.compile(
+    r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|/\*.*?\*/|[{};]',
+    re.DOTALL,
+)
+
+SELECTOR_NAME = re.compile(r"(::?|[.#]|)(-?[_a-zA-Z\\][\w\\-]*)")
+
+# values required by attribute selectors with the "=" or "~=" operators
+ATTRIBUTE_VALUE = re.compile(
+    r"""\[\s*[\w-]+\s*~?=\s*["']?([\w-]+)["']?\s*\]""")
+
+# at-rules whose blocks contain rules to prune
+GROUPING_RULES = ("@media", "@supports", "@layer", "@container", "@document")
+
+
+def _script_path(src):
+    if src.startswith("file://"):
+        return url2pathname(src[len("file://"):])
+    if ("://" in src) or src.startswith("data:"):
+        return None
+    return url2pathname(src)
+
+
+@lru_cache(maxsize=32)
+def _file_names(path, stamp):
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return frozenset(SCRIPT_NAME.findall(f.read()))
+
+
+def script_names(head):
+    """Get the names mentioned in the scripts of a document head.
+
+    The names in external scripts are also collected if the scripts
+    are local files.
+    """
+    names = set()
+    for attrs, code in SCRIPT.findall(head):
+        names.update(SCRIPT_NAME.findall(code))
+        match = SCRIPT_SRC.search(attrs)
+        if match is None:
+            continue
+        path = _script_path(match.group(1))
+        if (path is None) or (not os.path.isfile(path)):
+            continue
+        st = os.stat(path)
+        names.update(_file_names(path, (st.st_mtime_ns, st.st_size)))
+    return names
+
+
+def markup_names(markup):
+    """Get the tag names, classes and ids used in some markup.
+
+    Tag names are returned as they are, classes with a leading ".",
+    ids with a leading "#" and the words of other attribute values
+    with a leading "=".
+    """
+    names = set(DOCUMENT_TAGS)
+    names.update(tag.lower() for tag in MARKUP_TAG.findall(markup))
+    for attr, value in MARKUP_ATTR.findall(markup):
+        prefix = {"class": ".", "id": "#"}.get(attr, "=")
+        names.update(prefix + name for name in value.split())
+    return names
+
+
+def _outside(text, opening, closing):
+    # remove the parts between the opening and closing characters
+    result = []
+    depth = 0
+    for char in text:
+        if char in opening:
+            depth += 1
+        elif char in closing:
+            depth = max(0, depth - 1)
+        elif depth == 0:
+            result.append(char)
+    return "".join(result)
+
+
+def _split_selectors(prelude):
+    selectors = []
+    depth, start = 0, 0
+    for i, char in enumerate(prelude):
+        if char in "([":
+            depth += 1
+        elif char in ")]":
+            depth = max(0, depth - 1)
+        elif (char == ",") and (depth == 0):
+            selectors.append(prelude[start:i].strip())
+            start = i + 1
+    selectors.append(prelude[start:].strip())
+    return selectors
+
+
+def _required_names(selector):
+    selector = _outside(selector, "(", ")")
+    names = ["=" + value for value in ATTRIBUTE_VALUE.findall(selector)]
+    for prefix, name in SELECTOR_NAME.findall(_outside(selector, "[", "]")):
+        if prefix.startswith(":"):
+            continue
+        names.append(prefix + (name.lower() if prefix == "" else name))
+    return names
+
+
+def _is_used(selector, used, prefixes):
+    # scripts can build class names from prefixes like "navigate-"
+    return all((name in used) or name.startswith(prefixes)
+               for name in _required_names(selector))
+
+
+def _parse(css):
+    # rules are (prelude, body, children), children None if not grouping
+    rules, stack = [], []
+    start = 0
+    for match in CSS_TOKEN.finditer(css):
+        token = match.group()
+        if token.startswith("/*!") and (len(stack) == 0):
+            rules.append((token, None, None))  # license comment
+            continue
+        if token[0] not in "{};":
+            continue  # string or comment
+        if token == ";":
+            if (len(stack) == 0) or (stack[-1][1] is not None):
+                text = css[start:match.end()].strip()
+                target = rules if len(stack) == 0 else stack[-1][1]
+                if text.startswith("@"):
+                    target.append((text, None, None))
+                start = match.end()
+            continue
+        if token == "{":
+            prelude = _without_comments(css[start:match.start()]).strip()
+            if prelude.lower().startswith(GROUPING_RULES):
+                stack.append((prelude, [], None))
+                start = match.end()
+            else:
+                stack.append((prelude, None, match.end()))
+            continue
+        # token is "}"
+        if len(stack) == 0:
+            start = match.end()
+            continue
+        prelude, children, body_start = stack.pop()
+        if children is not None:
+            rule = (prelude, None, children)
+        elif (len(stack) > 0) and (stack[-1][1] is None):
+            continue  # nested block in a rule, like in "@font-face"
+        else:
+            rule = (prelude, css[body_start:match.start()].strip(), None)
+        target = rules if len(stack) == 0 else stack[-1][1]
+        target.append(rule)
+        start = match.end()
+    return rules
+
+
+def _without_comments(text):
+    return re.sub(r"/\*.*?\*/", "", text, flags=re.DOTALL)
+
+
+@lru_cache(maxsize=16)
+def parse_css(css):
+    """Parse a stylesheet into rules."""
+    return _parse(css)
+
+
+def _prune(rules, used, prefixes):
+    lines = []
+    for prelude, body, children in rules:
+        if children is not None:
+            inner = _prune(children, used, prefixes)
+            if len(inner) > 0:
+                lines.append(f"{prelude} {{\n{inner}\n}}")
+        elif body is None:
+            lines.append(prelude)  # statement, like "@import"
+        elif prelude.startswith("@"):
+            lines.append(f"{prelude} {{\n{body}\n}}")
+        else:
+            selectors = [s for s in _split_selectors(prelude)
+                         if _is_used(s, used, prefixes)]
+            if len(selectors) > 0:
+                lines.append(f"{', '.join(selectors)} {{\n{body}\n}}")
+    return "\n".join(lines)
+
+
+@lru_cache(maxsize=64)
+def prune_css(css, used):
+    """Remove the rules that don't match any of the used names.
+
+    The used names are in the form given by ``markup_names``.
+    """
+    prefixes = tuple(name for name in used
+                     if name.startswith(".") and name.endswith("-"))
+    return _prune(parse_css(css), used, prefixes)
+
+
+def used_set(markup, head, keep=()):
+    """Get the set of used names for a document."""
+    used = markup_names(markup)
+    for name in script_names(head) | set(keep):
+        used.update((name, name.lower(), "." + name, "#" + name, "=" + name))
+    return frozenset(used)
@@ -0,0 +1,99 @@
+# Copyright 2023 H. Turgut Uyar <uyar@tekir.org>
+#
+# kirlent-docutils is released under the BSD license.
+# Read the included LICENSE.txt file for details.
+
+"""Rendering documents into parts."""
+
+import copy
+import io
+import warnings
+
+from docutils import frontend
+from docutils.core import publish_parts
+from docutils.parsers import rst
+from docutils.readers import standalone
+
+from .utils import get_writer_class
+
+
+# settings of the writers, resolved once per process
+_settings = {}
+
+
+def _default_settings(writer):
+    name = writer.__class__.__module__
+    if name not in _settings:
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", category=DeprecationWarning)
+            option_parser = frontend.OptionParser(
+                components=(standalone.Reader, rst.Parser, writer),
+                read_config_files=True)
+        _settings[name] = option_parser.get_default_values()
+    return _settings[name]
+
+
+class Renderer:
+    """Renderer for documents with a writer.
+
+    The settings of the writer are resolved when the renderer is
+    created. Rendering a document then costs a copy of the settings
+    on top of the conversion, instead of building an option parser
+    from the settings specifications of the components for every
+    document like ``publish_parts`` does. The keyword arguments
+    are settings overrides for all documents. A renderer can be used
+    from multiple threads.
+    """
+
+    def __init__(self, writer="html5", **overrides):
+        self.writer_class = get_writer_class(writer)
+        self.settings = copy.deepcopy(_default_settings(self.writer_class()))
+        vars(self.settings).update(overrides)
+
+    def render(self, source, source_path=None, **overrides):
+        """Render a document and get its parts.
+
+        The keyword arguments are settings overrides for this document.
+        """
+        settings = copy.deepcopy(self.settings)
+        vars(settings).update(overrides)
+        return publish_parts(source=source, source_path=source_path,
+                             writer=self.writer_class(), settings=settings)
+
+
+# renderers of the writers, without overrides
+_renderers = {}
+
+
+def _renderer(writer):
+    renderer = _renderers.get(writer)
+    if renderer is None:
+        renderer = _renderers.setdefault(writer, Renderer(writer))
+    return renderer
+
+
+def render(source, writer="html5", *, source_path=None, **overrides):
+    """Render a document and get its parts.
+
+    The keyword arguments other than the source path are settings
+    overrides. Renders use a shared renderer for the writer.
+    """
+    return _renderer(writer).render(source, source_path=source_path,
+                                    **overrides)
+
+
+def render_with_warnings(source, writer_name, settings_overrides=None,
+                         source_path=None):
+    """Render a document and get its parts and warnings.
+
+    Errors are raised as exceptions instead of exiting.
+    """
+    warning_stream = io.StringIO()
+    overrides = {
+        **(settings_overrides or {}),
+        "warning_stream": warning_stream,
+        "traceback": True,
+    }
+    parts = _renderer(writer_name).render(source, source_path=source_path,
+                                          **overrides)
+    return parts, warning_stream.getvalue()
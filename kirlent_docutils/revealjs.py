@@ -5,13 +5,16 @@
 
 """reveal.js writer."""
 
+import re
+import sys
 from pathlib import Path
+from urllib.parse import quote
 
-from docutils import frontend
+from docutils import frontend, io
 
 from .slides import SlidesTranslator
 from .slides import Writer as SlidesWriter
-from .utils import stylesheet_path_option
+from .utils import stylesheet_path_option, write_gzip_sidecar
 
 
 REVEALJS_URL = "file://%(path)s" % {
@@ -25,7 +28,7 @@ REVEALJS_NOTES_URL = "file://%(path)s" % {
 REVEALJS_INIT = """
   window.addEventListener('DOMContentLoaded', () => {
       Reveal.initialize({
-          plugins: [RevealNotes],
+          plugins: [%(plugins)s],
           width: %(width)d,
           height: %(height)d,
           minScale: %(minScale)s,
@@ -36,6 +39,49 @@ REVEALJS_INIT = """
   }, false);
 """
 
+REVEALJS_LAZY = """
+  window.addEventListener('DOMContentLoaded', () => {
+      const requests = new Map();
+      const typeset = (slide) => {
+          if (window.MathJax === undefined) {
+              return Promise.resolve();
+          }
+          if (MathJax.typesetPromise !== undefined) {
+              return MathJax.typesetPromise([slide]);
+          }
+          if (MathJax.Hub !== undefined) {
+              return new Promise((resolve) =>
+                  MathJax.Hub.Queue(['Typeset', MathJax.Hub, slide], resolve));
+          }
+          return Promise.resolve();
+      };
+      const load = (slide) => {
+          if (!requests.has(slide)) {
+              const url = '%(base)s/' + slide.dataset.lazy + '.html';
+              requests.set(slide, fetch(url)
+                  .then((response) => response.text())
+                  .then((html) => {
+                      slide.innerHTML = html;
+                      return typeset(slide);
+                  }));
+          }
+          return requests.get(slide);
+      };
+      const loadNearby = () => {
+          const slides = Reveal.getSlides();
+          const current = slides.indexOf(Reveal.getCurrentSlide());
+          const nearby = slides
+              .slice(Math.max(0, current - %(distance)d), current + %(distance)d + 1)
+              .filter((slide) => slide.hasAttribute('data-lazy') && !requests.has(slide));
+          if (nearby.length > 0) {
+              Promise.all(nearby.map(load)).then(() => Reveal.sync());
+          }
+      };
+      Reveal.on('ready', loadNearby);
+      Reveal.on('slidechanged', loadNearby);
+  }, false);
+"""  # noqa
+
 
 class Writer(SlidesWriter):
     """Writer for generating reveal.js output."""
@@ -76,13 +122,64 @@ class Writer(SlidesWriter):
                     "validator": frontend.validate_boolean,
                 }
             ),
+            (
+                'Write the contents of the slides into separate files and '
+                'load them in the browser as the presenter moves, keeping '
+                'only empty slides in the output file. The files are written '
+                'into a directory named after the output file, which has '
+                'to be served over HTTP.',
+                ["--lazy-slides"],
+                {
+                    "action": "store_true",
+                    "validator": frontend.validate_boolean,
+                }
+            ),
         )
     )
 
+    lazy_file = re.compile(r"\d+\.html(\.gz)?")
+
     def __init__(self):
         super().__init__()
         self.translator_class = RevealJSTranslator
 
+    def write(self, document, destination):
+        settings = document.settings
+        settings._lazy_slides_dir = None
+        path = None
+        if isinstance(destination, io.FileOutput) and \
+                (destination.destination is not sys.stdout):
+            path = destination.destination_path
+        if getattr(settings, "lazy_slides", False):
+            if path is None:
+                document.reporter.warning(
+                    "Lazy slides need an output file, slides not separated.")
+            else:
+                settings._lazy_slides_dir = f"{Path(path).stem}_slides"
+        output = super().write(document, destination)
+        if settings._lazy_slides_dir is not None:
+            self.write_slides(Path(path).parent / settings._lazy_slides_dir)
+        return output
+
+    def write_slides(self, directory):
+        """Write the contents of the slides into a directory."""
+        directory.mkdir(parents=True, exist_ok=True)
+        contents = self.visitor.slide_contents
+        level = getattr(self.document.settings, "gzip_level", 0)
+        names = set()
+        for index, content in enumerate(contents):
+            name = f"{index}.html"
+            (directory / name).write_text(content, encoding="utf-8")
+            names.add(name)
+            if level:
+                write_gzip_sidecar(directory / name, level, force=True)
+                names.add(f"{name}.gz")
+        # remove the slides left over from previous builds
+        for path in directory.iterdir():
+            if Writer.lazy_file.fullmatch(path.name) and \
+                    (path.name not in names):
+                path.unlink()
+
 
 class RevealJSTranslator(SlidesTranslator):
     """Translator for generating reveal.js markup."""
@@ -92,15 +189,69 @@ class RevealJSTranslator(SlidesTranslator):
         "src": REVEALJS_NOTES_URL,
     }
     script_revealjs_init = SlidesTranslator.script % {"code": REVEALJS_INIT}
+    script_revealjs_lazy = SlidesTranslator.script % {"code": REVEALJS_LAZY}
 
     pause_class = "fragment"
 
+    # speaker notes in raw markup
+    raw_notes = re.compile(r"""<aside\b[^>]*\bclass=["']?[^"'>]*\bnotes\b""")
+
+    # number of slides loaded before and after the current slide
+    lazy_distance = 2
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
         self.center_vertical = self.document.settings.center_vertical
         self.transition = self.document.settings.transition
 
+        # add attributes to keep track of the separated slide contents
+        self.lazy_dir = getattr(self.document.settings,
+                                "_lazy_slides_dir", None)
+        self.slide_contents = []
+        self._slide_starts = []
+
+        # separated slides are numbered in document order
+        self.parallel_sections = self.lazy_dir is None
+
+    def visit_container(self, node):
+        if "notes" not in node["classes"]:
+            super().visit_container(node)
+            return
+        # generate speaker notes as reveal.js expects them
+        self.features.add("notes")
+        self.body.append(self.starttag(node, "aside"))
+
+    def depart_container(self, node):
+        if "notes" not in node["classes"]:
+            super().depart_container(node)
+            return
+        self.body.append('</aside>\n')
+
+    def visit_raw(self, node):
+        if ("html" in node.get("format", "").split()) and \
+                (RevealJSTranslator.raw_notes.search(node.astext())
+                 is not None):
+            self.features.add("notes")
+        super().visit_raw(node)
+
+    def visit_section(self, node):
+        super().visit_section(node)
+        if (self.lazy_dir is not None) and (self.section_level == 1):
+            self._slide_starts.append(len(self.body))
+
+    def depart_section(self, node):
+        super().depart_section(node)
+        if (self.lazy_dir is not None) and (self.section_level == 0):
+            # move the contents out, and mark the start tag with the index
+            start = self._slide_starts.pop()
+            index = len(self.slide_contents)
+            self.slide_contents.append("".join(self.body[start:-1]))
+            del self.body[start:-1]
+            tag = self.body[start - 1]
+            self.body[start - 1] = tag.replace(">", f' data-lazy="{index}">',
+                                               1)
+
     def visit_document(self, node):
         # add attributes for reveal.js
         node.attributes["classes"].append("reveal")
@@ -112,9 +263,12 @@ class RevealJSTranslator(SlidesTranslator):
         super().depart_document(node)
 
         # add code for reveal.js
+        notes = "notes" in self.features
         self.head.append(RevealJSTranslator.script_revealjs)
-        self.head.append(RevealJSTranslator.script_revealjs_notes)
+        if notes:
+            self.head.append(RevealJSTranslator.script_revealjs_notes)
         self.head.append(RevealJSTranslator.script_revealjs_init % {
+            "plugins": "RevealNotes" if notes else "",
             "width": self.slide_width,
             "height": self.slide_height,
             "minScale": self.min_scale,
@@ -122,3 +276,8 @@ class RevealJSTranslator(SlidesTranslator):
             "center": "true" if self.center_vertical else "false",
             "transition": self.transition,
         })
+        if self.lazy_dir is not None:
+            self.head.append(RevealJSTranslator.script_revealjs_lazy % {
+                "base": quote(self.lazy_dir),
+                "distance": RevealJSTranslator.lazy_distance,
+            })
@@ -6,12 +6,12 @@
 """Generic HTML5 slides writer."""
 
 from pathlib import Path
-from xml.etree import ElementTree
 
 from docutils import frontend, nodes
 
 from .html5 import HTMLTranslator
 from .html5 import Writer as HTMLWriter
+from .images import probe_svg
 from .utils import SCREEN_SIZES, stylesheet_path_option
 
 
@@ -19,21 +19,24 @@ ROUGH_NOTATION_URL = "file://%(path)s" % {
     "path": Path(__file__).parent / "bundled" / "rough-notation.iife.js",
 }
 
+# a single listener on the document also handles the annotations
+# in the slides that are loaded later
 ROUGH_NOTATION_SCRIPT = """
-  window.addEventListener('DOMContentLoaded', () => {
-      document.querySelectorAll('.annotation').forEach((el) =>
-          el.addEventListener('click', (event) => {
-              var a_type = "underline";
-              for (let i = 0; i < el.classList.length; i++) {
-                  const cl = el.classList.item(i);
-                  if (cl.startsWith('annotation-')) {
-                      a_type = cl.slice(11);
-                  }
-              }
-              const c = getComputedStyle(el).getPropertyValue('--color-annotation');
-              const a = RoughNotation.annotate(el, {type: a_type, color: c});
-              a.show();
-          }, false));
+  document.addEventListener('click', (event) => {
+      const el = event.target.closest('.annotation');
+      if (el === null) {
+          return;
+      }
+      var a_type = "underline";
+      for (let i = 0; i < el.classList.length; i++) {
+          const cl = el.classList.item(i);
+          if (cl.startsWith('annotation-')) {
+              a_type = cl.slice(11);
+          }
+      }
+      const c = getComputedStyle(el).getPropertyValue('--color-annotation');
+      const a = RoughNotation.annotate(el, {type: a_type, color: c});
+      a.show();
   }, false);
 """  # noqa
 
@@ -108,6 +111,9 @@ class SlidesTranslator(HTMLTranslator):
 
     data_attrs = set()
 
+    # fields that are used by the translator, other than the data attributes
+    used_fields = {"pause", "layout"}
+
     script_rough_notation = HTMLTranslator.script_defer % {
         "src": ROUGH_NOTATION_URL,
     }
@@ -127,9 +133,18 @@ class SlidesTranslator(HTMLTranslator):
         self._fields = {}
         self._field_name, self._field_body = None, None
 
+    def section_state(self):
+        # other fields are never used
+        used = SlidesTranslator.used_fields | self.__class__.data_attrs
+        return {k: v for k, v in self._fields.items() if k in used}
+
+    def restore_section_state(self, state):
+        self._fields = dict(state)
+
     def starttag(self, node, *args, **kwargs):
         pause = self._fields.pop("pause", None)
         if pause is not None:
+            self.features.add("pauses")
             node.attributes["classes"].append(self.__class__.pause_class)
         return super().starttag(node, *args, **kwargs)
 
@@ -142,9 +157,10 @@ class SlidesTranslator(HTMLTranslator):
     def depart_document(self, node):
         super().depart_document(node)
 
-        # add code for loading rough notation
-        self.head.append(SlidesTranslator.script_rough_notation)
-        self.head.append(SlidesTranslator.script_annotate)
+        # add code for loading rough notation, if there are annotations
+        if "annotations" in self.features:
+            self.head.append(SlidesTranslator.script_rough_notation)
+            self.head.append(SlidesTranslator.script_annotate)
 
     def depart_docinfo(self, node):
         # wrap docinfo in a slide with a title
@@ -218,6 +234,7 @@ class SlidesTranslator(HTMLTranslator):
         styles = {}
         layout = self._fields.pop("layout", None)
         if layout is not None:
+            self.features.add("layouts")
             slide_contents.attributes["classes"].append("grid")
             areas = " ".join(f"'{row}'" for row in layout.splitlines())
             styles["grid-template-areas"] = areas
@@ -243,6 +260,7 @@ class SlidesTranslator(HTMLTranslator):
             annotator = text[1] + text[-2]
             annotation_type = SlidesTranslator.annotation_types.get(annotator)
             if annotation_type is not None:
+                self.features.add("annotations")
                 tag = f'<span class="annotation annotation-{annotation_type}">'
                 self.body.append(tag)
                 child = nodes.Text(text[2:-2])
@@ -266,9 +284,10 @@ class SlidesTranslator(HTMLTranslator):
             uri = node.attributes["uri"]
             source = Path(self.document.settings._source).parent / uri
             if source.suffix == ".svg":
-                root = ElementTree.parse(source).getroot()
-                if root.attrib["id"].startswith("mermaid-"):
-                    height = float(root.attrib["height"])
+                self.settings.record_dependencies.add(str(source))
+                attrs = probe_svg(source)
+                if attrs.get("id", "").startswith("mermaid-"):
+                    height = float(attrs["height"])
                     scale = 3
                     node.attributes["height"] = str(round(height * scale))
         super().visit_image(node)
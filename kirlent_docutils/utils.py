@@ -3,13 +3,31 @@
 # kirlent-docutils is released under the BSD license.
 # Read the included LICENSE.txt file for details.
 
+import gzip
+import os
+import shutil
+from pathlib import Path
+
 import docutils
+from docutils import utils, writers
 
 
 SCREEN_SIZES = {
     "a4": (1125, 795),
 }
 
+WRITERS = {
+    "html5": "kirlent_docutils.html5",
+    "slides": "kirlent_docutils.slides",
+    "impressjs": "kirlent_docutils.impressjs",
+    "revealjs": "kirlent_docutils.revealjs",
+}
+
+
+def get_writer_class(name):
+    """Get a writer class by its short name or its module name."""
+    return writers.get_writer_class(WRITERS.get(name, name))
+
 
 def stylesheet_path_option(sheets):
     return (
@@ -40,3 +58,53 @@ def stylesheet_dirs_option(dirs):
             "default": dirs,
         }
     )
+
+
+def validate_compression_level(setting, value, *args, **kwargs):
+    value = int(value)
+    if not 0 <= value <= 9:
+        raise ValueError("must be between 0 and 9")
+    return value
+
+
+def write_gzip_sidecar(path, level, force=False):
+    """Write a gzip compressed copy of a file next to it.
+
+    Unless forced, the copy is skipped if it's newer than the file.
+    The data is streamed, so the file is never loaded into memory
+    as a whole.
+    """
+    sidecar = f"{path}.gz"
+    try:
+        if (not force) and \
+                (os.stat(sidecar).st_mtime_ns >= os.stat(path).st_mtime_ns):
+            return False
+    except FileNotFoundError:
+        pass
+    tmp = f"{sidecar}.tmp"
+    with open(path, "rb") as src, open(tmp, "wb") as raw:
+        with gzip.GzipFile(filename="", mode="wb", fileobj=raw,
+                           compresslevel=level, mtime=0) as dst:
+            shutil.copyfileobj(src, dst)
+    os.replace(tmp, sidecar)
+    return True
+
+
+def write_gzip_sidecars(settings, destination_path):
+    """Write gzip compressed copies of an output file and its assets.
+
+    The assets are the linked stylesheets under the directory
+    of the output file. The output file is always compressed again,
+    since it can change within the resolution of the timestamps,
+    but the copies of the assets are kept if they are newer.
+    """
+    if (destination_path is None) or (not os.path.isfile(destination_path)):
+        return
+    level = settings.gzip_level
+    write_gzip_sidecar(destination_path, level, force=True)
+    if not settings.embed_stylesheet:
+        root = Path(destination_path).parent.resolve()
+        for sheet in utils.get_stylesheet_list(settings):
+            path = Path(sheet).resolve()
+            if (root in path.parents) and path.is_file():
+                write_gzip_sidecar(path, level)
@@ -0,0 +1,176 @@
+# Copyright 2023 H. Turgut Uyar <uyar@tekir.org>
+#
+# kirlent-docutils is released under the BSD license.
+# Read the included LICENSE.txt file for details.
+
+"""Rebuilding documents when their sources change."""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+from docutils import SettingsSpec, frontend
+
+
+default_watch_interval = 0.5
+
+
+def validate_positive_float(setting, value, *args, **kwargs):
+    value = float(value)
+    if value <= 0:
+        raise ValueError("must be positive")
+    return value
+
+
+class WatchSettings(SettingsSpec):
+    """Command-line options for the watch mode."""
+
+    settings_spec = (
+        "Watch Options",
+        None,
+        (
+            (
+                'Keep running and convert the documents again when their '
+                'sources, included files, images or stylesheets change.',
+                ["--watch"],
+                {
+                    "action": "store_true",
+                    "validator": frontend.validate_boolean,
+                }
+            ),
+            (
+                'Seconds between checks for changes. (default: %(n)s)' % {
+                    "n": default_watch_interval,
+                },
+                ["--watch-interval"],
+                {
+                    "metavar": "<seconds>",
+                    "default": default_watch_interval,
+                    "validator": validate_positive_float,
+                }
+            ),
+        )
+    )
+
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class Watcher:
+    """Tracker for the files that the targets depend on.
+
+    Changes are detected by polling the modification times and sizes
+    of the files, so the cost of a check grows with the number of
+    files the targets depend on, and the cost of a rebuild grows with
+    the number of targets affected by the change.
+    """
+
+    def __init__(self):
+        self.dependencies = {}  # target -> paths
+        self.dependents = {}  # path -> targets
+        self.stats = {}  # path -> (mtime, size)
+
+    def update(self, target, paths):
+        """Set the paths a target depends on."""
+        paths = {os.path.abspath(p) for p in paths}
+        for path in self.dependencies.get(target, set()) - paths:
+            self.dependents[path].discard(target)
+            if len(self.dependents[path]) == 0:
+                del self.dependents[path], self.stats[path]
+        for path in paths:
+            if path not in self.dependents:
+                self.dependents[path] = set()
+                self.stats[path] = _stat(path)
+            self.dependents[path].add(target)
+        self.dependencies[target] = paths
+
+    def remove(self, target):
+        """Stop tracking a target."""
+        self.update(target, set())
+        self.dependencies.pop(target)
+
+    def poll(self):
+        """Get the targets with changed dependencies."""
+        changed = set()
+        for path, old in self.stats.items():
+            new = _stat(path)
+            if new != old:
+                self.stats[path] = new
+                changed.update(self.dependents[path])
+        return changed
+
+
+class TreeWatcher(Watcher):
+    """Tracker for the sources in a directory tree.
+
+    Directories are polled like files; only a changed directory
+    is scanned again to find new sources.
+    """
+
+    def __init__(self, root, pattern):
+        super().__init__()
+        self.root = Path(root)
+        self.pattern = pattern
+        self.directories = {}  # path -> (mtime, size)
+        self.sources = set()
+
+    def _scan(self, directory):
+        self.directories[directory] = _stat(directory)
+        found = {p for p in directory.glob(self.pattern) if p.is_file()}
+        for path in directory.iterdir():
+            if path.is_dir() and (path not in self.directories):
+                found.update(self._scan(path))
+        return found
+
+    def scan(self, directory=None):
+        """Get the new sources in a directory and its new subdirectories."""
+        found = self._scan(self.root if directory is None else directory)
+        new = found - self.sources
+        self.sources.update(new)
+        return new
+
+    def poll_sources(self):
+        """Get the sources that were added or removed."""
+        added, removed = set(), set()
+        for path, old in list(self.directories.items()):
+            new = _stat(path)
+            if new == old:
+                continue
+            if new is None:
+                del self.directories[path]
+            else:
+                added.update(self.scan(path))
+            removed.update(s for s in self.sources
+                           if (path in s.parents) and not s.is_file())
+        self.sources.difference_update(removed)
+        return added, removed
+
+
+def watch(watcher, build, interval, find_sources=None):
+    """Rebuild targets when their dependencies change.
+
+    The build function takes a target and returns the paths
+    the target depends on. Runs until interrupted.
+    """
+    try:
+        while True:
+            time.sleep(interval)
+            targets = watcher.poll()
+            if find_sources is not None:
+                added, removed = find_sources()
+                for target in removed & set(watcher.dependencies):
+                    watcher.remove(target)
+                targets = (targets - removed) | added
+            for target in sorted(targets):
+                start = time.perf_counter()
+                watcher.update(target, build(target))
+                elapsed = time.perf_counter() - start
+                print(f"{target}: rebuilt in {elapsed:.2f}s", file=sys.stderr)
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,110 @@
+import pytest
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from kirlent_docutils.aio import AsyncRenderer, render_async
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lock = threading.Lock()
+        self.active, self.max_active = 0, 0
+
+    def submit(self, fn, *args, **kwargs):
+        def counted():
+            with self.lock:
+                self.active += 1
+                self.max_active = max(self.max_active, self.active)
+            try:
+                time.sleep(0.05)
+                return fn(*args, **kwargs)
+            finally:
+                with self.lock:
+                    self.active -= 1
+        return super().submit(counted)
+
+
+def test_render_async_should_return_parts():
+    parts = asyncio.run(render_async("text\n", "html5"))
+    assert "<p>text</p>" in parts["body"]
+
+
+def test_render_async_should_apply_settings():
+    parts = asyncio.run(render_async("text\n", "revealjs", transition="zoom"))
+    assert "transition: 'zoom'" in parts["whole"]
+
+
+def test_render_async_should_raise_errors():
+    with pytest.raises(Exception, match="missing.rst"):
+        asyncio.run(render_async(".. include:: missing.rst\n"))
+
+
+def test_renderer_should_limit_renders_in_progress():
+    executor = CountingExecutor(max_workers=6)
+    renderer = AsyncRenderer(executor=executor, max_in_flight=2)
+
+    async def main():
+        return await asyncio.gather(*[renderer.render(f"text {i}\n") for i in range(6)])
+
+    results = asyncio.run(main())
+    assert len(results) == 6
+    assert executor.max_active == 2
+    renderer.shutdown()
+
+
+def test_renderer_should_time_out_and_free_its_slot():
+    blocker = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=1)
+    executor.submit(blocker.wait)
+    renderer = AsyncRenderer(executor=executor, max_in_flight=1)
+
+    async def main():
+        with pytest.raises(asyncio.TimeoutError):
+            await renderer.render("text\n", timeout=0.1)
+        blocker.set()
+        return await renderer.render("text\n", timeout=5)
+
+    parts = asyncio.run(main())
+    assert "<p>text</p>" in parts["body"]
+    renderer.shutdown()
+
+
+def test_renderer_should_keep_slot_until_running_render_finishes():
+    blocker = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=2)
+    renderer = AsyncRenderer(executor=executor, max_in_flight=1)
+    started = threading.Event()
+
+    def slow(*args):
+        started.set()
+        blocker.wait()
+
+    async def main():
+        renderer.executor.submit = lambda fn, *args: ThreadPoolExecutor.submit(executor, slow)
+        task = asyncio.ensure_future(renderer.render("text\n"))
+        while not started.is_set():
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        del renderer.executor.submit
+        waiting = asyncio.ensure_future(renderer.render("text\n"))
+        await asyncio.sleep(0.1)
+        assert not waiting.done()
+        blocker.set()
+        return await waiting
+
+    parts = asyncio.run(main())
+    assert "<p>text</p>" in parts["body"]
+    renderer.shutdown()
+
+
+def test_renderer_should_work_with_process_pool():
+    renderer = AsyncRenderer(executor=ProcessPoolExecutor(max_workers=1))
+    parts = asyncio.run(renderer.render("text\n", "slides"))
+    assert "<p>text</p>" in parts["body"]
+    renderer.shutdown()
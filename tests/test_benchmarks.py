@@ -0,0 +1,42 @@
+from benchmarks import api, compare, deck, phases
+
+
+def test_deck_should_have_given_number_of_slides():
+    text = deck.generate(12)
+    assert text.count("\n----\n") == 12
+
+
+def test_deck_should_be_written_with_its_image(tmp_path):
+    source = deck.write_deck(tmp_path, 3)
+    assert source.exists()
+    assert (tmp_path / deck.IMAGE_NAME).exists()
+
+
+def test_phases_should_be_timed_for_every_writer(tmp_path):
+    data = phases.run([6], repeat=1)
+    assert [r["writer"] for r in data["results"]] == ["html5", "slides", "impressjs", "revealjs"]
+    for result in data["results"]:
+        assert all(result[phase] > 0 for phase in phases.PHASES)
+
+
+def test_compare_should_report_slower_phase_as_regression():
+    timings = {"parse": 0.1, "transform": 0.1, "translate": 0.1, "assemble": 0.1, "total": 0.4}
+    old = {"results": [{"writer": "html5", "slides": 10, **timings}]}
+    new = {"results": [{"writer": "html5", "slides": 10, **timings, "translate": 0.2, "total": 0.5}]}
+    _, regressions = compare.compare(old, new, threshold=0.1)
+    assert [r[2] for r in regressions] == ["translate", "total"]
+
+
+def test_compare_should_ignore_small_differences():
+    timings = {"parse": 0.0001, "transform": 0.1, "translate": 0.1, "assemble": 0.1, "total": 0.3001}
+    old = {"results": [{"writer": "html5", "slides": 10, **timings}]}
+    new = {"results": [{"writer": "html5", "slides": 10, **timings, "parse": 0.0003}]}
+    _, regressions = compare.compare(old, new, threshold=0.1)
+    assert regressions == []
+
+
+def test_api_should_be_timed_for_every_writer():
+    data = api.run(3, repeat=1)
+    assert [r["writer"] for r in data["results"]] == ["html5", "slides", "impressjs", "revealjs"]
+    for result in data["results"]:
+        assert all(result[method] > 0 for method in api.METHODS)
@@ -0,0 +1,111 @@
+import os
+
+from docutils.core import Publisher, publish_file
+
+from kirlent_docutils import impressjs, revealjs
+from kirlent_docutils.cache import BuildCache, DiskCache, DoctreeCache, \
+    publish, use_doctree_cache
+
+
+def test_cache_should_return_stored_value(tmp_path):
+    cache = DiskCache(tmp_path)
+    cache.set("abcd", {"x": 1})
+    assert DiskCache(tmp_path).get("abcd") == {"x": 1}
+
+
+def test_cache_should_return_default_for_missing_key(tmp_path):
+    cache = DiskCache(tmp_path)
+    assert cache.get("abcd", 42) == 42
+
+
+def test_cache_should_count_hits_and_misses(tmp_path):
+    cache = DiskCache(tmp_path)
+    cache.set("abcd", 1)
+    cache.get("abcd")
+    cache.get("efgh")
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["stores"], stats["entries"]) == (1, 1, 1, 1)
+
+
+def test_cache_should_remove_least_recently_used_entries_when_trimmed(tmp_path):
+    cache = DiskCache(tmp_path)
+    for i, key in enumerate(["aaaa", "bbbb", "cccc"]):
+        cache.set(key, b"x" * 100)
+        os.utime(cache._path(key), (i, i))
+    cache.get("aaaa")
+    cache.max_size = 2 * os.path.getsize(cache._path("aaaa"))
+    cache.trim()
+    assert (cache.get("aaaa"), cache.get("bbbb")) == (b"x" * 100, None)
+
+
+def convert(source, destination, cache, **overrides):
+    pub = Publisher(writer=revealjs.Writer())
+    pub.set_components("standalone", "restructuredtext", None)
+    pub.process_command_line([str(source), str(destination)], **overrides)
+    return publish(pub, cache)
+
+
+def test_build_cache_should_reuse_output_for_unchanged_source(tmp_path):
+    (tmp_path / "a.rst").write_text("text\n")
+    cache = BuildCache(tmp_path / "cache")
+    convert(tmp_path / "a.rst", tmp_path / "a.html", cache)
+    convert(tmp_path / "a.rst", tmp_path / "b.html", cache)
+    assert cache.hits == 0
+    convert(tmp_path / "a.rst", tmp_path / "a.html", cache)
+    assert cache.hits == 1
+    assert "text" in (tmp_path / "a.html").read_text()
+
+
+def test_build_cache_should_not_reuse_output_for_different_settings(tmp_path):
+    (tmp_path / "a.rst").write_text("text\n")
+    cache = BuildCache(tmp_path / "cache")
+    convert(tmp_path / "a.rst", tmp_path / "a.html", cache)
+    convert(tmp_path / "a.rst", tmp_path / "a.html", cache, transition="zoom")
+    assert cache.hits == 0
+    assert "'zoom'" in (tmp_path / "a.html").read_text()
+
+
+def test_build_cache_should_not_reuse_output_for_changed_dependency(tmp_path):
+    (tmp_path / "a.rst").write_text(f".. include:: {tmp_path / 'b.rst'}\n")
+    (tmp_path / "b.rst").write_text("text 1\n")
+    cache = BuildCache(tmp_path / "cache")
+    convert(tmp_path / "a.rst", tmp_path / "a.html", cache)
+    (tmp_path / "b.rst").write_text("text 2\n")
+    convert(tmp_path / "a.rst", tmp_path / "a.html", cache)
+    assert cache.hits == 0
+    assert "text 2" in (tmp_path / "a.html").read_text()
+
+
+def convert_from_doctree(source, destination, cache, writer):
+    pub = Publisher(writer=writer)
+    pub.set_components("standalone", "restructuredtext", None)
+    pub.process_command_line([str(source), str(destination)])
+    use_doctree_cache(pub, cache)
+    return pub.publish()
+
+
+def test_doctree_cache_should_be_shared_between_writers(tmp_path):
+    (tmp_path / "a.rst").write_text("Title\n=====\n\n\"text\"\n")
+    cache = DoctreeCache(tmp_path / "cache")
+    convert_from_doctree(tmp_path / "a.rst", tmp_path / "a.html", cache, revealjs.Writer())
+    convert_from_doctree(tmp_path / "a.rst", tmp_path / "b.html", cache, impressjs.Writer())
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_doctree_cache_should_not_change_output(tmp_path):
+    (tmp_path / "a.rst").write_text("Title\n=====\n\n\"text\"\n\n.. note:: note\n")
+    expected = publish_file(source_path=str(tmp_path / "a.rst"), destination_path=str(tmp_path / "a.html"),
+                            writer=revealjs.Writer())
+    cache = DoctreeCache(tmp_path / "cache")
+    for _ in range(2):
+        convert_from_doctree(tmp_path / "a.rst", tmp_path / "b.html", cache, revealjs.Writer())
+        assert (tmp_path / "b.html").read_text() == expected
+
+
+def test_doctree_cache_should_not_reuse_tree_for_changed_source(tmp_path):
+    (tmp_path / "a.rst").write_text("\"text\"\n")
+    cache = DoctreeCache(tmp_path / "cache")
+    convert_from_doctree(tmp_path / "a.rst", tmp_path / "a.html", cache, revealjs.Writer())
+    (tmp_path / "a.rst").write_text("\"text 2\"\n")
+    convert_from_doctree(tmp_path / "a.rst", tmp_path / "a.html", cache, revealjs.Writer())
+    assert cache.hits == 0
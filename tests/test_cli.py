@@ -1,5 +1,7 @@
 import pytest
 
+import gzip
+import os
 import re
 import subprocess
 import sys
@@ -50,6 +52,83 @@ def test_html5_writer_should_include_bundled_mathjax_as_fallback(capfd):
     assert str(Path("bundled/MathJax.min.js")) in captured.out
 
 
+def test_html5_writer_should_write_gzip_sidecar_for_output(tmp_path):
+    (tmp_path / "a.rst").write_text("text\n")
+    execute(rst2kirlenthtml5, "--gzip-level=9", str(tmp_path / "a.rst"), str(tmp_path / "a.html"))
+    with gzip.open(tmp_path / "a.html.gz") as f:
+        assert f.read() == (tmp_path / "a.html").read_bytes()
+
+
+def test_html5_writer_should_write_gzip_sidecar_for_linked_stylesheet_under_output_dir(tmp_path):
+    (tmp_path / "a.rst").write_text("text\n")
+    (tmp_path / "a.css").write_text("p { color: red; }\n")
+    execute(rst2kirlenthtml5, "--gzip-level=9", "--link-stylesheet", f"--stylesheet-path={tmp_path / 'a.css'}",
+            str(tmp_path / "a.rst"), str(tmp_path / "a.html"))
+    with gzip.open(tmp_path / "a.css.gz") as f:
+        assert f.read() == (tmp_path / "a.css").read_bytes()
+
+
+def test_html5_writer_should_always_rewrite_gzip_sidecar_for_output(tmp_path):
+    (tmp_path / "a.rst").write_text("text\n")
+    execute(rst2kirlenthtml5, "--gzip-level=1", str(tmp_path / "a.rst"), str(tmp_path / "a.html"))
+    later = (tmp_path / "a.html").stat().st_mtime + 60
+    os.utime(tmp_path / "a.html.gz", (later, later))
+    (tmp_path / "a.rst").write_text("changed text\n")
+    execute(rst2kirlenthtml5, "--gzip-level=9", str(tmp_path / "a.rst"), str(tmp_path / "a.html"))
+    compressed = (tmp_path / "a.html.gz").read_bytes()
+    assert gzip.decompress(compressed) == (tmp_path / "a.html").read_bytes()
+    assert compressed[8] == 2  # extra flags for the best compression
+
+
+def test_html5_writer_should_not_rewrite_newer_gzip_sidecar_for_stylesheet(tmp_path):
+    (tmp_path / "a.rst").write_text("text\n")
+    (tmp_path / "a.css").write_text("p { color: red; }\n")
+    (tmp_path / "a.css.gz").write_bytes(b"kept")
+    execute(rst2kirlenthtml5, "--gzip-level=9", "--link-stylesheet", f"--stylesheet-path={tmp_path / 'a.css'}",
+            str(tmp_path / "a.rst"), str(tmp_path / "a.html"))
+    assert (tmp_path / "a.css.gz").read_bytes() == b"kept"
+
+
+def test_html5_writer_should_not_write_gzip_sidecar_by_default(tmp_path):
+    (tmp_path / "a.rst").write_text("text\n")
+    execute(rst2kirlenthtml5, str(tmp_path / "a.rst"), str(tmp_path / "a.html"))
+    assert not (tmp_path / "a.html.gz").exists()
+
+
+def test_highlight_cache_should_not_change_output(tmp_path):
+    (tmp_path / "a.rst").write_text(".. code:: python\n\n   x = 1\n")
+    execute(rst2kirlenthtml5, str(tmp_path / "a.rst"), str(tmp_path / "a.html"))
+    execute(rst2kirlenthtml5, f"--highlight-cache-dir={tmp_path / 'cache'}",
+            str(tmp_path / "a.rst"), str(tmp_path / "b.html"))
+    assert (tmp_path / "b.html").read_bytes() == (tmp_path / "a.html").read_bytes()
+    assert len(list((tmp_path / "cache").rglob("*"))) == 2  # shard and entry
+
+
+STREAM_SOURCE = """Title
+=====
+
+:author: me
+
+Text with :math:`x^2` and trailing blank lines.
+
+::
+
+    code
+
+
+
+"""
+
+
+@pytest.mark.parametrize("tool", ["rst2kirlenthtml5", "kirlent2slides", "kirlent2revealjs"])
+def test_streamed_output_should_be_same_as_joined_output(tmp_path, tool):
+    script = Path(sys.executable).with_name(tool)
+    (tmp_path / "a.rst").write_text(STREAM_SOURCE)
+    execute(script, str(tmp_path / "a.rst"), str(tmp_path / "a.html"))
+    execute(script, "--stream-output", str(tmp_path / "a.rst"), str(tmp_path / "b.html"))
+    assert (tmp_path / "b.html").read_bytes() == (tmp_path / "a.html").read_bytes()
+
+
 kirlent2slides = Path(sys.executable).with_name("kirlent2slides")
 
 
@@ -153,7 +232,7 @@ def test_revealjs_writer_should_include_revealjs_stylesheet(capfd, sheet):
 
 
 def test_revealjs_writer_should_activate_notes_plugin_on_initialization(capfd):
-    execute(kirlent2revealjs, content="")
+    execute(kirlent2revealjs, content=".. container:: notes\\n\\n   notes\\n")
     captured = capfd.readouterr()
     assert re.search(
         r"Reveal.initialize\({(\s*.*,)*\s*plugins: \[RevealNotes\]",
@@ -161,6 +240,19 @@ def test_revealjs_writer_should_activate_notes_plugin_on_initialization(capfd):
     ) is not None
 
 
+def test_revealjs_writer_should_not_load_notes_plugin_without_notes(capfd):
+    execute(kirlent2revealjs, content="")
+    captured = capfd.readouterr()
+    assert "reveal-notes.js" not in captured.out
+    assert re.search(r"plugins: \[\]", captured.out) is not None
+
+
+def test_revealjs_writer_should_load_notes_plugin_for_raw_notes(capfd):
+    execute(kirlent2revealjs, content=".. raw:: html\\n\\n   <aside class=notes>notes</aside>\\n")
+    captured = capfd.readouterr()
+    assert "reveal-notes.js" in captured.out
+
+
 @pytest.mark.parametrize(
     ("size", "width", "height"), [
         (None, "1920", "1080"),
@@ -211,3 +303,177 @@ def test_revealjs_writer_should_set_attr_on_initialization(capfd, attr, option,
         fr"Reveal.initialize\({{(\s*.*,)*\s*{attr_name}: {attr_value}",
         captured.out,
     ) is not None
+
+
+LAZY_DECK = "Slide 1\n-------\n\n:pause:\n\n- item\n\nSlide 2\n-------\n\ntext 2\n"
+
+
+def test_revealjs_writer_should_write_lazy_slide_contents_into_files(tmp_path):
+    (tmp_path / "a.rst").write_text(LAZY_DECK)
+    execute(kirlent2revealjs, str(tmp_path / "a.rst"), str(tmp_path / "full.html"))
+    execute(kirlent2revealjs, "--lazy-slides", str(tmp_path / "a.rst"), str(tmp_path / "a.html"))
+    html = (tmp_path / "a.html").read_text()
+    assert "text 2" not in html
+    for index in range(2):
+        content = (tmp_path / "a_slides" / f"{index}.html").read_text()
+        html = re.sub(f' data-lazy="{index}">\n', lambda m: ">\n" + content, html)
+    assert html.split("<body>")[1] == (tmp_path / "full.html").read_text().split("<body>")[1]
+
+
+def test_revealjs_writer_should_keep_fragments_in_lazy_slides(tmp_path):
+    (tmp_path / "a.rst").write_text(LAZY_DECK)
+    execute(kirlent2revealjs, "--lazy-slides", str(tmp_path / "a.rst"), str(tmp_path / "a.html"))
+    assert '<ul class="fragment">' in (tmp_path / "a_slides" / "0.html").read_text()
+    assert "Reveal.sync()" in (tmp_path / "a.html").read_text()
+
+
+def test_revealjs_writer_should_keep_rules_used_in_lazy_slides_when_pruning(tmp_path):
+    (tmp_path / "a.rst").write_text(LAZY_DECK)
+    execute(kirlent2revealjs, "--lazy-slides", "--embed-stylesheet", "--prune-stylesheets",
+            str(tmp_path / "a.rst"), str(tmp_path / "a.html"))
+    assert ".slide .content {" in (tmp_path / "a.html").read_text()
+
+
+def test_revealjs_writer_should_typeset_math_in_loaded_lazy_slides(tmp_path):
+    (tmp_path / "a.rst").write_text(LAZY_DECK + "\n:math:`x^2`\n")
+    execute(kirlent2revealjs, "--lazy-slides", str(tmp_path / "a.rst"), str(tmp_path / "a.html"))
+    html = (tmp_path / "a.html").read_text()
+    assert re.search(r"slide\.innerHTML = html;\s*return typeset\(slide\);", html) is not None
+    assert "MathJax.typesetPromise([slide])" in html
+    assert "MathJax.Hub.Queue(['Typeset', MathJax.Hub, slide], resolve)" in html
+
+
+def test_revealjs_writer_should_handle_annotations_in_loaded_lazy_slides(tmp_path):
+    (tmp_path / "a.rst").write_text(LAZY_DECK + "\n*>_annotated_<*\n")
+    execute(kirlent2revealjs, "--lazy-slides", str(tmp_path / "a.rst"), str(tmp_path / "a.html"))
+    html = (tmp_path / "a.html").read_text()
+    assert "annotation" in (tmp_path / "a_slides" / "1.html").read_text()
+    assert "document.addEventListener('click'" in html
+    assert "event.target.closest('.annotation')" in html
+    assert "querySelectorAll('.annotation')" not in html
+
+
+def test_revealjs_writer_should_remove_old_lazy_slide_files(tmp_path):
+    (tmp_path / "a_slides").mkdir()
+    (tmp_path / "a_slides" / "5.html").write_text("old")
+    (tmp_path / "a.rst").write_text(LAZY_DECK)
+    execute(kirlent2revealjs, "--lazy-slides", str(tmp_path / "a.rst"), str(tmp_path / "a.html"))
+    assert sorted(p.name for p in (tmp_path / "a_slides").iterdir()) == ["0.html", "1.html"]
+
+
+def test_revealjs_writer_should_minify_lazy_slides(tmp_path, capfd):
+    (tmp_path / "a.rst").write_text(LAZY_DECK)
+    execute(kirlent2revealjs, "--lazy-slides", "--report=1", str(tmp_path / "a.rst"), str(tmp_path / "a.html"))
+    plain = capfd.readouterr().err
+    execute(kirlent2revealjs, "--lazy-slides", "--minify", "--report=1",
+            str(tmp_path / "a.rst"), str(tmp_path / "b.html"))
+    saved = int(re.search(r"Minified output, (\d+) bytes saved", capfd.readouterr().err).group(1))
+    assert "<ul class=\"fragment\"><li>" in (tmp_path / "b_slides" / "0.html").read_text()
+    sizes = {stem: sum((tmp_path / f"{stem}_slides" / f"{n}.html").stat().st_size for n in (0, 1))
+             for stem in ("a", "b")}
+    slides_saved = sizes["a"] - sizes["b"]
+    assert saved > slides_saved > 0
+    assert "Minified output" not in plain
+
+
+def test_revealjs_writer_should_write_gzip_sidecars_for_lazy_slides(tmp_path):
+    (tmp_path / "a_slides").mkdir()
+    (tmp_path / "a_slides" / "5.html.gz").write_bytes(b"old")
+    (tmp_path / "a.rst").write_text(LAZY_DECK)
+    execute(kirlent2revealjs, "--lazy-slides", "--gzip-level=9", str(tmp_path / "a.rst"), str(tmp_path / "a.html"))
+    names = sorted(p.name for p in (tmp_path / "a_slides").iterdir())
+    assert names == ["0.html", "0.html.gz", "1.html", "1.html.gz"]
+    with gzip.open(tmp_path / "a_slides" / "1.html.gz") as f:
+        assert f.read() == (tmp_path / "a_slides" / "1.html").read_bytes()
+
+
+def test_revealjs_writer_should_not_separate_lazy_slides_without_output_file(capfd):
+    execute(kirlent2revealjs, "--lazy-slides", content="Slide\\n-----\\n\\ntext\\n")
+    captured = capfd.readouterr()
+    assert "data-lazy" not in captured.out
+    assert "Lazy slides need an output file" in captured.err
+
+
+def test_writer_should_convert_all_documents_in_source_directory(tmp_path):
+    (tmp_path / "src" / "sub").mkdir(parents=True)
+    (tmp_path / "src" / "a.rst").write_text("text a\n")
+    (tmp_path / "src" / "sub" / "b.rst").write_text("text b\n")
+    execute(kirlent2revealjs, "--jobs=2", str(tmp_path / "src"), str(tmp_path / "out"))
+    assert "text a" in (tmp_path / "out" / "a.html").read_text()
+    assert "text b" in (tmp_path / "out" / "sub" / "b.html").read_text()
+
+
+def test_writer_should_use_writer_settings_in_batch_mode(tmp_path):
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "a.rst").write_text("text a\n")
+    execute(kirlent2revealjs, "--transition=zoom", str(tmp_path / "src"), str(tmp_path / "out"))
+    assert "transition: 'zoom'" in (tmp_path / "out" / "a.html").read_text()
+
+
+@pytest.mark.parametrize("jobs", ["--jobs=1", "--jobs=2"])
+def test_writer_should_record_dependencies_in_batch_mode(tmp_path, jobs):
+    (tmp_path / "src").mkdir()
+    (tmp_path / "part.txt").write_text("included\n")
+    (tmp_path / "src" / "a.rst").write_text(".. include:: ../part.txt\n")
+    (tmp_path / "src" / "b.rst").write_text("text b\n")
+    deps = tmp_path / "deps.txt"
+    execute(kirlent2revealjs, jobs, f"--record-dependencies={deps}",
+            str(tmp_path / "src"), str(tmp_path / "out"))
+    assert "included" in (tmp_path / "out" / "a.html").read_text()
+    assert "part.txt" in deps.read_text()
+
+
+def test_writer_should_fail_in_batch_mode_without_destination(tmp_path, capfd):
+    (tmp_path / "src").mkdir()
+    execute(kirlent2revealjs, str(tmp_path / "src"))
+    captured = capfd.readouterr()
+    assert "destination directory is required" in captured.err
+
+
+kirlent2multi = Path(sys.executable).with_name("kirlent2multi")
+
+
+def test_installation_should_create_console_script_for_multiple_writers():
+    assert kirlent2multi.exists()
+
+
+def test_multiple_writers_should_use_their_own_options(tmp_path):
+    (tmp_path / "a.rst").write_text("text\n")
+    execute(kirlent2multi, str(tmp_path / "a.rst"),
+            f"revealjs:{tmp_path / 'a-reveal.html'}", "--transition=zoom",
+            f"impressjs:{tmp_path / 'a-impress.html'}", "--transition-duration=300")
+    assert "transition: 'zoom'" in (tmp_path / "a-reveal.html").read_text()
+    assert 'data-transition-duration="300"' in (tmp_path / "a-impress.html").read_text()
+
+
+def test_multiple_writers_should_not_allow_options_of_other_writers(tmp_path, capfd):
+    (tmp_path / "a.rst").write_text("text\n")
+    execute(kirlent2multi, str(tmp_path / "a.rst"),
+            f"revealjs:{tmp_path / 'a-reveal.html'}", "--transition-duration=300")
+    captured = capfd.readouterr()
+    assert "no such option: --transition-duration" in captured.err
+
+
+def test_cli_module_should_not_import_writers():
+    code = "import sys, kirlent_docutils.cli; print(sorted(sys.modules))"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    for name in ["html5", "slides", "impressjs", "revealjs", "multi"]:
+        assert f"'kirlent_docutils.{name}'" not in result.stdout
+
+
+def test_module_should_convert_with_given_writer(capfd):
+    execute(sys.executable, "-m", "kirlent_docutils", "revealjs", content="text")
+    captured = capfd.readouterr()
+    assert "reveal.js" in captured.out
+
+
+def test_module_should_report_import_time(capfd):
+    execute(sys.executable, "-m", "kirlent_docutils", "--import-time", "html5", content="text")
+    captured = capfd.readouterr()
+    assert captured.err.startswith("html5: imported in ")
+
+
+def test_module_should_not_allow_unknown_writer(capfd):
+    execute(sys.executable, "-m", "kirlent_docutils", "latex", content="text")
+    captured = capfd.readouterr()
+    assert "usage: python -m kirlent_docutils" in captured.err
@@ -0,0 +1,122 @@
+import pytest
+
+import os
+import signal
+import threading
+
+from kirlent_docutils import daemon
+
+
+@pytest.fixture(scope="module")
+def server(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("daemon") / "kirlent.sock")
+    server = daemon.make_server(path, jobs=1, root=str(tmp_path_factory.getbasetemp()))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    server.pool.shutdown()
+
+
+@pytest.fixture
+def address(server):
+    return server.server_address
+
+
+def test_daemon_should_render_source_text(address):
+    response = daemon.request(address, source="text\n", writer="html5")
+    assert "<p>text</p>" in response["parts"]["body"]
+
+
+def test_daemon_should_render_source_file(address, tmp_path):
+    (tmp_path / "a.rst").write_text("text\n")
+    response = daemon.request(address, source_path=str(tmp_path / "a.rst"), writer="revealjs")
+    assert "reveal.js" in response["parts"]["whole"]
+
+
+def test_daemon_should_apply_settings_overrides(address):
+    response = daemon.request(address, source="text\n", writer="revealjs",
+                              settings={"transition": "zoom"}, parts=["whole"])
+    assert "transition: 'zoom'" in response["parts"]["whole"]
+
+
+def test_daemon_should_return_only_requested_parts(address):
+    response = daemon.request(address, source="text\n", writer="html5", parts=["body", "title"])
+    assert set(response["parts"]) == {"body", "title"}
+
+
+def test_daemon_should_return_warnings(address):
+    response = daemon.request(address, source="`ref`_\n", writer="html5")
+    assert "Unknown target name" in response["warnings"]
+
+
+def test_daemon_should_copy_request_id(address):
+    response = daemon.request(address, source="text\n", writer="html5", id=42)
+    assert response["id"] == 42
+
+
+def test_daemon_should_report_unknown_writer(address):
+    response = daemon.request(address, source="text\n", writer="latex")
+    assert response["error"] == "unknown writer: latex"
+
+
+def test_daemon_should_report_missing_source(address):
+    response = daemon.request(address, writer="html5")
+    assert "source or source_path is required" in response["error"]
+
+
+def test_daemon_should_report_errors_in_document(address):
+    source = "A\n=\n\nB\n-\n\ntext\n\nC\n=\n\nD\n~\n\ntext\n"
+    response = daemon.request(address, source=source, writer="html5")
+    assert "Title level inconsistent" in response["error"]
+
+
+def test_daemon_should_reject_source_file_outside_root(address, tmp_path_factory):
+    outside = tmp_path_factory.getbasetemp().parent / "outside.rst"
+    response = daemon.request(address, source_path=str(outside), writer="html5")
+    assert "not under the root directory" in response["error"]
+
+
+def test_daemon_should_reject_source_file_outside_root_with_source_text(address, tmp_path_factory):
+    outside = tmp_path_factory.getbasetemp().parent / "outside.rst"
+    response = daemon.request(address, source="text\n", source_path=str(outside), writer="html5")
+    assert "not under the root directory" in response["error"]
+
+
+@pytest.mark.parametrize("name", ["stylesheet_path", "profile_visitors", "math_cache_dir", "embed_images",
+                                  "image_loading"])
+def test_daemon_should_reject_settings_that_access_files(address, name):
+    response = daemon.request(address, source="text\n", writer="html5", settings={name: "x"})
+    assert response["error"] == f"settings not allowed: {name}"
+
+
+def test_daemon_should_reject_math_output_with_stylesheet(address):
+    response = daemon.request(address, source="text\n", writer="html5",
+                              settings={"math_output": "HTML /etc/hostname"})
+    assert response["error"] == "settings not allowed: math_output"
+
+
+@pytest.mark.parametrize("directive", [".. include:: %s\n", ".. raw:: html\n   :file: %s\n"])
+def test_daemon_should_not_insert_files_outside_root(address, tmp_path_factory, directive):
+    outside = tmp_path_factory.getbasetemp().parent / "outside.txt"
+    outside.write_text("secret contents\n")
+    response = daemon.request(address, source=directive % outside, writer="html5")
+    assert "secret" not in response.get("parts", {}).get("body", "")
+    assert "secret" not in response.get("error", "")
+
+
+def test_daemon_should_report_invalid_parts(address):
+    response = daemon.request(address, source="text\n", writer="html5", parts=5, id=3)
+    assert response == {"id": 3, "error": "parts must be a list of strings"}
+    response = daemon.request(address, source="text\n", writer="html5", parts=["body"])
+    assert "<p>text</p>" in response["parts"]["body"]
+
+
+def test_daemon_should_restart_broken_worker_pool(server, address):
+    for pid in list(server.pool._processes):
+        os.kill(pid, signal.SIGKILL)
+    response = daemon.request(address, source="text\n", writer="html5", id=1)
+    assert response == {"id": 1, "error": "worker process failed"}
+    response = daemon.request(address, source="text\n", writer="html5")
+    assert "<p>text</p>" in response["parts"]["body"]
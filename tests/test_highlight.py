@@ -0,0 +1,70 @@
+from docutils import nodes
+from docutils.core import publish_doctree
+
+from kirlent_docutils import highlight
+from kirlent_docutils.cache import DiskCache
+
+
+SOURCE = """\
+Title
+=====
+
+.. code:: python
+
+   def f(x):
+       return x
+
+
+- item
+
+  .. code-block:: c
+     :number-lines:
+
+     int main() {
+         return 0;
+     }
+
+Some ``text`` and :code:`x = 1`.
+"""
+
+
+def test_code_blocks_should_be_found_as_parsed():
+    doctree = publish_doctree(SOURCE)
+    found = highlight.find_code_blocks(SOURCE)
+    assert [language for _, language in found] == ["python", "c"]
+    assert found[0][0] == next(doctree.findall(nodes.literal_block)).astext()
+
+
+def test_cached_highlighting_should_generate_same_tree(tmp_path):
+    expected = publish_doctree(SOURCE).pformat()
+    settings = publish_doctree("").settings
+    cache = DiskCache(tmp_path)
+    with highlight.highlighting(settings, cache):
+        doctree = publish_doctree(SOURCE)
+    assert doctree.pformat() == expected
+    assert cache.stores == 2
+
+
+def test_cached_highlighting_should_reuse_tokens_from_disk(tmp_path):
+    settings = publish_doctree("").settings
+    with highlight.highlighting(settings, DiskCache(tmp_path)):
+        publish_doctree(SOURCE)
+    cache = DiskCache(tmp_path)
+    with highlight.highlighting(settings, cache):
+        publish_doctree(SOURCE)
+    assert (cache.hits, cache.misses) == (2, 0)
+
+
+def test_highlighting_should_restore_lexer():
+    settings = publish_doctree("").settings
+    with highlight.highlighting(settings, DiskCache("unused")):
+        pass
+    assert highlight.body.Lexer is highlight.Lexer
+
+
+def test_prehighlight_should_store_tokens_of_code_blocks():
+    store = highlight.TokenStore()
+    count = highlight.prehighlight(store, SOURCE, "long", jobs=2)
+    assert count == 2
+    key = highlight.token_key("def f(x):\n    return x", "python", "long")
+    assert store.get(key) == highlight.lex("def f(x):\n    return x", "python", "long")
@@ -0,0 +1,78 @@
+import pytest
+
+import os
+import struct
+
+from kirlent_docutils.images import encode_image, probe_size, probe_svg
+
+
+SVG = '<svg xmlns="http://www.w3.org/2000/svg" id="%(id)s" width="100%%" height="%(h)s">'
+
+
+def test_probe_svg_should_get_root_attributes(tmp_path):
+    (tmp_path / "a.svg").write_text((SVG % {"id": "mermaid-1", "h": "42"}) + "</svg>")
+    attrs = probe_svg(tmp_path / "a.svg")
+    assert (attrs["id"], attrs["height"]) == ("mermaid-1", "42")
+
+
+def test_probe_svg_should_not_read_beyond_root_start_tag(tmp_path):
+    body = "<g>" + ("<rect/>" * 10000) + "<broken"
+    (tmp_path / "a.svg").write_text((SVG % {"id": "mermaid-1", "h": "42"}) + body)
+    assert probe_svg(tmp_path / "a.svg")["height"] == "42"
+
+
+def test_probe_svg_should_refresh_cached_result_when_file_changes(tmp_path):
+    (tmp_path / "a.svg").write_text((SVG % {"id": "mermaid-1", "h": "42"}) + "</svg>")
+    os.utime(tmp_path / "a.svg", (1, 1))
+    probe_svg(tmp_path / "a.svg")
+    (tmp_path / "a.svg").write_text((SVG % {"id": "mermaid-1", "h": "420"}) + "</svg>")
+    os.utime(tmp_path / "a.svg", (2, 2))
+    assert probe_svg(tmp_path / "a.svg")["height"] == "420"
+
+
+PNG = b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + struct.pack(">IIBBBBB", 640, 480, 8, 2, 0, 0, 0)
+GIF = b"GIF89a" + struct.pack("<HH", 320, 200) + b"\x00" * 10
+JPEG = b"".join([
+    b"\xff\xd8", b"\xff\xe0", struct.pack(">H", 16), b"JFIF\x00", b"\x00" * 9,
+    b"\xff\xc0", struct.pack(">HBHHB", 11, 8, 600, 800, 1), b"\x01\x11\x00", b"\xff\xd9",
+])
+
+
+@pytest.mark.parametrize(("name", "data", "size"), [
+    ("a.png", PNG, (640, 480)),
+    ("a.gif", GIF, (320, 200)),
+    ("a.jpg", JPEG, (800, 600)),
+    ("a.svg", b'<svg xmlns="http://www.w3.org/2000/svg" width="120px" height="80"/>', (120, 80)),
+    ("a.svg", b'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 300 150.4"/>', (300, 150)),
+])
+def test_probe_size_should_get_image_size(tmp_path, name, data, size):
+    (tmp_path / name).write_bytes(data)
+    assert probe_size(tmp_path / name) == size
+
+
+@pytest.mark.parametrize(("name", "data"), [
+    ("a.svg", b'<svg xmlns="http://www.w3.org/2000/svg" width="100%" height="80"/>'),
+    ("a.svg", b"<svg"),
+    ("a.jpg", JPEG[:24]),
+    ("a.txt", b"text"),
+])
+def test_probe_size_should_not_get_unknown_size(tmp_path, name, data):
+    (tmp_path / name).write_bytes(data)
+    assert probe_size(tmp_path / name) is None
+
+
+def test_probe_size_should_refresh_cached_result_when_file_changes(tmp_path):
+    (tmp_path / "a.gif").write_bytes(GIF)
+    os.utime(tmp_path / "a.gif", (1, 1))
+    probe_size(tmp_path / "a.gif")
+    (tmp_path / "a.gif").write_bytes(b"GIF89a" + struct.pack("<HH", 10, 20) + b"\x00" * 10)
+    os.utime(tmp_path / "a.gif", (2, 2))
+    assert probe_size(tmp_path / "a.gif") == (10, 20)
+
+
+def test_encode_image_should_get_same_digest_for_same_content(tmp_path):
+    (tmp_path / "a.gif").write_bytes(GIF)
+    (tmp_path / "b.gif").write_bytes(GIF)
+    digest, data_uri = encode_image(tmp_path / "a.gif")
+    assert encode_image(tmp_path / "b.gif")[0] == digest
+    assert data_uri.startswith("data:image/gif;base64,R0lGODlh")
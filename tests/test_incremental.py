@@ -0,0 +1,209 @@
+import pytest
+
+from docutils import nodes
+from docutils.frontend import get_default_settings
+from docutils.parsers.rst import Parser
+from docutils.readers.standalone import Reader
+from docutils.utils import new_document
+
+from kirlent_docutils import incremental
+from kirlent_docutils.cli import publish_cmdline_html5, publish_cmdline_slides
+
+
+PREAMBLE = "=====\nTitle\n=====\n\n:author: Author\n\nIntroduction.\n\n"
+
+SECTIONS = [
+    "Section %(n)d\n==========\n\nSee `Section %(m)d`_ and the target_.\n\n"
+    "Subsection\n----------\n\nText with a footnote [#note%(n)d]_.\n\n"
+    ".. [#note%(n)d] Note %(n)d.\n\n",
+    "Section %(n)d\n==========\n\nA |sub%(m)d| and a `link %(n)d`_.\n\n"
+    ".. |sub%(n)d| replace:: *replaced %(n)d*\n\n"
+    ".. _link %(n)d: https://example.com/%(n)d\n\n----\n\n"
+    "Cited [CIT%(m)d]_ with a later link %(m)d_.\n\n",
+    "Section %(n)d\n==========\n\n.. [CIT%(n)d] Citation %(n)d.\n\n"
+    "Before `link %(m)d`_ and note [#note%(m)d]_.\n\n",
+]
+
+
+def document(count, end=""):
+    sections = []
+    for n in range(count):
+        params = {"n": n, "m": (n + 1) % count}
+        sections.append(SECTIONS[n % len(SECTIONS)] % params)
+    return PREAMBLE + "".join(sections) + ".. _target:\n\nEnd.\n" + end
+
+
+def convert(tmp_path, source, name, *options, tool=publish_cmdline_html5):
+    (tmp_path / "doc.rst").write_text(source)
+    destination = tmp_path / name
+    argv = ["--no-generator", "--report=5", *options,
+            str(tmp_path / "doc.rst"), str(destination)]
+    tool(argv=argv)
+    return destination.read_text()
+
+
+@pytest.fixture
+def published(monkeypatch):
+    called = []
+    publish = incremental.IncrementalPublisher.publish
+
+    def record(self, starts, final):
+        called.append(starts)
+        return publish(self, starts, final)
+
+    monkeypatch.setattr(incremental.IncrementalPublisher, "publish", record)
+    return called
+
+
+@pytest.mark.parametrize("tool", [publish_cmdline_html5, publish_cmdline_slides])
+def test_incremental_conversion_should_generate_same_output(tmp_path, published, tool):
+    source = document(9)
+    expected = convert(tmp_path, source, "whole.html", tool=tool)
+    html = convert(tmp_path, source, "parts.html", "--incremental", tool=tool)
+    assert html == expected
+    assert len(published[0]) == 9
+
+
+def test_incremental_conversion_should_generate_same_output_for_errors(tmp_path, published):
+    source = document(3, end="\nUndefined_ reference.\n\n----\n")
+    expected = convert(tmp_path, source, "whole.html", "--report=2")
+    html = convert(tmp_path, source, "parts.html", "--report=2", "--incremental")
+    assert html == expected
+    assert "Unknown target name" in html
+    assert len(published) == 1
+
+
+def test_incremental_conversion_should_convert_document_with_contents_as_whole(tmp_path, published):
+    source = document(3).replace("Introduction.", ".. contents::")
+    expected = convert(tmp_path, source, "whole.html")
+    html = convert(tmp_path, source, "parts.html", "--incremental")
+    assert html == expected
+    assert len(published) == 0
+
+
+def test_incremental_conversion_should_convert_section_with_local_contents(tmp_path, published):
+    source = document(3).replace("Subsection\n", ".. contents::\n   :local:\n\nSubsection\n")
+    expected = convert(tmp_path, source, "whole.html")
+    html = convert(tmp_path, source, "parts.html", "--incremental")
+    assert html == expected
+    assert len(published) == 1
+
+
+def test_incremental_conversion_should_not_be_used_for_minified_output(tmp_path, published):
+    convert(tmp_path, document(3), "parts.html", "--incremental", "--minify")
+    assert len(published) == 0
+
+
+@pytest.mark.parametrize("option", ["--cache-dir=%s/cache", "--profile-visitors=%s/profile.json", "--translate-jobs=2"])
+def test_incremental_conversion_should_not_be_used_with_whole_document_options(tmp_path, published, option):
+    convert(tmp_path, document(3), "parts.html", "--incremental", option.replace("%s", str(tmp_path)))
+    assert len(published) == 0
+
+
+def test_incremental_conversion_should_use_math_cache(tmp_path, published):
+    source = document(3, end="\n:math:`x^2`\n")
+    options = ["--math-output=MathML", "--math-cache-dir=%s" % (tmp_path / "math")]
+    html = convert(tmp_path, source, "parts.html", "--incremental", *options)
+    assert len(published) == 1
+    assert len(list((tmp_path / "math").iterdir())) > 0
+    assert html == convert(tmp_path, source, "whole.html", *options)
+
+
+def same_as_whole(tmp_path, source, *options):
+    expected = convert(tmp_path, source, "whole.html", *options)
+    html = convert(tmp_path, source, "parts.html", "--incremental", *options)
+    return html == expected
+
+
+def test_incremental_conversion_should_convert_document_without_title(tmp_path, published):
+    source = "A\n===\n\ntext\n\nB\n===\n\ntext\n"
+    assert same_as_whole(tmp_path, source)
+    assert published == [[0, 5]]
+
+
+def test_incremental_conversion_should_convert_local_contents_in_first_section(tmp_path, published):
+    source = "A\n===\n\n.. contents::\n   :local:\n\nSub\n---\n\ntext\n\nB\n===\n\ntext\n"
+    assert same_as_whole(tmp_path, source)
+    assert len(published) == 1
+
+
+def test_incremental_conversion_should_convert_local_contents_in_head_as_whole(tmp_path, published):
+    source = document(3).replace("Introduction.", ".. contents::\n   :local:")
+    assert same_as_whole(tmp_path, source)
+    assert len(published) == 0
+
+
+@pytest.mark.parametrize("source", [
+    "A\n===\n\n.. include:: missing.rst\n\nB\n===\n\ntext\n",
+    "A\n===\n\ntext\n\nB\n===\n\nSub\n---\n\ntext\n\nC\n===\n\nSubsub\n~~~~~~\n\ntext\n",
+])
+def test_incremental_conversion_should_exit_as_whole_for_severe_errors(tmp_path, published, source):
+    (tmp_path / "doc.rst").write_text(source)
+    with pytest.raises(SystemExit) as e:
+        publish_cmdline_html5(argv=["--report=5", "--incremental",
+                                    str(tmp_path / "doc.rst"), str(tmp_path / "doc.html")])
+    assert e.value.code == 1
+    assert len(published) == 0
+
+
+@pytest.mark.parametrize("source", [
+    "A\n===\n\nA `link`__.\n\nB\n===\n\n__ https://example.com\n",
+    "A\n===\n\nA note [#]_.\n\nB\n===\n\n.. [#] Note.\n",
+    "A\n===\n\nA note [*]_.\n\nB\n===\n\n.. [*] Note.\n",
+])
+def test_incremental_conversion_should_convert_references_across_sections_as_whole(tmp_path, published, source):
+    assert same_as_whole(tmp_path, source, "--report=2")
+    assert "system-message" not in (tmp_path / "parts.html").read_text()
+    assert len(published) == 0
+
+
+def test_incremental_conversion_should_convert_anonymous_references_in_sections(tmp_path, published):
+    source = "A\n===\n\nA `link`__.\n\n__ https://example.com\n\nB\n===\n\nA note [#]_.\n\n.. [#] Note.\n"
+    assert same_as_whole(tmp_path, source, "--report=2")
+    assert len(published) == 1
+
+
+def test_incremental_conversion_should_be_used_in_batch_mode(tmp_path, published):
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "doc.rst").write_text(document(3))
+    with pytest.raises(SystemExit) as e:
+        publish_cmdline_html5(argv=["--jobs=1", "--incremental",
+                                    str(tmp_path / "src"), str(tmp_path / "out")])
+    assert e.value.code == 0
+    assert len(published) == 1
+    assert (tmp_path / "out" / "doc.html").exists()
+
+
+def titles(source):
+    return incremental.find_titles(source.splitlines(keepends=True))
+
+
+def test_find_titles_should_find_underlined_and_overlined_titles():
+    source = "=====\nTitle\n=====\n\nText\n\nSection\n-------\n\nText\n"
+    assert titles(source) == [(0, ("=", True)), (6, ("-", False))]
+
+
+def test_find_titles_should_not_find_transitions_and_indented_titles():
+    source = "Text\n\n----\n\n.. note::\n\n   Title\n   =====\n\n- Item\n  ====\n"
+    assert titles(source) == []
+
+
+def test_find_titles_should_find_same_titles_as_parser():
+    source = document(6)
+    doc = new_document("doc.rst", get_default_settings(Parser, Reader))
+    Parser().parse(source, doc)
+    sections = list(doc.findall(nodes.section))
+    assert len(titles(source)) == len(sections)
+
+
+def test_top_level_style_should_skip_document_title():
+    found = titles(document(3))
+    style = incremental.top_level_style(found, get_default_settings(Parser, Reader))
+    assert style == ("=", False)
+
+
+def test_top_level_style_should_not_skip_document_title_without_doctitle_xform():
+    found = titles(document(3))
+    settings = get_default_settings(Parser, Reader)
+    settings.doctitle_xform = False
+    assert incremental.top_level_style(found, settings) == ("=", True)
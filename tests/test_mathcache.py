@@ -0,0 +1,76 @@
+import pytest
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from docutils.core import publish_parts
+from docutils.utils.math import latex2mathml, math2html
+
+from kirlent_docutils import mathcache
+from kirlent_docutils.cache import DiskCache
+
+
+publish_html = partial(publish_parts, writer_name="kirlent_docutils.html5")
+
+SOURCE = "Inline :math:`x^2` and a block:\n\n.. math::\n\n   \\frac{a}{b}\n"
+
+
+@pytest.mark.parametrize("mode", ["HTML math.css", "MathML"])
+def test_cached_math_should_generate_same_output(tmp_path, mode):
+    expected = publish_html(SOURCE, settings_overrides={"math_output": mode})
+    for _ in range(2):
+        html = publish_html(SOURCE, settings_overrides={"math_output": mode,
+                                                        "math_cache_dir": str(tmp_path)})
+        assert html["whole"] == expected["whole"]
+
+
+def test_cached_math_should_reuse_conversions(tmp_path, monkeypatch):
+    overrides = {"math_output": "MathML", "math_cache_dir": str(tmp_path)}
+    expected = publish_html(SOURCE, settings_overrides=overrides)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("converted again")
+
+    monkeypatch.setattr(latex2mathml, "tex2mathml", fail)
+    html = publish_html(SOURCE, settings_overrides=overrides)
+    assert html["whole"] == expected["whole"]
+
+
+def test_cached_math_should_separate_display_modes(tmp_path, monkeypatch):
+    cache = DiskCache(tmp_path)
+    with mathcache.caching_math(cache):
+        monkeypatch.setattr(math2html.DocumentParameters, "displaymode", False)
+        math2html.math2html("x^2")
+        monkeypatch.setattr(math2html.DocumentParameters, "displaymode", True)
+        math2html.math2html("x^2")
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+def test_cached_math_should_restore_converters(tmp_path):
+    converter = latex2mathml.tex2mathml
+    with mathcache.caching_math(DiskCache(tmp_path)):
+        assert latex2mathml.tex2mathml is not converter
+    assert latex2mathml.tex2mathml is converter
+
+
+def test_cached_math_should_restore_converters_after_concurrent_use(tmp_path):
+    converter = math2html.math2html
+    entered = threading.Barrier(2)
+
+    def convert(n):
+        cache = DiskCache(tmp_path / str(n))
+        with mathcache.caching_math(cache):
+            entered.wait()
+            math2html.math2html("x^%d" % n)
+            entered.wait()
+        return cache.misses
+
+    with ThreadPoolExecutor(2) as executor:
+        assert list(executor.map(convert, [1, 2])) == [1, 1]
+    assert math2html.math2html is converter
+
+
+def test_mathml_output_should_not_include_mathjax():
+    html = publish_html(SOURCE, settings_overrides={"math_output": "MathML"})
+    assert "MathJax" not in html["whole"]
@@ -0,0 +1,82 @@
+from functools import partial
+
+from docutils.core import publish_parts
+
+from kirlent_docutils.minify import minify_css, minify_html, minify_js
+
+
+publish_html = partial(publish_parts, writer_name="kirlent_docutils.html5")
+
+
+def test_minify_css_should_remove_whitespace_around_punctuation():
+    assert minify_css(".a  >  .b ,\n.c {\n  color: red;\n}\n") == ".a>.b,.c{color:red}"
+
+
+def test_minify_css_should_keep_whitespace_in_values():
+    assert minify_css("p { width: calc(1px + 2px); }") == "p{width:calc(1px + 2px)}"
+
+
+def test_minify_css_should_keep_whitespace_before_pseudo_class():
+    assert minify_css(".a :hover { x: y; }") == ".a :hover{x:y}"
+
+
+def test_minify_css_should_not_change_strings():
+    assert minify_css('p::before { content: "a ; }  /* b */"; }') == 'p::before{content:"a ; }  /* b */"}'
+
+
+def test_minify_css_should_not_remove_semicolons_in_strings():
+    assert minify_css('p::before { content: ";}"; }') == 'p::before{content:";}"}'
+
+
+def test_minify_css_should_not_remove_semicolons_in_license_comments():
+    assert minify_css("/*! a;} */\np { x: y; }") == "/*! a;} */ p{x:y}"
+
+
+def test_minify_css_should_remove_comments_but_keep_license_comments():
+    assert minify_css("/*! license */\n/* comment */\np { x: y; }") == "/*! license */ p{x:y}"
+
+
+def test_minify_js_should_remove_indentation_and_comment_lines():
+    assert minify_js("\n  // comment\n  f(() => {\n      x = 1;\n  });\n") == "f(() => {\nx = 1;\n});"
+
+
+def test_minify_js_should_not_change_scripts_with_template_literals():
+    script = "\n  const s = `a\n    b`;\n"
+    assert minify_js(script) == script
+
+
+def test_minify_html_should_remove_whitespace_next_to_block_tags():
+    assert minify_html("<ul>\n  <li>a</li>\n</ul>\n<p>b</p>\n") == "<ul><li>a</li></ul><p>b</p>"
+
+
+def test_minify_html_should_keep_whitespace_between_inline_tags():
+    assert minify_html("<p><em>a</em> <em>b</em>\n<em>c</em></p>") == "<p><em>a</em> <em>b</em>\n<em>c</em></p>"
+
+
+def test_minify_html_should_not_change_preformatted_text():
+    html = "<div>\n<pre>  a\n\n    b  </pre>\n</div>"
+    assert minify_html(html) == "<div><pre>  a\n\n    b  </pre></div>"
+
+
+def test_minify_html_should_minify_embedded_stylesheets_and_scripts():
+    html = "<style>\np { x: y; }\n</style>\n<script>\n  f();\n</script>\n"
+    assert minify_html(html) == "<style>p{x:y}</style><script>f();</script>"
+
+
+def test_minify_html_should_not_change_scripts_that_are_not_javascript():
+    html = '<script type="text/x-mathjax-config">\n  a\n</script>'
+    assert minify_html(html) == html
+
+
+def test_writer_should_minify_output_when_requested():
+    source = "text\n\n- a\n- b\n\n::\n\n  code   with\n     spaces\n"
+    html = publish_html(source)
+    minified = publish_html(source, settings_overrides={"minify": True})
+    assert len(minified["whole"]) < len(html["whole"])
+    assert "<ul><li>a</li><li>b</li></ul>" in minified["whole"]
+    assert "<pre>code   with\n   spaces</pre>" in minified["whole"]
+
+
+def test_writer_should_report_saved_bytes_when_minifying(capsys):
+    publish_html("text\n", settings_overrides={"minify": True, "report_level": 1})
+    assert "Minified output, " in capsys.readouterr().err
@@ -0,0 +1,39 @@
+from docutils.core import publish_file
+
+from kirlent_docutils import impressjs, revealjs
+from kirlent_docutils.multi import publish_cmdline, publish_multiple
+
+
+SOURCE = ".. title:: Document Title\n\n----\n\n:pause:\n\nSlide Title\n===========\n\nContent\n"
+
+
+def test_multiple_writers_should_generate_same_output_as_separate_writers(tmp_path):
+    (tmp_path / "a.rst").write_text(SOURCE)
+    publish_multiple(str(tmp_path / "a.rst"), [
+        ("revealjs", str(tmp_path / "a-reveal.html"), {"transition": "zoom"}),
+        ("impressjs", str(tmp_path / "a-impress.html"), {"transition_duration": 300}),
+    ])
+    reveal = publish_file(source_path=str(tmp_path / "a.rst"), destination_path=str(tmp_path / "b-reveal.html"),
+                          writer=revealjs.Writer(), settings_overrides={"transition": "zoom"})
+    impress = publish_file(source_path=str(tmp_path / "a.rst"), destination_path=str(tmp_path / "b-impress.html"),
+                           writer=impressjs.Writer(), settings_overrides={"transition_duration": 300})
+    assert (tmp_path / "a-reveal.html").read_text() == reveal
+    assert (tmp_path / "a-impress.html").read_text() == impress
+
+
+def test_multiple_writers_should_not_see_changes_of_other_writers(tmp_path):
+    (tmp_path / "a.rst").write_text(SOURCE)
+    first, second = publish_multiple(str(tmp_path / "a.rst"), [
+        ("slides", str(tmp_path / "a.html"), None),
+        ("slides", str(tmp_path / "b.html"), None),
+    ])
+    assert first == second
+
+
+def test_command_line_should_accept_shared_writer_options_for_all_writers(tmp_path):
+    (tmp_path / "a.rst").write_text(SOURCE + "\n:math:`x^2`\n")
+    status = publish_cmdline([str(tmp_path / "a.rst"), "--math-output=MathML",
+                              f"revealjs:{tmp_path / 'r.html'}", f"html5:{tmp_path / 'h.html'}"])
+    assert status == 0
+    for name in ("r.html", "h.html"):
+        assert "<math" in (tmp_path / name).read_text()
@@ -0,0 +1,113 @@
+import pytest
+
+from docutils import nodes
+from docutils.core import publish_file, publish_parts
+
+from kirlent_docutils import parallel
+
+
+IMAGE = '<svg xmlns="http://www.w3.org/2000/svg" width="20" height="10"/>\n'
+
+PREAMBLE = ".. title:: Document Title\n\n:author: Author\n\n"
+
+SLIDES = [
+    "Slide %(n)d\n========\n\n- *>_annotated_<* item %(n)d\n\n",
+    "Slide %(n)d\n========\n\n.. container:: layout-a\n\n   Left\n\n:pause:\n\n"
+    ".. container:: layout-b\n\n   Right\n\n",
+    "Slide %(n)d\n========\n\nMath :math:`x_{%(n)d}^2` here.\n\n",
+    "Slide %(n)d\n========\n\n.. image:: chart.svg\n\n",
+]
+
+FIELDS = ["", ":layout: a b\n\n", ":data-x: 100\n:data-rotate: 90\n\n", ":pause:\n\n"]
+
+
+def deck(count):
+    slides = []
+    for n in range(count):
+        fields = FIELDS[n % len(FIELDS)]
+        slides.append("----\n\n" + fields + (SLIDES[n % len(SLIDES)] % {"n": n}))
+    return PREAMBLE + "".join(slides)
+
+
+def publish(source, writer, **overrides):
+    overrides.setdefault("_disable_config", True)
+    return publish_parts(source, source_path="deck.rst", writer_name=writer,
+                         settings_overrides=overrides)["whole"]
+
+
+@pytest.fixture
+def images(tmp_path, monkeypatch):
+    (tmp_path / "chart.svg").write_text(IMAGE)
+    monkeypatch.chdir(tmp_path)
+
+
+WRITERS = ["html5", "slides", "impressjs", "revealjs"]
+
+
+@pytest.mark.parametrize("writer", WRITERS)
+def test_parallel_translation_should_generate_same_output(images, writer):
+    source = deck(24)
+    expected = publish(source, f"kirlent_docutils.{writer}", translate_jobs=1)
+    html = publish(source, f"kirlent_docutils.{writer}", translate_jobs=2)
+    assert html == expected
+
+
+@pytest.mark.parametrize("writer", WRITERS)
+def test_parallel_translation_should_generate_same_output_for_embedded_images(images, writer):
+    source = deck(24)
+    overrides = {"embed_images_below": 1000, "math_output": "HTML"}
+    expected = publish(source, f"kirlent_docutils.{writer}", translate_jobs=1, **overrides)
+    html = publish(source, f"kirlent_docutils.{writer}", translate_jobs=3, **overrides)
+    assert html == expected
+
+
+def test_parallel_translation_should_translate_batches_in_workers(images, monkeypatch):
+    merged = []
+    merge = parallel._merge
+    monkeypatch.setattr(parallel, "_merge", lambda v, r: merged.append(r) or merge(v, r))
+    publish(deck(24), "kirlent_docutils.impressjs", translate_jobs=2)
+    assert len(merged) == 2 * parallel.BATCHES_PER_JOB
+
+
+def test_parallel_translation_should_retranslate_batch_with_other_start_state(images, monkeypatch):
+    # the fields are not at the end of the slide, so they are not resolved
+    source = deck(24).replace(":layout: a b\n\n", ":layout: a b\n\nLater text.\n\n")
+    expected = publish(source, "kirlent_docutils.revealjs", translate_jobs=1)
+    merged = []
+    merge = parallel._merge
+    monkeypatch.setattr(parallel, "_merge", lambda v, r: merged.append(r) or merge(v, r))
+    html = publish(source, "kirlent_docutils.revealjs", translate_jobs=2)
+    assert html == expected
+    assert len(merged) < 2 * parallel.BATCHES_PER_JOB
+
+
+def test_parallel_translation_should_retranslate_failed_batch(images, monkeypatch):
+    expected = publish(deck(12), "kirlent_docutils.slides", translate_jobs=1)
+
+    def fail(index, state):
+        raise RuntimeError("failed")
+
+    monkeypatch.setattr(parallel, "_translate_batch", fail)
+    html = publish(deck(12), "kirlent_docutils.slides", translate_jobs=2)
+    assert html == expected
+
+
+def test_parallel_translation_should_not_be_used_for_lazy_slides(images, tmp_path, monkeypatch):
+    monkeypatch.setattr(parallel, "ProcessPoolExecutor", None)
+    (tmp_path / "deck.rst").write_text(deck(12))
+    publish_file(source_path="deck.rst", destination_path="deck.html",
+                 writer_name="kirlent_docutils.revealjs",
+                 settings_overrides={"lazy_slides": True, "translate_jobs": 2,
+                                     "_disable_config": True})
+    assert len(list((tmp_path / "deck_slides").iterdir())) == 12
+
+
+def test_split_batches_should_end_batches_after_sections():
+    children = [nodes.section(), nodes.paragraph(), nodes.section(),
+                nodes.section(), nodes.section(), nodes.paragraph()]
+    assert parallel.split_batches(children, 2) == [(0, 3), (3, 6)]
+
+
+def test_split_batches_should_not_make_more_batches_than_sections():
+    children = [nodes.section(), nodes.section()]
+    assert parallel.split_batches(children, 8) == [(0, 1), (1, 2)]
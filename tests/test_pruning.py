@@ -0,0 +1,107 @@
+import pytest
+
+import re
+from functools import partial
+from pathlib import Path
+
+from docutils.core import publish_parts
+
+from kirlent_docutils.pruning import markup_names, prune_css, used_set
+
+
+publish_revealjs = partial(publish_parts, writer_name="kirlent_docutils.revealjs")
+
+CSS_DIR = Path(__file__).parent.parent / "kirlent_docutils" / "css"
+
+
+def strip(css):
+    return re.sub(r"\s", "", re.sub(r"/\*.*?\*/", "", css, flags=re.DOTALL))
+
+
+def prune(css, markup, head=""):
+    return prune_css(css, used_set(markup, head))
+
+
+def test_prune_css_should_remove_rules_of_unused_classes():
+    css = ".a { x: 1; }\n.b { x: 2; }\n"
+    assert prune(css, '<p class="a">') == ".a {\nx: 1;\n}"
+
+
+def test_prune_css_should_remove_unused_selectors_of_rule():
+    css = "p.a, div.b, #c > p { x: 1; }"
+    assert prune(css, '<p class="a" id="c">') == "p.a, #c > p {\nx: 1;\n}"
+
+
+def test_prune_css_should_not_require_names_in_parentheses():
+    css = "p:not(.a):hover::before { x: 1; }"
+    assert prune(css, "<p>") == "p:not(.a):hover::before {\nx: 1;\n}"
+
+
+def test_prune_css_should_require_attribute_values():
+    css = '[data-x=zoom] { x: 1; }\n[data-x="fade"] { x: 2; }\n[data-y] { x: 3; }'
+    assert prune(css, '<p data-x="fade">') == '[data-x="fade"] {\nx: 2;\n}\n[data-y] {\nx: 3;\n}'
+
+
+def test_prune_css_should_prune_grouping_rules():
+    css = "@media print { .a { x: 1; } .b { x: 2; } }\n@media screen { .b { x: 3; } }"
+    assert prune(css, '<p class="a">') == "@media print {\n.a {\nx: 1;\n}\n}"
+
+
+@pytest.mark.parametrize("css", [
+    "@import url(a.css);",
+    "@font-face { font-family: a; src: url(a.woff); }",
+    "@keyframes a { from { x: 1; } to { x: 2; } }",
+])
+def test_prune_css_should_keep_other_at_rules(css):
+    assert re.sub(r"\s", "", prune(css, "<p>")) == re.sub(r"\s", "", css)
+
+
+def test_prune_css_should_keep_rules_of_names_in_scripts():
+    css = ".present { x: 1; }\n.navigate-left { x: 2; }\n.b { x: 3; }"
+    head = "<script>el.classList.add('present'); el.classList.add('navigate-' + d);</script>"
+    assert prune(css, "<p>", head) == ".present {\nx: 1;\n}\n.navigate-left {\nx: 2;\n}"
+
+
+def test_prune_css_should_not_change_strings_and_comments_in_rules():
+    css = 'p::before { content: "}"; /* { */ }'
+    assert prune(css, "<p>") == 'p::before {\ncontent: "}"; /* { */\n}'
+
+
+def test_prune_css_should_keep_top_level_license_comments():
+    css = "/*! license */\n.a { x: 1; }\n/* note */\n@media print { /*! inner */ .b { x: 2; } }"
+    assert prune(css, "<p>") == "/*! license */"
+
+
+@pytest.mark.parametrize("sheet", sorted(p.name for p in CSS_DIR.glob("*.css")))
+def test_prune_css_should_keep_all_rules_of_bundled_stylesheets_when_all_names_are_used(sheet):
+    css = (CSS_DIR / sheet).read_text()
+    names = re.findall(r"[\w-]+", css)
+    used = frozenset(names + [p + n for n in names for p in ".#="])
+    assert strip(prune_css(css, used)) == strip(css)
+
+
+def test_markup_names_should_collect_tags_classes_ids_and_values():
+    names = markup_names('<section class="slide step" id="s1" data-x="10">')
+    assert {"section", ".slide", ".step", "#s1", "=10"} <= names
+
+
+def test_writer_should_prune_embedded_stylesheets():
+    source = "Slide\n-----\n\ntext\n"
+    html = publish_revealjs(source, settings_overrides={"embed_stylesheet": True})
+    pruned = publish_revealjs(source, settings_overrides={"embed_stylesheet": True, "prune_stylesheets": True})
+    assert len(pruned["stylesheet"]) < len(html["stylesheet"])
+    assert ".reveal .slides section" in pruned["stylesheet"]
+    assert "data-background-transition=concave" not in pruned["stylesheet"]
+
+
+def test_writer_should_keep_selectors_when_pruning():
+    source = "Slide\n-----\n\ntext\n"
+    pruned = publish_revealjs(source, settings_overrides={"embed_stylesheet": True, "prune_stylesheets": True,
+                                                          "keep_selectors": ["concave"]})
+    assert "data-background-transition=concave" in pruned["stylesheet"]
+
+
+def test_writer_should_keep_license_comment_when_pruning():
+    source = "Slide\n-----\n\ntext\n"
+    pruned = publish_revealjs(source, settings_overrides={"embed_stylesheet": True, "prune_stylesheets": True})
+    assert "/*!" in pruned["stylesheet"]
@@ -0,0 +1,55 @@
+import subprocess
+import sys
+
+from docutils.core import publish_parts
+
+import kirlent_docutils
+from kirlent_docutils.rendering import Renderer
+
+
+SOURCE = "Title\n=====\n\nSome *text*.\n"
+
+
+def test_render_should_generate_same_parts_as_publish_parts():
+    expected = publish_parts(SOURCE, writer_name="kirlent_docutils.revealjs",
+                             settings_overrides={"report_level": 5})
+    parts = kirlent_docutils.render(SOURCE, writer="revealjs", report_level=5)
+    assert parts["whole"] == expected["whole"]
+
+
+def test_render_should_use_html5_writer_by_default():
+    parts = kirlent_docutils.render(SOURCE)
+    assert parts["body"] == "<p>Some <em>text</em>.</p>\n"
+
+
+def test_render_should_apply_overrides():
+    parts = kirlent_docutils.render(SOURCE, doctitle_xform=False)
+    assert "<h2>Title</h2>" in parts["body"]
+
+
+def test_renderer_should_apply_its_overrides_to_all_documents():
+    renderer = Renderer("html5", doctitle_xform=False)
+    for _ in range(2):
+        assert "<h2>Title</h2>" in renderer.render(SOURCE)["body"]
+
+
+def test_renderer_should_not_keep_overrides_of_a_document():
+    renderer = Renderer("html5")
+    renderer.render(SOURCE, doctitle_xform=False)
+    assert "<h2>" not in renderer.render(SOURCE)["body"]
+
+
+def test_renderer_should_not_keep_state_between_documents(tmp_path):
+    (tmp_path / "a.png").write_bytes(b"")
+    renderer = Renderer("html5", report_level=5)
+    first = renderer.render(f".. image:: {tmp_path / 'a.png'}\n")
+    second = renderer.render(SOURCE)
+    assert renderer.settings.record_dependencies is not None
+    assert first["body"] != second["body"]
+    assert len(renderer.settings.record_dependencies.list) == 0
+
+
+def test_package_should_not_import_rendering_api_until_used():
+    code = "import sys, kirlent_docutils.html5; print('kirlent_docutils.rendering' in sys.modules)"
+    output = subprocess.check_output([sys.executable, "-c", code], text=True)
+    assert output.strip() == "False"
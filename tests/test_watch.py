@@ -0,0 +1,50 @@
+import os
+
+from kirlent_docutils.watch import TreeWatcher, Watcher
+
+
+def touch(path, content, mtime):
+    path.write_text(content)
+    os.utime(path, (mtime, mtime))
+
+
+def test_watcher_should_find_targets_of_changed_dependency(tmp_path):
+    touch(tmp_path / "a.rst", "a", 1)
+    touch(tmp_path / "inc.txt", "inc", 1)
+    touch(tmp_path / "b.rst", "b", 1)
+    watcher = Watcher()
+    watcher.update("a", [tmp_path / "a.rst", tmp_path / "inc.txt"])
+    watcher.update("b", [tmp_path / "b.rst", tmp_path / "inc.txt"])
+    assert watcher.poll() == set()
+    touch(tmp_path / "a.rst", "a", 2)
+    assert watcher.poll() == {"a"}
+    touch(tmp_path / "inc.txt", "inc", 2)
+    assert watcher.poll() == {"a", "b"}
+
+
+def test_watcher_should_detect_removed_dependency(tmp_path):
+    touch(tmp_path / "inc.txt", "inc", 1)
+    watcher = Watcher()
+    watcher.update("a", [tmp_path / "inc.txt"])
+    (tmp_path / "inc.txt").unlink()
+    assert watcher.poll() == {"a"}
+
+
+def test_watcher_should_stop_tracking_dropped_dependency(tmp_path):
+    touch(tmp_path / "inc.txt", "inc", 1)
+    watcher = Watcher()
+    watcher.update("a", [tmp_path / "inc.txt"])
+    watcher.update("a", [])
+    touch(tmp_path / "inc.txt", "inc", 2)
+    assert watcher.poll() == set()
+
+
+def test_tree_watcher_should_find_added_and_removed_sources(tmp_path):
+    touch(tmp_path / "a.rst", "a", 1)
+    watcher = TreeWatcher(tmp_path, "*.rst")
+    assert watcher.scan() == {tmp_path / "a.rst"}
+    (tmp_path / "sub").mkdir()
+    touch(tmp_path / "sub" / "b.rst", "b", 1)
+    (tmp_path / "a.rst").unlink()
+    os.utime(tmp_path, (3, 3))
+    assert watcher.poll_sources() == ({tmp_path / "sub" / "b.rst"}, {tmp_path / "a.rst"})
@@ -1,3 +1,4 @@
+import json
 from functools import partial
 
 from docutils.core import publish_parts
@@ -96,6 +97,11 @@ def test_writer_should_generate_container_class_for_container_when_explicit():
     assert '<div class="container">' in html["html_body"]
 
 
+def test_writer_should_keep_order_of_wanted_classes_for_container():
+    html = publish_html(".. container:: b a\n\n   text\n")
+    assert '<div class="b a">' in html["html_body"]
+
+
 def test_writer_should_not_generate_docutils_class_for_container():
     html = publish_html(".. container:: name\n\n   text\n")
     assert 'docutils' not in html["html_body"]
@@ -174,3 +180,58 @@ def test_writer_should_not_generate_colgroup_for_table():
 def test_writer_should_generate_colgroup_for_table_when_given_widths():
     html = publish_html(".. table::\n   :widths: 100\n\n   +-------+\n   | entry |\n   +-------+\n")
     assert '<colgroup>' in html["html_body"]
+
+
+def test_writer_should_write_visitor_profile(tmp_path):
+    publish_html("text *emphasis*\n", settings_overrides={"profile_visitors": str(tmp_path / "p.json")})
+    profile = json.loads((tmp_path / "p.json").read_text())
+    assert profile["methods"]["visit_emphasis"]["calls"] == 1
+    assert profile["nodes"]["paragraph"] == {"visits": 1, "departures": 1, "seconds": profile["nodes"]["paragraph"]["seconds"]}
+
+
+def test_writer_should_generate_same_output_when_profiling(tmp_path):
+    source = "Title\n=====\n\n- item *emphasis*\n"
+    html = publish_html(source)
+    profiled_html = publish_html(source, settings_overrides={"profile_visitors": str(tmp_path / "p.json")})
+    assert profiled_html["whole"] == html["whole"]
+
+
+def test_writer_should_set_probed_size_of_lazy_images(tmp_path):
+    (tmp_path / "a.gif").write_bytes(b"GIF89a" + b"\x40\x01\xc8\x00" + b"\x00" * 10)
+    html = publish_html(f".. image:: {tmp_path / 'a.gif'}\n", settings_overrides={"image_loading": "lazy"})
+    assert 'decoding="async" height="200" loading="lazy"' in html["body"]
+    assert 'width="320"' in html["body"]
+
+
+def test_writer_should_not_set_probed_size_of_lazy_images_with_given_size(tmp_path):
+    (tmp_path / "a.gif").write_bytes(b"GIF89a" + b"\x40\x01\xc8\x00" + b"\x00" * 10)
+    html = publish_html(f".. image:: {tmp_path / 'a.gif'}\n   :width: 50%\n", settings_overrides={"image_loading": "lazy"})
+    assert ('height="200"' not in html["body"]) and ('decoding="async"' in html["body"])
+
+
+def test_writer_should_not_set_probed_size_of_linked_images(tmp_path):
+    (tmp_path / "a.gif").write_bytes(b"GIF89a" + b"\x40\x01\xc8\x00" + b"\x00" * 10)
+    html = publish_html(f".. image:: {tmp_path / 'a.gif'}\n")
+    assert ('height=' not in html["body"]) and ('decoding=' not in html["body"])
+
+
+def test_writer_should_embed_small_image_as_data_uri(tmp_path):
+    (tmp_path / "a.gif").write_bytes(b"GIF89a" + b"\x40\x01\xc8\x00" + b"\x00" * 10)
+    html = publish_html(f".. image:: {tmp_path / 'a.gif'}\n", settings_overrides={"embed_images_below": 100})
+    assert f'<img alt="{tmp_path / "a.gif"}" src="data:image/gif;base64,' in html["body"]
+
+
+def test_writer_should_not_embed_large_image(tmp_path):
+    (tmp_path / "a.gif").write_bytes(b"GIF89a" + b"\x40\x01\xc8\x00" + b"\x00" * 100)
+    html = publish_html(f".. image:: {tmp_path / 'a.gif'}\n", settings_overrides={"embed_images_below": 100})
+    assert f'src="{tmp_path / "a.gif"}"' in html["body"]
+
+
+def test_writer_should_embed_repeated_image_once_in_symbol(tmp_path):
+    (tmp_path / "a.gif").write_bytes(b"GIF89a" + b"\x40\x01\xc8\x00" + b"\x00" * 10)
+    image = f".. image:: {tmp_path / 'a.gif'}\n\n"
+    html = publish_html(image + image.replace("\n\n", "\n   :width: 100\n\n"), settings_overrides={"embed_images_below": 100})
+    assert html["whole"].count("data:image/gif;base64,") == 1
+    assert html["whole"].count('<symbol id="image-') == 1
+    assert html["body"].count('<use href="#image-') == 2
+    assert 'style="width: 100px;" viewBox="0 0 320 200"' in html["body"]
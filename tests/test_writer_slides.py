@@ -1,3 +1,6 @@
+import pytest
+
+import json
 import re
 from functools import partial
 
@@ -62,15 +65,35 @@ def test_writer_should_generate_div_content_for_slide_contents():
 
 
 def test_writer_should_generate_script_for_rough_notation():
-    html = publish_html(PREAMBLE + (SLIDE % {"n": 1, "f": ""}))
+    html = publish_html(PREAMBLE + (SLIDE % {"n": 1, "f": ""}) + "*>_Tekir_<*\n")
     assert re.search(r'<script defer src=".*\brough-notation\b.*.js"></script>', html["head"]) is not None
 
 
 def test_writer_should_generate_script_for_annotating_elements():
-    html = publish_html(PREAMBLE + (SLIDE % {"n": 1, "f": ""}))
+    html = publish_html(PREAMBLE + (SLIDE % {"n": 1, "f": ""}) + "*>_Tekir_<*\n")
     assert re.search(r'<script>.*RoughNotation.annotate\(.*</script>', html["head"], re.DOTALL) is not None
 
 
+def test_writer_should_not_generate_scripts_for_rough_notation_without_annotations():
+    html = publish_html(PREAMBLE + (SLIDE % {"n": 1, "f": ""}) + "*Tekir*\n")
+    assert ("rough-notation" not in html["head"]) and ("RoughNotation" not in html["head"])
+
+
+@pytest.mark.parametrize(("source", "features"), [
+    ("*Tekir*\n", ""),
+    ("*>_Tekir_<*\n", "annotations"),
+    (":pause:\n\n- Tekir\n\n:math:`x^2`\n", "math,pauses"),
+])
+def test_writer_should_list_used_features(source, features):
+    html = publish_html(PREAMBLE + (SLIDE % {"n": 1, "f": ""}) + source)
+    assert html["features"] == features
+
+
+def test_writer_should_list_layouts_in_used_features():
+    html = publish_html(PREAMBLE + (SLIDE % {"n": 1, "f": ":layout: a b"}))
+    assert html["features"] == "layouts"
+
+
 def test_writer_should_generate_span_for_underline_annotation_emphasis():
     html = publish_html(PREAMBLE + (SLIDE % {"n": 1, "f": ""}) + "*>_Tekir_<*\n")
     assert '<span class="annotation annotation-underline">Tekir</span>' in html["body"]
@@ -114,3 +137,26 @@ def test_writer_should_not_generate_span_for_regular_emphasis():
 def test_writer_should_generate_regular_link_for_reference_without_annotation():
     html = publish_html(PREAMBLE + (SLIDE % {"n": 1, "f": ""}) + "`Tekir <https://tekir.org/>`_\n")
     assert '<a href="https://tekir.org/">Tekir</a>' in html["body"]
+
+
+def test_writer_should_scale_height_of_mermaid_svg_image(tmp_path):
+    (tmp_path / "a.svg").write_text('<svg id="mermaid-1" width="100%" height="42"></svg>')
+    html = publish_html(PREAMBLE + (SLIDE % {"n": 1, "f": ""}) + ".. image:: a.svg\n",
+                        source_path=str(tmp_path / "a.rst"))
+    assert 'style="height: 126px;"' in html["body"]
+
+
+def test_writer_should_not_scale_height_of_other_svg_image(tmp_path):
+    (tmp_path / "a.svg").write_text('<svg width="100%" height="42"></svg>')
+    html = publish_html(PREAMBLE + (SLIDE % {"n": 1, "f": ""}) + ".. image:: a.svg\n",
+                        source_path=str(tmp_path / "a.rst"))
+    assert 'height' not in html["body"]
+
+
+def test_profile_should_count_methods_called_by_other_methods(tmp_path):
+    source = PREAMBLE + (SLIDE % {"f": "", "n": 1})
+    publish_html(source, settings_overrides={"profile_visitors": str(tmp_path / "p.json")})
+    profile = json.loads((tmp_path / "p.json").read_text())
+    assert profile["methods"]["depart_title"]["calls"] == 1
+    assert profile["methods"]["visit_container"]["calls"] == 1
+    assert "container" not in profile["nodes"]